@@ -0,0 +1,138 @@
+"""
+Benchmarks get_line_type_and_matches against the sequential regex cascade it replaced.
+
+Every line of the fixture reports is classified by both implementations, which must agree
+on LineType and match groups before any timing is reported.
+
+Usage: python benchmarks/bench_line_classifier.py [report ...]
+"""
+
+from pathlib import Path
+import re
+import sys
+import timeit
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.lines.lines import (
+    LineType,
+    borough_line_regex,
+    column_header_1,
+    column_header_2,
+    count_per_county_line,
+    county_date_header,
+    docket_line_regex,
+    double_dash_line,
+    empty_line,
+    get_line_type_and_matches,
+    major_capital_header,
+    office_of_rent_header,
+    single_dash_line,
+    street_address_line_regex,
+    total_cases_county_line,
+    total_cases_document_line,
+    total_cases_plus_nys_header,
+    work_line_regex,
+)
+from src.MciFileProcessor.mci_file_processor import get_lines_from_file
+from src.regexes.regexes import cost_re
+
+FIXTURE_DIR = PROJECT_ROOT / "tests" / "data"
+REPEAT = 5
+
+
+def sequential_line_type_and_matches(
+    line: str,
+) -> tuple[LineType, re.Match[str]] | tuple[LineType, None]:
+    """The original classifier: every pattern tried in turn"""
+    line = re.sub("NYS DIVISION OF HOUSING AND COMMUNITY RENEWAL", "", line)
+    line = re.sub(r"PAGE\s+\d+", "", line)
+    line = line.strip()
+
+    if re.match(empty_line, line):
+        return LineType.NO_LINE, None
+    if re.match(office_of_rent_header, line):
+        return LineType.OFFICE_OF_RENT_HEADER, None
+    if re.match(major_capital_header, line):
+        return LineType.MAJOR_CAPITAL_HEADER, None
+    if re.match(column_header_1, line):
+        return LineType.COLUMN_HEADER_1, None
+    if re.match(column_header_2, line):
+        return LineType.COLUMN_HEADER_2, None
+    if re.match(double_dash_line, line):
+        return LineType.DOUBLE_DASHES, None
+    if re.match(single_dash_line, line):
+        return LineType.DASHES, None
+    if m := re.match(county_date_header, line):
+        return LineType.COUNTY_DATE_HEADER, m
+    if m := re.match(borough_line_regex, line):
+        return LineType.BOROUGH_DOCKET_LINE, m
+    if m := re.match(docket_line_regex, line):
+        return LineType.DOCKET_LINE, m
+    if m := re.match(total_cases_county_line, line):
+        return LineType.TOTAL_CASES_COUNTY_LINE, m
+    if m := re.match(count_per_county_line, line):
+        return LineType.COUNT_PER_COUNTY_LINE, m
+    if m := re.match(total_cases_document_line, line):
+        return LineType.TOTAL_CASES_DOCUMENT_LINE, m
+    if m := re.match(total_cases_plus_nys_header, line):
+        return LineType.TOTAL_CASES_PLUS_NYS_DIVISION_HEADER, m
+    if m := re.match(work_line_regex, line):
+        return LineType.MCI_WORK_LINE, m
+    if not re.search(cost_re, line) and re.search(street_address_line_regex, line):
+        return LineType.STREET_ADDRESS_LINE, re.match(street_address_line_regex, line)
+
+    raise Exception(f"Line Type not expected {line}")
+
+
+def classification(
+    result: tuple[LineType, re.Match[str]] | tuple[LineType, None],
+) -> tuple[LineType, tuple[str | None, ...] | None]:
+    """LineType and match groups, for comparing the two classifiers"""
+    line_type, line_matches = result
+    return line_type, (line_matches.groups() if line_matches else None)
+
+
+def load_fixture_lines(reports: list[str]) -> list[str]:
+    """Returns all lines of the given reports"""
+    lines: list[str] = []
+    for report in reports:
+        lines.extend(get_lines_from_file(report))
+    return lines
+
+
+def main() -> None:
+    reports = sys.argv[1:] or [
+        str(path)
+        for path in sorted(FIXTURE_DIR.iterdir())
+        if path.suffix in (".pdf", ".txt")
+    ]
+    lines = load_fixture_lines(reports)
+
+    for line in lines:
+        expected = classification(sequential_line_type_and_matches(line))
+        actual = classification(get_line_type_and_matches(line))
+        if actual != expected:
+            raise AssertionError(f"{line!r}: expected {expected}, got {actual}")
+
+    for name, classifier in (
+        ("sequential", sequential_line_type_and_matches),
+        ("dispatching", get_line_type_and_matches),
+    ):
+        best = min(
+            timeit.repeat(
+                lambda classifier=classifier: [classifier(line) for line in lines],
+                number=1,
+                repeat=REPEAT,
+            )
+        )
+        print(
+            f"{name:>12}: {best * 1e6 / len(lines):7.2f} us/line "
+            f"({len(lines)} lines from {len(reports)} reports)"
+        )
+
+
+if __name__ == "__main__":
+    main()
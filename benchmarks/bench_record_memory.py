@@ -0,0 +1,193 @@
+"""
+Measures the memory retained by the PropertyMci records of a whole report archive.
+
+Every report is parsed and all of its records are kept, as analyses of the archive do.
+The records are then copied into the plain (unslotted, uninterned) dataclasses they
+replaced, sharing addresses and dockets between work items exactly as the parser did,
+and the memory of both is reported, together with that of the same reports parsed
+into columnar MciTables.
+
+Usage: python benchmarks/bench_record_memory.py [report ...]
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import gc
+from pathlib import Path
+import sys
+import tracemalloc
+from typing import TYPE_CHECKING, Any
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.MciFileProcessor.mci_file_processor import (
+    ExtractionOptions,
+    MciFileProcessor,
+    get_lines_from_file,
+)
+from src.MciTable.mci_table import MciTable
+from src.regexes.filename_patterns import is_valid_input_filename
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from src.PropertyMci.property_mci import PropertyMci
+
+DATA_DIR = PROJECT_ROOT / "data"
+# Text extraction is not measured, so use the fastest backend
+EXTRACTION = ExtractionOptions(backend="pypdfium2")
+
+
+@dataclass
+class LegacyAddress:
+    street_address: str | None = None
+    neighborhood: str | None = None
+    county: str | None = None
+    zip_code: str | None = None
+
+
+@dataclass
+class LegacyDocket:
+    docket_number: str
+    case_status: str
+    close_code: str
+    closing_date: str
+    monthly_mci_incr_per_room: str | None
+
+
+@dataclass
+class LegacyWorkItem:
+    mci_work: str
+    claim_cost: str
+    allow_cost: str
+
+
+@dataclass
+class LegacyPropertyMci:
+    address: LegacyAddress
+    docket: LegacyDocket
+    work_item: LegacyWorkItem | None
+
+
+def fresh(value: str | None) -> str | None:
+    """A new copy of value, as the parser produced for every line before interning"""
+    return (value + " ")[:-1] if value else value
+
+
+def to_legacy(records: list[PropertyMci]) -> list[LegacyPropertyMci]:
+    """Copies records into the legacy classes, preserving shared addresses and dockets"""
+    addresses: dict[int, LegacyAddress] = {}
+    dockets: dict[int, LegacyDocket] = {}
+    legacy: list[LegacyPropertyMci] = []
+    for record in records:
+        address = addresses.get(id(record.address))
+        if address is None:
+            address = addresses[id(record.address)] = LegacyAddress(
+                *(
+                    fresh(value)
+                    for value in (
+                        record.address.street_address,
+                        record.address.neighborhood,
+                        record.address.county,
+                        record.address.zip_code,
+                    )
+                )
+            )
+        docket = dockets.get(id(record.docket))
+        if docket is None:
+            docket = dockets[id(record.docket)] = LegacyDocket(
+                *(
+                    fresh(value)
+                    for value in (
+                        record.docket.docket_number,
+                        record.docket.case_status,
+                        record.docket.close_code,
+                        record.docket.closing_date,
+                        record.docket.monthly_mci_incr_per_room,
+                    )
+                )
+            )
+        work_item = record.work_item and LegacyWorkItem(
+            *(
+                fresh(value)
+                for value in (
+                    record.work_item.mci_work,
+                    record.work_item.claim_cost,
+                    record.work_item.allow_cost,
+                )
+            )
+        )
+        legacy.append(LegacyPropertyMci(address, docket, work_item))
+    return legacy
+
+
+def parse_lines(report: str, lines: list[str]) -> list[PropertyMci]:
+    """Parses already extracted lines, keeping every record"""
+    processor = MciFileProcessor(report, EXTRACTION)
+    records: list[PropertyMci] = []
+    for line in lines:
+        processor.process_line(line)
+        records.extend(processor.pending_mcis)
+        processor.pending_mcis.clear()
+    return records
+
+
+def fill_table(report: str, lines: list[str]) -> MciTable:
+    """Parses already extracted lines into an MciTable"""
+    processor = MciFileProcessor(report, EXTRACTION, MciTable())
+    for line in lines:
+        processor.process_line(line)
+    return processor.table
+
+
+def traced_bytes(build: Callable[[], list[Any]]) -> tuple[list[Any], int]:
+    """Returns what build produces together with the memory it still holds"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained
+
+
+def main() -> None:
+    reports = sys.argv[1:] or [
+        str(path)
+        for path in sorted(DATA_DIR.iterdir())
+        if is_valid_input_filename(path.name)
+    ]
+    report_lines = {
+        report: get_lines_from_file(report, EXTRACTION) for report in reports
+    }
+
+    records, slotted_bytes = traced_bytes(
+        lambda: [
+            record
+            for report, lines in report_lines.items()
+            for record in parse_lines(report, lines)
+        ]
+    )
+    _, legacy_bytes = traced_bytes(lambda: to_legacy(records))
+    _, table_bytes = traced_bytes(
+        lambda: [fill_table(report, lines) for report, lines in report_lines.items()]
+    )
+
+    print(f"{len(records)} records from {len(reports)} reports")
+    for name, retained in (
+        ("plain", legacy_bytes),
+        ("slotted", slotted_bytes),
+        ("table", table_bytes),
+    ):
+        print(
+            f"{name:>8}: {retained / 1024:9.1f} KiB "
+            f"({retained / len(records):6.1f} bytes/record)"
+        )
+    print(f"slotted records save {1 - slotted_bytes / legacy_bytes:.0%} over plain")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Measures the throughput of each parsing stage, and optionally reports regressions.
+
+Stages are timed separately on every fixture report and on a synthetic large report:
+  extract  - get_lines_from_file, in lines/sec
+  classify - get_line_type_and_matches, in lines/sec
+  process  - MciFileProcessor.process_line, in lines/sec and rows/sec
+  write    - parse_reports.write_mcis_to_csv, in rows/sec
+
+The synthetic report is a .txt report of --cases dockets from
+src/generate_synthetic_report.py, so that the .txt path of get_lines_from_file is
+exercised at scale as well.
+
+Usage:
+  python benchmarks/run_benchmarks.py --output results.json
+  python benchmarks/run_benchmarks.py --compare baseline.json --threshold 0.25
+  python benchmarks/run_benchmarks.py --compare baseline.json --report-only
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import sys
+import tempfile
+import time
+from typing import TYPE_CHECKING
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+# parse_reports imports finite_machine_states from src, as pytest's pythonpath allows
+for path in (PROJECT_ROOT / "src", PROJECT_ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from src import parse_reports
+from src.generate_synthetic_report import (
+    SyntheticReportOptions,
+    write_synthetic_report,
+)
+from src.lines.lines import get_line_type_and_matches
+from src.MciFileProcessor.mci_file_processor import (
+    ExtractionOptions,
+    MciFileProcessor,
+    get_lines_from_file,
+)
+from src.text_extractors.text_extractors import DEFAULT_BACKEND, EXTRACTORS
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from src.PropertyMci.property_mci import PropertyMci
+
+FIXTURE_DIR = PROJECT_ROOT / "tests" / "data"
+SYNTHETIC_CASES = 5000
+REPEAT = 5
+# Fractional drop in throughput below the baseline which counts as a regression
+REGRESSION_THRESHOLD = 0.25
+REPORT_MONTH = "2024-05"
+
+
+@dataclass
+class StageResult:
+    """Best time of a stage over one input"""
+
+    stage: str
+    input: str
+    seconds: float
+    lines: int = 0
+    rows: int = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.stage}/{self.input}"
+
+    def rates(self) -> dict[str, float]:
+        """Lines and rows per second, for the counts the stage handles"""
+        rates: dict[str, float] = {}
+        if self.lines:
+            rates["lines_per_sec"] = self.lines / self.seconds
+        if self.rows:
+            rates["rows_per_sec"] = self.rows / self.seconds
+        return rates
+
+
+def best_seconds(run: Callable[[], object], repeat: int) -> float:
+    """Fastest wall time of repeat runs"""
+    times: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def create_synthetic_report(directory: str, cases: int) -> Path:
+    """Writes a synthetic .txt report of cases dockets"""
+    path = Path(directory) / f"synthetic-{cases}-mci-closed-case-report.txt"
+    with path.open("w") as report:
+        write_synthetic_report(report, SyntheticReportOptions(cases=cases))
+    return path
+
+
+def classify(lines: list[str]) -> None:
+    for line in lines:
+        get_line_type_and_matches(line)
+
+
+def process(lines: list[str]) -> list[PropertyMci]:
+    """Processes lines into records"""
+    processor = MciFileProcessor("benchmark.txt")
+    for line in lines:
+        processor.process_line(line)
+    return processor.pending_mcis
+
+
+def benchmark_input(
+    report: Path, extraction: ExtractionOptions, repeat: int
+) -> list[StageResult]:
+    """Times every stage on one report"""
+    path = str(report)
+    lines = get_lines_from_file(path, extraction)
+    records = process(lines)
+    results = [
+        StageResult(
+            "extract",
+            report.name,
+            best_seconds(lambda: get_lines_from_file(path, extraction), repeat),
+            lines=len(lines),
+        ),
+        StageResult(
+            "classify",
+            report.name,
+            best_seconds(lambda: classify(lines), repeat),
+            lines=len(lines),
+        ),
+        StageResult(
+            "process",
+            report.name,
+            best_seconds(lambda: process(lines), repeat),
+            lines=len(lines),
+            rows=len(records),
+        ),
+    ]
+    # write_mcis_to_csv writes to the module's csv, so it is pointed at a scratch file
+    # and restored afterwards
+    original_output_path = parse_reports.CSV_OUTPUT_FILEPATH
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            parse_reports.set_output_file(str(Path(directory) / "mci_output.csv"))
+            results.append(
+                StageResult(
+                    "write",
+                    report.name,
+                    best_seconds(
+                        lambda: parse_reports.write_mcis_to_csv(
+                            records, report.name, REPORT_MONTH
+                        ),
+                        repeat,
+                    ),
+                    rows=len(records),
+                )
+            )
+        finally:
+            parse_reports.set_output_file(original_output_path)
+    return results
+
+
+def find_regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Describes each rate which fell more than threshold below its baseline"""
+    regressions: list[str] = []
+    for key, baseline_rates in baseline.items():
+        for rate, baseline_rate in baseline_rates.items():
+            current = results.get(key, {}).get(rate)
+            if current is not None and current < baseline_rate * (1 - threshold):
+                regressions.append(
+                    f"{key} {rate}: {current:,.0f} is {1 - current / baseline_rate:.0%} "
+                    f"below baseline {baseline_rate:,.0f}"
+                )
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses command line options"""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "reports",
+        nargs="*",
+        help="Reports to benchmark (default: the pdfs in tests/data)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(EXTRACTORS),
+        default=DEFAULT_BACKEND,
+        help=f"Library used to extract pdf text (default: {DEFAULT_BACKEND})",
+    )
+    parser.add_argument(
+        "--cases",
+        type=int,
+        default=SYNTHETIC_CASES,
+        help="Dockets in the synthetic report, 0 to skip it "
+        f"(default: {SYNTHETIC_CASES})",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=REPEAT,
+        help=f"Runs of each stage, of which the fastest is kept (default: {REPEAT})",
+    )
+    parser.add_argument("--output", help="File to write results to as JSON")
+    parser.add_argument(
+        "--compare", help="JSON results to compare against; exits 1 on regressions"
+    )
+    parser.add_argument(
+        "--report-only",
+        action="store_true",
+        help="With --compare, print regressions as warnings and exit 0",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="Fractional drop in throughput which counts as a regression "
+        f"(default: {REGRESSION_THRESHOLD})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    extraction = ExtractionOptions(backend=args.backend)
+    reports = [Path(report) for report in args.reports] or sorted(
+        FIXTURE_DIR.glob("*.pdf")
+    )
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        if args.cases > 0:
+            reports.append(create_synthetic_report(directory, args.cases))
+        for report in reports:
+            for result in benchmark_input(report, extraction, args.repeat):
+                results[result.key] = result.rates()
+                rates = ", ".join(
+                    f"{rate:,.0f} {name.removesuffix('_per_sec')}/s"
+                    for name, rate in result.rates().items()
+                )
+                print(f"{result.key}: {result.seconds * 1000:9.2f} ms  {rates}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if not regressions:
+            print(
+                f"No stage is more than {args.threshold:.0%} slower than {args.compare}"
+            )
+        elif args.report_only:
+            # As GitHub Actions annotates a job with a warning
+            print(f"::warning title=Throughput regression::{'; '.join(regressions)}")
+        else:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,38 +2,317 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache, partial
+import io
+from itertools import islice, repeat
+import json
+import math
+import mmap
+import os
+import sys
+import time
 from typing import TYPE_CHECKING
 
-import pdfplumber
-
 from src.finite_machine_states.fsm_state import FsmState
 from src.lines.lines import LineType, get_line_type_and_matches
+from src.MciTable.mci_table import MciTable
 from src.PropertyMci.address import Address
 from src.PropertyMci.docket import Docket
 from src.PropertyMci.property_mci import PropertyMci
+from src.PropertyMci.values import parse_amount, parse_closing_date
 from src.PropertyMci.work_item import WorkItem
 from src.regexes.regexes import normalize_data
+from src.text_extractors.text_extractors import (
+    DEFAULT_BACKEND,
+    get_extractor,
+    iter_page_texts,
+)
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
     import re
 
+    from src.text_cache.text_cache import ExtractedTextCache
+
+# Number of page chunks handed to each worker when extracting pdf text in parallel
+PAGE_CHUNKS_PER_WORKER = 4
+# Bump whenever a parser change alters the output, so processed reports are parsed again
+PARSER_VERSION = "1"
+# Bytes of a text report in which newlines are counted at a time, to skip lines
+OFFSET_BLOCK_BYTES = 1 << 20
+# Lines preceding a line which fails to parse, kept to locate the failure
+CONTEXT_LINES = 3
+# Records held by a ParseCheckpoint, which JSON holds as objects of their fields
+CHECKPOINT_RECORDS = {
+    "current_address": Address,
+    "current_docket": Docket,
+    "current_work_item": WorkItem,
+}
+
+
+class MciParseError(Exception):
+    """A line of a report could not be parsed"""
+
+    def __init__(
+        self,
+        filepath: str,
+        line_number: int,
+        line: str,
+        context: list[str],
+        reason: str,
+    ) -> None:
+        # Every value is passed on, so the error survives pickling from worker processes
+        super().__init__(filepath, line_number, line, context, reason)
+        self.filepath = filepath
+        self.line_number = line_number
+        self.line = line
+        # Lines preceding the line which failed
+        self.context = context
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"{self.filepath}, line {self.line_number}: {self.reason}"
+
+
+def encode_typed_value(value: object) -> dict[str, str]:
+    """Encodes the typed values of records as JSON objects"""
+    if isinstance(value, Decimal):
+        return {"decimal": str(value)}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+def decode_typed_value(encoded: dict[str, object]) -> object:
+    """Decodes JSON objects written by encode_typed_value, and leaves others as they are"""
+    if encoded.keys() == {"decimal"}:
+        return Decimal(str(encoded["decimal"]))
+    if encoded.keys() == {"date"}:
+        return date.fromisoformat(str(encoded["date"]))
+    return encoded
+
+
+@dataclass
+class ParseCheckpoint:
+    """
+    State of an MciFileProcessor after its first line_number lines, once every MCI
+    they produced was emitted, from which parsing of the report resumes
+    """
+
+    line_number: int
+    mci_count: int
+    fsm_state: str
+    current_county: str | None
+    # Pairs rather than a mapping, since cases may precede any county header
+    county_counts: list[tuple[str | None, int]]
+    current_address: Address | None
+    current_docket: Docket | None
+    current_work_item: WorkItem | None
+    last_mci: tuple[Address, Docket, WorkItem | None] | None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=encode_typed_value)
+
+    @classmethod
+    def from_json(cls, text: str) -> ParseCheckpoint:
+        values = json.loads(text, object_hook=decode_typed_value)
+        for name, record_type in CHECKPOINT_RECORDS.items():
+            if values[name] is not None:
+                values[name] = record_type(**values[name])
+        if values["last_mci"]:
+            address, docket, work_item = values["last_mci"]
+            values["last_mci"] = (
+                Address(**address),
+                Docket(**docket),
+                WorkItem(**work_item) if work_item else None,
+            )
+        values["county_counts"] = [tuple(pair) for pair in values["county_counts"]]
+        return cls(**values)
+
+
+def intern_data(data: str) -> str:
+    """
+    Normalizes data and interns it.
+    Used for values repeated across many records (county, status, dates, work names)
+    so that every record shares a single copy of each string.
+    """
+    return sys.intern(normalize_data(data))
+
+
+# Closing dates repeat across many dockets, so each is only parsed once
+cached_closing_date = lru_cache(maxsize=4096)(parse_closing_date)
+
+
+def extract_page_range_text(
+    filepath: str, start: int, stop: int, backend: str = DEFAULT_BACKEND
+) -> str:
+    """
+    Returns the concatenated text of pdf pages [start, stop).
+    Reopens the file by path so that it can run in a worker process.
+    """
+    return "".join(iter_page_texts(filepath, backend, start, stop))
+
+
+def iter_pdf_page_texts(
+    filepath: str, workers: int = 1, backend: str = DEFAULT_BACKEND
+) -> Iterator[str]:
+    """
+    Yields the text of pdf pages in page order, one page (or chunk of pages) at a time.
+    With workers > 1, chunks of pages are extracted concurrently ahead of the consumer,
+    so parsing of early pages overlaps extraction of later ones.
+    """
+    if workers <= 1:
+        yield from iter_page_texts(filepath, backend)
+        return
+
+    page_count = get_extractor(backend).count_pages(filepath)
+    # Several chunks per worker keeps the pool busy when pages differ in density
+    chunk_size = max(1, math.ceil(page_count / (workers * PAGE_CHUNKS_PER_WORKER)))
+    starts = range(0, page_count, chunk_size)
+    stops = [min(start + chunk_size, page_count) for start in starts]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(
+            extract_page_range_text,
+            repeat(filepath, len(starts)),
+            starts,
+            stops,
+            repeat(backend, len(starts)),
+        )
+
 
-def get_lines_from_file(filepath: str) -> list[str]:
-    """Returns list of lines from pdf or text file"""
+def iter_pdf_lines(
+    filepath: str, workers: int = 1, backend: str = DEFAULT_BACKEND
+) -> Iterator[str]:
+    """
+    Yields lines from pdf without materialising the whole document.
+    Page texts have no trailing newline, so the last line of a page runs into the
+    first line of the next; the unterminated tail of each page is carried over
+    to preserve that merge exactly.
+    """
+    carry = ""
+    for page_text in iter_pdf_page_texts(filepath, workers, backend):
+        *complete_lines, carry = (carry + page_text).split("\n")
+        yield from complete_lines
+    yield carry
+
+
+def find_line_offset(filepath: str, line_count: int) -> int | None:
+    """
+    Finds the byte offset at which a text file continues after line_count lines,
+    by counting newlines in a memory map of the file rather than decoding its lines.
+    :return: Offset, or None when the file contains carriage returns, whose newline
+        translation only decoding the file reproduces
+    """
+    with open(filepath, "rb") as txt:
+        size = os.fstat(txt.fileno()).st_size
+        if not size:
+            return 0
+        with mmap.mmap(txt.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped.find(b"\r") != -1:
+                return None
+            offset = 0
+            while offset < size:
+                block_end = min(offset + OFFSET_BLOCK_BYTES, size)
+                newlines = mapped[offset:block_end].count(b"\n")
+                if newlines >= line_count:
+                    break
+                line_count -= newlines
+                offset = block_end
+            for _ in range(line_count):
+                if offset >= size:
+                    break
+                offset = mapped.find(b"\n", offset) + 1 or size
+            return offset
+
+
+def iter_txt_lines(filepath: str, start_line: int = 0) -> Iterator[str]:
+    """
+    Yields lines of a text report, decoded a buffer at a time as open() decodes them,
+    so the file is never held in memory as a whole.
+    :param start_line: Number of lines at the start of the file to skip, which are
+        skipped without being decoded when possible
+    """
+    offset = find_line_offset(filepath, start_line) if start_line else 0
+    if offset is None:
+        with open(filepath) as txt:
+            yield from islice(txt, start_line, None)
+        return
+    with open(filepath, "rb") as raw:
+        raw.seek(offset)
+        # Same encoding and newline translation as open() in text mode
+        with io.TextIOWrapper(raw) as txt:
+            yield from txt
+
+
+@dataclass(frozen=True)
+class ExtractionOptions:
+    """How lines are extracted from report files and their values parsed"""
+
+    # Number of processes used to extract pdf pages
+    workers: int = 1
+    # Library used to extract pdf text
+    backend: str = DEFAULT_BACKEND
+    # Cache of previously extracted pdf lines
+    text_cache: ExtractedTextCache | None = None
+    # Convert costs to Decimal and closing dates to date as lines are parsed,
+    # instead of keeping the printed strings
+    typed_values: bool = False
+
+
+DEFAULT_EXTRACTION = ExtractionOptions()
+
+
+def iter_lines_from_file(
+    filepath: str,
+    extraction: ExtractionOptions = DEFAULT_EXTRACTION,
+    start_line: int = 0,
+) -> Iterator[str]:
+    """
+    Yields lines from pdf or text file without materialising the whole document.
+    Lines extracted from a pdf are served from the text cache when one is configured.
+    :param start_line: Number of lines at the start of the file to skip
+    """
     filetype = filepath[filepath.rindex(".") :]
-    lines = []
     if filetype == ".pdf":
-        file_text = ""
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                file_text += page.extract_text()
-        pdf.close()
-        lines = file_text.split("\n")
+        extract = partial(
+            iter_pdf_lines, filepath, extraction.workers, extraction.backend
+        )
+        if extraction.text_cache:
+            lines = extraction.text_cache.iter_lines(
+                filepath, extraction.backend, extract
+            )
+        else:
+            lines = extract()
+        yield from islice(lines, start_line, None)
     elif filetype == ".txt":
-        with open(filepath) as txt:
-            lines = txt.readlines()
-    return lines
+        yield from iter_txt_lines(filepath, start_line)
+
+
+def get_lines_from_file(
+    filepath: str, extraction: ExtractionOptions = DEFAULT_EXTRACTION
+) -> list[str]:
+    """Returns list of lines from pdf or text file"""
+    return list(iter_lines_from_file(filepath, extraction))
+
+
+class ParseHooks:
+    """
+    Takes part in each stage of parsing the lines of a report, for instrumentation.
+    The base class parses lines exactly as MciFileProcessor does without hooks.
+    """
+
+    def iter_extracted(self, lines: Iterator[str]) -> Iterator[str]:
+        """Yields the lines extracted from the report"""
+        return lines
+
+    def process_line(self, processor: MciFileProcessor, line: str) -> None:
+        """Classifies line and updates the parse state of processor with it"""
+        processor.process_line(line)
 
 
 class MciFileProcessor:
@@ -41,9 +320,17 @@ class MciFileProcessor:
 
     current_docket: Docket | None
 
-    def __init__(self, filepath: str) -> None:
+    def __init__(
+        self,
+        filepath: str,
+        extraction: ExtractionOptions = DEFAULT_EXTRACTION,
+        table: MciTable | None = None,
+    ) -> None:
         super().__init__()
         self.filepath = filepath
+        self.extraction = extraction
+        # When set, MCIs are appended to table as columns instead of being queued as PropertyMCIs
+        self.table = table
 
         # Track state of document processing
         self.fsm_state = FsmState.START_DOCUMENT
@@ -52,7 +339,12 @@ class MciFileProcessor:
         self.current_address: Address | None = None
         self.current_docket: Docket | None = None
         self.current_work_item: WorkItem | None = None
-        self.all_mcis: list[PropertyMci] = []
+        # Only the address, docket and work item of the most recent MCI are retained,
+        # to detect duplicates
+        self.last_mci: tuple[Address, Docket, WorkItem | None] | None = None
+        self.mci_count = 0
+        # PropertyMCIs finalised by the current line but not yet yielded by iter_mcis
+        self.pending_mcis: list[PropertyMci] = []
 
         # Validate results
         self.current_county: str | None = None
@@ -62,7 +354,7 @@ class MciFileProcessor:
         self, previous_work_item_can_be_blank: bool = False
     ) -> None:
         """
-        Adds a new PropertyMci to array.
+        Finalises a new PropertyMci and queues it for iter_mcis.
         Ensures that all required fields are supplied and that added PropertyMci is not a duplicate
 
         @param: previous_work_item_can_be_blank --
@@ -80,29 +372,27 @@ class MciFileProcessor:
         )
 
         # Ensure that PropertyMCI is not a duplicate
+        current_mci = (
+            self.current_address,
+            self.current_docket,
+            self.current_work_item,
+        )
         is_first_mci = (
             has_address_and_docket
             and has_work_order_or_null_work_order_allowed
-            and len(self.all_mcis) == 0
+            and self.last_mci is None
         )
         is_different_from_previous_mci_and_previous_work_null = (
             previous_work_item_can_be_blank
             and has_address_and_docket
-            and len(self.all_mcis) > 0
-            and (
-                self.all_mcis[-1].docket != self.current_docket
-                or self.all_mcis[-1].address != self.current_address
-            )
+            and self.last_mci is not None
+            and self.last_mci[:2] != current_mci[:2]
         )
         is_different_from_previous_mci_and_previous_work_not_null = (
             not previous_work_item_can_be_blank
             and has_address_and_docket
-            and len(self.all_mcis) > 0
-            and (
-                self.all_mcis[-1].docket != self.current_docket
-                or self.all_mcis[-1].address != self.current_address
-                or self.all_mcis[-1].work_item != self.current_work_item
-            )
+            and self.last_mci is not None
+            and self.last_mci != current_mci
         )
 
         should_add_property_mci = (
@@ -112,15 +402,44 @@ class MciFileProcessor:
         )
 
         if should_add_property_mci and self.current_docket and self.current_address:
-            self.all_mcis.append(
-                PropertyMci(
-                    address=self.current_address,
-                    docket=self.current_docket,
-                    work_item=self.current_work_item,
-                )
+            self.last_mci = (
+                self.current_address,
+                self.current_docket,
+                self.current_work_item,
             )
+            self.mci_count += 1
+            if self.table is not None:
+                self.table.append(*self.last_mci)
+            else:
+                self.pending_mcis.append(
+                    PropertyMci(
+                        address=self.current_address,
+                        docket=self.current_docket,
+                        work_item=self.current_work_item,
+                    )
+                )
         self.current_work_item = None
 
+    def to_amount(
+        self, amount: str | None, *, shared: bool = False
+    ) -> str | Decimal | None:
+        """
+        Normalizes a printed amount, or converts it to a Decimal with cents when
+        typed values are requested. A missing amount is "" as a string and None when typed.
+        Amounts repeated across many records are shared.
+        """
+        if self.extraction.typed_values:
+            return parse_amount(normalize_data(amount)) if amount else None
+        if not amount:
+            return ""
+        return intern_data(amount) if shared else normalize_data(amount)
+
+    def to_closing_date(self, closing_date: str) -> str | date | None:
+        """Normalizes a printed closing date, or converts it to a date when typed values are requested"""
+        if self.extraction.typed_values:
+            return cached_closing_date(normalize_data(closing_date))
+        return intern_data(closing_date)
+
     def set_street_address(self, line_matches: re.Match[str]) -> None:
         """Sets the street Address"""
         self.current_address = Address(street_address=line_matches.group(0))
@@ -138,17 +457,18 @@ class MciFileProcessor:
             close_code,
             mci_per_room,
         ) = line_matches.groups()
-        self.current_address.neighborhood = normalize_data(neighborhood)
-        self.current_address.county = self.current_county
-        self.current_address.zip_code = normalize_data(zip_code)
+        self.current_address = replace(
+            self.current_address,
+            neighborhood=intern_data(neighborhood),
+            county=self.current_county,
+            zip_code=intern_data(zip_code),
+        )
         self.current_docket = Docket(
             docket_number=normalize_data(docket_no),
-            case_status=normalize_data(case_status),
-            close_code=normalize_data(close_code),
-            closing_date=normalize_data(closing_date),
-            monthly_mci_incr_per_room=normalize_data(mci_per_room)
-            if mci_per_room
-            else "",
+            case_status=intern_data(case_status),
+            close_code=intern_data(close_code),
+            closing_date=self.to_closing_date(closing_date),
+            monthly_mci_incr_per_room=self.to_amount(mci_per_room, shared=True),
         )
 
     def set_docket(self, line_matches: re.Match[str]) -> None:
@@ -163,12 +483,10 @@ class MciFileProcessor:
 
         self.current_docket = Docket(
             docket_number=normalize_data(docket_no),
-            case_status=normalize_data(case_status),
-            close_code=normalize_data(close_code),
-            closing_date=normalize_data(closing_date),
-            monthly_mci_incr_per_room=normalize_data(mci_per_room)
-            if mci_per_room
-            else "",
+            case_status=intern_data(case_status),
+            close_code=intern_data(close_code),
+            closing_date=self.to_closing_date(closing_date),
+            monthly_mci_incr_per_room=self.to_amount(mci_per_room, shared=True),
         )
 
     def set_work_line(self, line_matches: re.Match[str]) -> None:
@@ -176,14 +494,14 @@ class MciFileProcessor:
         mci_work, claim_cost, allow_cost = line_matches.groups()
 
         self.current_work_item = WorkItem(
-            mci_work=normalize_data(mci_work),
-            claim_cost=normalize_data(claim_cost),
-            allow_cost=normalize_data(allow_cost) if allow_cost is not None else "",
+            mci_work=intern_data(mci_work),
+            claim_cost=self.to_amount(claim_cost),
+            allow_cost=self.to_amount(allow_cost),
         )
 
     def set_page_county(self, line_matches: re.Match[str]) -> None:
         """To check county tallies, we set the current county being recorded"""
-        self.current_county = line_matches.group(1)
+        self.current_county = sys.intern(line_matches.group(1))
 
     def increment_county_count(self) -> None:
         """Increments the county count for each new address"""
@@ -220,18 +538,122 @@ class MciFileProcessor:
         Processes all pages of pdf to construct a list of PropertyMCIs
         :return: List of PropertyMCIs derived from file
         """
-        lines = get_lines_from_file(self.filepath)
+        return list(self.iter_mcis())
 
-        for line in lines:
-            self.process_line(line)
-        return self.all_mcis
+    def fill_table(self) -> MciTable:
+        """
+        Processes all pages of pdf into the columns of an MciTable,
+        without building a PropertyMCI for each row
+        :return: Table of MCIs derived from file
+        """
+        if self.table is None:
+            self.table = MciTable()
+        for _ in self.iter_processed_lines():
+            pass
+        return self.table
+
+    def __iter__(self) -> Iterator[PropertyMci]:
+        return self.iter_mcis()
+
+    def iter_mcis(self, hooks: ParseHooks | None = None) -> Iterator[PropertyMci]:
+        """
+        Processes all pages of pdf, yielding each PropertyMCI as soon as it is finalised.
+        Only the previous PropertyMCI is retained, so memory does not grow with the report.
+        :param hooks: Hooks taking part in extracting and processing each line
+        """
+        for _ in self.iter_processed_lines(hooks=hooks):
+            if self.pending_mcis:
+                yield from self.pending_mcis
+                self.pending_mcis.clear()
+
+    def iter_checkpointed_mcis(
+        self, interval: int, resume_from: ParseCheckpoint | None = None
+    ) -> Iterator[PropertyMci | ParseCheckpoint]:
+        """
+        Yields each PropertyMCI as iter_mcis does, and a checkpoint of the parse state
+        every interval lines, once every PropertyMCI before it has been yielded.
+        :param resume_from: Checkpoint of an earlier parse of the file, whose state is
+            restored and whose lines are skipped rather than processed again
+        """
+        start_line = 0
+        if resume_from:
+            self.restore(resume_from)
+            start_line = resume_from.line_number
+        for line_number in self.iter_processed_lines(start_line):
+            if self.pending_mcis:
+                yield from self.pending_mcis
+                self.pending_mcis.clear()
+            if line_number % interval == 0:
+                yield self.checkpoint(line_number)
+
+    def iter_processed_lines(
+        self, start_line: int = 0, hooks: ParseHooks | None = None
+    ) -> Iterator[int]:
+        """
+        Processes the lines of the file in turn, yielding the number of each one
+        :param start_line: Number of lines at the start of the file to skip
+        :param hooks: Hooks taking part in extracting and processing each line
+        :raises MciParseError: with the line number and preceding lines of a line
+            which fails to parse
+        """
+        context: deque[str] = deque(maxlen=CONTEXT_LINES)
+        lines = iter_lines_from_file(self.filepath, self.extraction, start_line)
+        process_line = self.process_line
+        if hooks:
+            lines = hooks.iter_extracted(lines)
+            process_line = partial(hooks.process_line, self)
+        for line_number, line in enumerate(lines, start=start_line + 1):
+            try:
+                process_line(line)
+            except Exception as error:
+                raise MciParseError(
+                    self.filepath, line_number, line, list(context), str(error)
+                ) from error
+            context.append(line)
+            yield line_number
+
+    def checkpoint(self, line_number: int) -> ParseCheckpoint:
+        """
+        Captures the parse state after line_number lines.
+        PropertyMCIs which are pending are not part of the state, so they must have been emitted.
+        """
+        if self.pending_mcis:
+            raise Exception("Cannot checkpoint while PropertyMCIs are pending")
+        return ParseCheckpoint(
+            line_number=line_number,
+            mci_count=self.mci_count,
+            fsm_state=self.fsm_state.name,
+            current_county=self.current_county,
+            county_counts=list(self.county_counts.items()),
+            current_address=self.current_address,
+            current_docket=self.current_docket,
+            current_work_item=self.current_work_item,
+            last_mci=self.last_mci,
+        )
+
+    def restore(self, checkpoint: ParseCheckpoint) -> None:
+        """Restores the parse state captured by checkpoint"""
+        self.fsm_state = FsmState[checkpoint.fsm_state]
+        self.mci_count = checkpoint.mci_count
+        self.current_county = checkpoint.current_county
+        self.county_counts = defaultdict(int, checkpoint.county_counts)
+        self.current_address = checkpoint.current_address
+        self.current_docket = checkpoint.current_docket
+        self.current_work_item = checkpoint.current_work_item
+        self.last_mci = checkpoint.last_mci
+        self.pending_mcis.clear()
 
     def process_line(self, line: str) -> None:
         """
         Processes each line of pdf in order to build a PropertyMCI and add it to internal list
         """
         line_type, line_matches = get_line_type_and_matches(line)
+        self.process_classified_line(line, line_type, line_matches)
 
+    def process_classified_line(
+        self, line: str, line_type: LineType, line_matches: re.Match[str] | None
+    ) -> None:
+        """Updates the parse state with a line whose type has already been determined"""
         if (
             line_type
             in [
@@ -296,3 +718,42 @@ class MciFileProcessor:
 
             case _:
                 raise Exception(f"Unexpected line type encountered. Line is ${line}")
+
+
+@dataclass
+class ParsedReport:
+    """PropertyMCIs of a report, with the number of cases counted in each county"""
+
+    mcis: list[PropertyMci]
+    # Cases counted before any county header are counted under None
+    county_counts: dict[str | None, int]
+    # Wall time taken to parse the report
+    parse_seconds: float = 0.0
+
+    def __iter__(self) -> Iterator[PropertyMci]:
+        return iter(self.mcis)
+
+
+def parse_mci_report(
+    filepath: str, extraction: ExtractionOptions = DEFAULT_EXTRACTION
+) -> ParsedReport:
+    """
+    Parses a single report into its PropertyMCIs and county case counts.
+    Module-level so that it can be dispatched to worker processes.
+    """
+    started = time.perf_counter()
+    processor = MciFileProcessor(filepath, extraction)
+    mcis = processor.process_file()
+    return ParsedReport(
+        mcis, dict(processor.county_counts), time.perf_counter() - started
+    )
+
+
+def parse_mci_table(
+    filepath: str, extraction: ExtractionOptions = DEFAULT_EXTRACTION
+) -> MciTable:
+    """
+    Parses a single report into an MciTable.
+    Module-level so that it can be dispatched to worker processes.
+    """
+    return MciFileProcessor(filepath, extraction).fill_table()
@@ -0,0 +1 @@
+"""Initializes MciTable directory"""
@@ -0,0 +1,206 @@
+"""Columnar table of MCIs, filled without building a PropertyMci per row"""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from datetime import date
+    from decimal import Decimal
+
+    from src.PropertyMci.address import Address
+    from src.PropertyMci.docket import Docket
+    from src.PropertyMci.work_item import WorkItem
+
+# Costs are stored as whole cents; a missing cost is stored as MISSING_CENTS
+MISSING_CENTS = -1
+# Columns in output row order, after report_file and report_month
+STRING_COLUMNS = (
+    "street_address",
+    "neighborhood",
+    "zip_code",
+    "county",
+    "docket_number",
+    "case_status",
+    "closing_date",
+    "close_code",
+    "monthly_mci_incr_per_room",
+    "name",
+)
+COST_COLUMNS = ("claim_cost", "allow_cost")
+
+
+def to_cents(cost: str | Decimal | None) -> int:
+    """Converts a printed cost such as "41500.00", or a parsed Decimal, to whole cents"""
+    if cost is None or cost == "":
+        return MISSING_CENTS
+    cost = str(cost)
+    dollars, _, cents = cost.partition(".")
+    if len(cents) != 2:  # noqa: PLR2004
+        raise Exception(f"Cost {cost} does not have two decimal places")
+    # The report may print costs below a dollar without a leading zero, such as ".50"
+    return int(dollars or 0) * 100 + int(cents)
+
+
+def format_cents(cents: int) -> str:
+    """Formats whole cents as the report prints them"""
+    if cents == MISSING_CENTS:
+        return ""
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+class DictionaryColumn:
+    """
+    String column which stores each distinct value once, and an integer code per row.
+    Filtering and grouping compare codes instead of strings.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.values: list[str] = []
+        self.index: dict[str, int] = {}
+        self.codes: array[int] = array("I")
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+    def __iter__(self) -> Iterator[str]:
+        values = self.values
+        return (values[code] for code in self.codes)
+
+    def append(self, value: str | date | Decimal | None) -> None:
+        """Appends value to column as a string, treating None as an empty string"""
+        value = "" if value is None else str(value)
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def code_of(self, value: str) -> int | None:
+        """Returns code of value, or None if no row has it"""
+        return self.index.get(value)
+
+    def take(self, rows: Iterable[int]) -> DictionaryColumn:
+        """
+        Returns a column of the given rows, sharing this column's dictionary.
+        The returned column is only meant to be read.
+        """
+        column = DictionaryColumn()
+        column.values = self.values
+        column.index = self.index
+        codes = self.codes
+        column.codes = array("I", (codes[row] for row in rows))
+        return column
+
+
+class MciTable:
+    """
+    MCIs of a report stored as columns.
+    String columns are dictionary encoded and costs are arrays of cents, so the table
+    holds no object per row and supports filtering and aggregation over plain arrays.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.strings = {name: DictionaryColumn() for name in STRING_COLUMNS}
+        self.costs: dict[str, array[int]] = {name: array("q") for name in COST_COLUMNS}
+        # Printed costs which format_cents does not reproduce, such as "000000.00",
+        # keyed by row so that the table still exports exactly what the report printed
+        self.printed_costs: dict[str, dict[int, str]] = {
+            name: {} for name in COST_COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return len(self.costs["claim_cost"])
+
+    def append(
+        self, address: Address, docket: Docket, work_item: WorkItem | None
+    ) -> None:
+        """Appends the MCI of address and docket for work_item as a row"""
+        strings = self.strings
+        strings["street_address"].append(address.street_address)
+        strings["neighborhood"].append(address.neighborhood)
+        strings["zip_code"].append(address.zip_code)
+        strings["county"].append(address.county)
+        strings["docket_number"].append(docket.docket_number)
+        strings["case_status"].append(docket.case_status)
+        strings["closing_date"].append(docket.closing_date)
+        strings["close_code"].append(docket.close_code)
+        strings["monthly_mci_incr_per_room"].append(docket.monthly_mci_incr_per_room)
+        strings["name"].append(work_item.mci_work if work_item else None)
+        self.append_cost("claim_cost", work_item.claim_cost if work_item else None)
+        self.append_cost("allow_cost", work_item.allow_cost if work_item else None)
+
+    def append_cost(self, name: str, cost: str | Decimal | None) -> None:
+        """Appends cost to a cost column in cents"""
+        cents = to_cents(cost)
+        printed = "" if cost is None else str(cost)
+        if printed != format_cents(cents):
+            self.printed_costs[name][len(self.costs[name])] = printed
+        self.costs[name].append(cents)
+
+    def iter_printed_costs(self, name: str) -> Iterator[str]:
+        """Yields a cost column formatted as the report printed it"""
+        printed = self.printed_costs[name]
+        for row, cents in enumerate(self.costs[name]):
+            yield printed[row] if row in printed else format_cents(cents)
+
+    def where(self, column: str, value: str) -> list[int]:
+        """Returns the rows whose string column equals value"""
+        code = self.strings[column].code_of(value)
+        if code is None:
+            return []
+        return [
+            row
+            for row, row_code in enumerate(self.strings[column].codes)
+            if row_code == code
+        ]
+
+    def take(self, rows: Iterable[int]) -> MciTable:
+        """Returns a table of the given rows"""
+        rows = list(rows)
+        table = MciTable()
+        table.strings = {
+            name: column.take(rows) for name, column in self.strings.items()
+        }
+        table.costs = {
+            name: array("q", (cents[row] for row in rows))
+            for name, cents in self.costs.items()
+        }
+        table.printed_costs = {
+            name: {
+                new_row: printed[row]
+                for new_row, row in enumerate(rows)
+                if row in printed
+            }
+            for name, printed in self.printed_costs.items()
+        }
+        return table
+
+    def total_cents(self, cost: str) -> int:
+        """Sums a cost column, skipping missing costs"""
+        return sum(cents for cents in self.costs[cost] if cents != MISSING_CENTS)
+
+    def total_cents_by(self, column: str, cost: str) -> dict[str, int]:
+        """Sums a cost column for each value of a string column, skipping missing costs"""
+        grouped = self.strings[column]
+        totals: dict[int, int] = {}
+        for code, cents in zip(grouped.codes, self.costs[cost], strict=True):
+            if cents != MISSING_CENTS:
+                totals[code] = totals.get(code, 0) + cents
+        return {grouped.values[code]: total for code, total in totals.items()}
+
+    def iter_rows(
+        self, report_file: str, report_month: str
+    ) -> Iterator[tuple[str, ...]]:
+        """Yields the output rows of the table, formatted as in the csv"""
+        string_columns = [iter(self.strings[name]) for name in STRING_COLUMNS]
+        cost_columns = [self.iter_printed_costs(name) for name in COST_COLUMNS]
+        for values in zip(*string_columns, *cost_columns, strict=True):
+            yield (report_file, report_month, *values)
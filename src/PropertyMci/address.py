@@ -1,9 +1,29 @@
 """Street address of property"""
 
 from dataclasses import dataclass
+import re
 
+# Spellings which the reports use interchangeably in street addresses
+STREET_WORD_ABBREVIATIONS = {
+    "AVENUE": "AVE",
+    "BOULEVARD": "BLVD",
+    "COURT": "CT",
+    "DRIVE": "DR",
+    "EAST": "E",
+    "LANE": "LN",
+    "NORTH": "N",
+    "PARKWAY": "PKWY",
+    "PLACE": "PL",
+    "ROAD": "RD",
+    "SOUTH": "S",
+    "STREET": "ST",
+    "TERRACE": "TER",
+    "WEST": "W",
+}
+STREET_PUNCTUATION = re.compile(r"[^A-Z0-9 ]+")
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Address:
     """Street address of property"""
 
@@ -11,3 +31,12 @@ class Address:
     neighborhood: str | None = None
     county: str | None = None
     zip_code: str | None = None
+
+
+def normalize_street_address(street_address: str | None) -> str:
+    """
+    Returns a key under which spellings of the same street address match:
+    upper case, without punctuation, with single spaces and abbreviated street words.
+    """
+    words = STREET_PUNCTUATION.sub(" ", (street_address or "").upper()).split()
+    return " ".join(STREET_WORD_ABBREVIATIONS.get(word, word) for word in words)
@@ -1,14 +1,17 @@
 """Court docket"""
 
 from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Docket:
     """Court docket"""
 
     docket_number: str
     case_status: str
     close_code: str
-    closing_date: str
-    monthly_mci_incr_per_room: str | None
+    # Printed strings, or date and Decimal when parsed with typed values
+    closing_date: str | date | None
+    monthly_mci_incr_per_room: str | Decimal | None
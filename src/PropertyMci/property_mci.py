@@ -7,7 +7,7 @@ from src.PropertyMci.docket import Docket
 from src.PropertyMci.work_item import WorkItem
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PropertyMci:
     """MCI Work Item for Property Location and Docket"""
 
@@ -0,0 +1,31 @@
+"""Typed values of fields which the report prints as text"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+CLOSING_DATE_FORMAT = "%m/%d/%Y"
+CENTS = Decimal("0.01")
+
+
+def parse_amount(value: str | Decimal | None) -> Decimal | None:
+    """
+    Converts a printed amount such as "41500.00" or "22" to a Decimal with cents.
+    Returns None when the value is missing, and an already parsed value unchanged.
+    """
+    if isinstance(value, Decimal):
+        return value
+    if not value:
+        return None
+    return Decimal(value).quantize(CENTS)
+
+
+def parse_closing_date(value: str | date | None) -> date | None:
+    """
+    Converts a printed MM/DD/YYYY closing date to a date.
+    Returns None when the value is missing, and an already parsed value unchanged.
+    """
+    if isinstance(value, date):
+        return value
+    if not value:
+        return None
+    return datetime.strptime(value, CLOSING_DATE_FORMAT).date()
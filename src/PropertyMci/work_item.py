@@ -1,12 +1,14 @@
 """MCI Work Item"""
 
 from dataclasses import dataclass
+from decimal import Decimal
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class WorkItem:
     """Work description and costs"""
 
     mci_work: str
-    claim_cost: str
-    allow_cost: str
+    # Printed strings, or Decimal when parsed with typed values
+    claim_cost: str | Decimal | None
+    allow_cost: str | Decimal | None
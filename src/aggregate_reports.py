@@ -0,0 +1,309 @@
+"""Aggregates parsed MCIs by county, neighborhood, work type or month"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+from dataclasses import dataclass
+from decimal import Decimal
+import logging
+import os
+import pathlib
+import sys
+from typing import TYPE_CHECKING, TextIO
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency, only needed here
+    np = None
+
+from src.MciTable.mci_table import COST_COLUMNS, STRING_COLUMNS, MciTable
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+    from src.MciTable.mci_table import DictionaryColumn
+
+BASE_DIR = pathlib.Path(__file__).parent.parent
+CSV_INPUT_FILEPATH = os.path.join(BASE_DIR, "output", "mci_output.csv")
+GROUP_COLUMNS = (
+    "report_month",
+    "county",
+    "neighborhood",
+    "zip_code",
+    "name",
+    "case_status",
+    "close_code",
+)
+AGGREGATE_COLUMNS = (
+    "mcis",
+    "dockets",
+    "claim_cost",
+    "allow_cost",
+    "allowed_share",
+    "incr_per_room_mean",
+    "incr_per_room_median",
+    "incr_per_room_max",
+)
+
+
+@dataclass
+class MciColumns:
+    """Parsed output held as NumPy arrays, one entry per row"""
+
+    # Grouping columns as arrays of strings
+    keys: dict[str, npt.NDArray[np.str_]]
+    # Identifies the docket of each row, so per-docket values are only counted once
+    dockets: npt.NDArray[np.str_]
+    # Costs in cents, MISSING_CENTS (-1) where missing
+    claim_cents: npt.NDArray[np.int64]
+    allow_cents: npt.NDArray[np.int64]
+    # Monthly increase per room, NaN where missing
+    incr_per_room: npt.NDArray[np.float64]
+
+    def __len__(self) -> int:
+        return len(self.claim_cents)
+
+
+def require_numpy() -> None:
+    """Aggregation requires numpy"""
+    if np is None:
+        raise Exception(
+            "Aggregating reports requires numpy: pip install 'mci_data[analysis]'"
+        )
+
+
+def read_mci_tables(csv_path: str) -> dict[tuple[str, str], MciTable]:
+    """
+    Reads parsed output csv into an MciTable per report, keyed by report file and month.
+    Header lines repeated within the csv, which earlier versions wrote on every run,
+    are skipped, as are rows without one value per column.
+    """
+    tables: dict[tuple[str, str], MciTable] = {}
+    with open(csv_path, newline="") as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader, None)
+        if header is None:
+            return tables
+        position = {name: index for index, name in enumerate(header)}
+        strings = [(name, position[name]) for name in STRING_COLUMNS]
+        costs = [(name, position[name]) for name in COST_COLUMNS]
+        skipped = 0
+        for row in reader:
+            if row == header:
+                continue
+            if len(row) != len(header):
+                skipped += 1
+                continue
+            key = (row[position["report_file"]], row[position["report_month"]])
+            table = tables.get(key)
+            if table is None:
+                table = tables[key] = MciTable()
+            for name, index in strings:
+                table.strings[name].append(row[index])
+            for name, index in costs:
+                table.append_cost(name, row[index])
+    if skipped:
+        logging.warning("Skipped %d malformed rows of %s", skipped, csv_path)
+    return tables
+
+
+def column_array(column: DictionaryColumn) -> npt.NDArray[np.str_]:
+    """Decodes a dictionary encoded column into an array of strings"""
+    values = np.array(column.values, dtype=np.str_)
+    return values[np.frombuffer(column.codes, dtype=np.uintc)]
+
+
+def concatenate(
+    parts: list[npt.NDArray[np.generic]], dtype: type[np.generic]
+) -> npt.NDArray[np.generic]:
+    return np.concatenate(parts) if parts else np.array([], dtype=dtype)
+
+
+def load_mci_columns(csv_path: str) -> MciColumns:
+    """Reads parsed output csv into columns"""
+    require_numpy()
+    tables = read_mci_tables(csv_path)
+    strings: dict[str, list[npt.NDArray[np.str_]]] = {
+        name: [] for name in (*STRING_COLUMNS, "report_file", "report_month")
+    }
+    costs: dict[str, list[npt.NDArray[np.int64]]] = {name: [] for name in COST_COLUMNS}
+    for (report_file, report_month), table in tables.items():
+        for name, column in table.strings.items():
+            strings[name].append(column_array(column))
+        strings["report_file"].append(np.full(len(table), report_file))
+        strings["report_month"].append(np.full(len(table), report_month))
+        for name, cents in table.costs.items():
+            costs[name].append(np.frombuffer(cents, dtype=np.longlong))
+    by_name = {name: concatenate(parts, np.str_) for name, parts in strings.items()}
+    incr = by_name["monthly_mci_incr_per_room"]
+    return MciColumns(
+        keys={name: by_name[name] for name in GROUP_COLUMNS},
+        dockets=np.char.add(
+            by_name["report_file"], np.char.add("/", by_name["docket_number"])
+        ),
+        claim_cents=concatenate(costs["claim_cost"], np.int64).astype(np.int64),
+        allow_cents=concatenate(costs["allow_cost"], np.int64).astype(np.int64),
+        incr_per_room=np.where(incr == "", "nan", incr).astype(np.float64),
+    )
+
+
+def group_codes(
+    columns: MciColumns, by: list[str]
+) -> tuple[list[tuple[str, ...]], npt.NDArray[np.intp]]:
+    """
+    Assigns each row the code of its group.
+    :return: Key values of each group, and the group code of each row
+    """
+    combined = np.zeros(len(columns), dtype=np.int64)
+    uniques: list[npt.NDArray[np.str_]] = []
+    for name in by:
+        values, codes = np.unique(columns.keys[name], return_inverse=True)
+        combined = combined * len(values) + codes
+        uniques.append(values)
+    group_ids, row_groups = np.unique(combined, return_inverse=True)
+
+    keys: list[tuple[str, ...]] = []
+    for group_id in group_ids.tolist():
+        key: list[str] = []
+        remainder = group_id
+        for values in reversed(uniques):
+            remainder, code = divmod(remainder, len(values))
+            key.append(str(values[code]))
+        keys.append(tuple(reversed(key)))
+    return keys, row_groups
+
+
+def grouped_sum(
+    row_groups: npt.NDArray[np.intp], group_count: int, cents: npt.NDArray[np.int64]
+) -> npt.NDArray[np.int64]:
+    """Sums cents per group, skipping missing costs"""
+    totals = np.bincount(
+        row_groups, weights=np.where(cents >= 0, cents, 0), minlength=group_count
+    )
+    return np.rint(totals).astype(np.int64)
+
+
+def grouped_median(
+    groups: npt.NDArray[np.intp], values: npt.NDArray[np.float64], group_count: int
+) -> npt.NDArray[np.float64]:
+    """Median of values per group, NaN for groups without values"""
+    order = np.lexsort((values, groups))
+    sorted_groups, sorted_values = groups[order], values[order]
+    counts = np.bincount(sorted_groups, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    medians = np.full(group_count, np.nan)
+    has_values = counts > 0
+    lower = starts + (counts - 1) // 2
+    upper = starts + counts // 2
+    medians[has_values] = (
+        sorted_values[lower[has_values]] + sorted_values[upper[has_values]]
+    ) / 2
+    return medians
+
+
+def aggregate(columns: MciColumns, by: list[str]) -> list[dict[str, object]]:
+    """
+    Computes totals and per room increase statistics for each group of rows.
+    Dockets and increase statistics count each docket once per group, since every
+    work item of a docket repeats its increase.
+    """
+    require_numpy()
+    keys, row_groups = group_codes(columns, by)
+    group_count = len(keys)
+    mcis = np.bincount(row_groups, minlength=group_count)
+    claim = grouped_sum(row_groups, group_count, columns.claim_cents)
+    allow = grouped_sum(row_groups, group_count, columns.allow_cents)
+
+    # First row of each docket within each group
+    _, docket_codes = np.unique(columns.dockets, return_inverse=True)
+    _, first_rows = np.unique(
+        docket_codes.astype(np.int64) * group_count + row_groups, return_index=True
+    )
+    dockets = np.bincount(row_groups[first_rows], minlength=group_count)
+    incr = columns.incr_per_room[first_rows]
+    has_incr = ~np.isnan(incr)
+    incr_groups = row_groups[first_rows][has_incr]
+    incr = incr[has_incr]
+    incr_counts = np.bincount(incr_groups, minlength=group_count)
+    incr_sums = np.bincount(incr_groups, weights=incr, minlength=group_count)
+    incr_max = np.full(group_count, -np.inf)
+    np.maximum.at(incr_max, incr_groups, incr)
+    incr_median = grouped_median(incr_groups, incr, group_count)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        allowed_share = allow / claim
+        incr_mean = incr_sums / incr_counts
+
+    aggregates: list[dict[str, object]] = []
+    for group, key in enumerate(keys):
+        row: dict[str, object] = dict(zip(by, key, strict=True))
+        has_group_incr = bool(incr_counts[group])
+        row.update(
+            {
+                "mcis": int(mcis[group]),
+                "dockets": int(dockets[group]),
+                "claim_cost": Decimal(int(claim[group])).scaleb(-2),
+                "allow_cost": Decimal(int(allow[group])).scaleb(-2),
+                "allowed_share": float(allowed_share[group]) if claim[group] else None,
+                "incr_per_room_mean": float(incr_mean[group])
+                if has_group_incr
+                else None,
+                "incr_per_room_median": float(incr_median[group])
+                if has_group_incr
+                else None,
+                "incr_per_room_max": float(incr_max[group]) if has_group_incr else None,
+            }
+        )
+        aggregates.append(row)
+    return aggregates
+
+
+def write_aggregates(
+    aggregates: list[dict[str, object]], by: list[str], output: TextIO
+) -> None:
+    """Writes aggregates as csv"""
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow([*by, *AGGREGATE_COLUMNS])
+    for row in aggregates:
+        writer.writerow(
+            [
+                f"{value:.4f}" if isinstance(value, float) else value
+                for value in (row[column] for column in (*by, *AGGREGATE_COLUMNS))
+            ]
+        )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses command line options"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--by",
+        action="append",
+        choices=GROUP_COLUMNS,
+        help="Column to group by; repeat to group by several (default: county)",
+    )
+    parser.add_argument(
+        "--input",
+        default=CSV_INPUT_FILEPATH,
+        help="Parsed output csv (default: output/mci_output.csv)",
+    )
+    parser.add_argument(
+        "--output", help="File to write aggregates to (default: standard output)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    by = args.by or ["county"]
+    aggregates = aggregate(load_mci_columns(args.input), by)
+    if args.output:
+        with open(args.output, "w", newline="") as output:
+            write_aggregates(aggregates, by, output)
+    else:
+        write_aggregates(aggregates, by, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
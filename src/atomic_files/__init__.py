@@ -0,0 +1 @@
+"""Initializes atomic_files directory"""
@@ -0,0 +1,21 @@
+"""Publishes files written under a temporary name, so readers never see a partial file"""
+
+import os
+from pathlib import Path
+
+# Read once at import, as the umask can only be read by setting it, which is not
+# safe once other threads may be creating files
+UMASK = os.umask(0o022)
+os.umask(UMASK)
+
+
+def replace_file(temp_path: str, path: str | os.PathLike[str]) -> None:
+    """
+    Renames a complete temporary file over path.
+    mkstemp creates files readable by their owner only, so the file is first given
+    the permissions open() would have given it, keeping it readable by other users
+    such as the services consuming it.
+    """
+    temp_file = Path(temp_path)
+    temp_file.chmod(0o666 & ~UMASK)
+    temp_file.replace(path)
@@ -5,6 +5,7 @@ import pathlib
 import sys
 
 from src.lines.lines import is_well_formed_line
+from src.MciFileProcessor.mci_file_processor import iter_txt_lines
 
 BASE_DIR = pathlib.Path(__file__).parent.parent.parent
 INPUT_DOCUMENT_BASE_DIR = os.path.join(BASE_DIR, "data", "DirectFeed")
@@ -12,19 +13,21 @@ DEFAULT_INPUT_FILENAME = "DirectFeed-12-february-2026-mci-closed-case-report.txt
 
 
 def check_ocr_file(filepath: str) -> None:
-    """Determines what proportion of OCR files have well-formed strings"""
-    with open(filepath) as ocr:
-        lines = ocr.readlines()
-        total_lines = len(lines)
-        well_formed_lines = 0
-        for line in lines:
-            if not is_well_formed_line(line):
-                print("Bad line: " + line)
-            else:
-                well_formed_lines += 1
-        print(
-            f"Well-formed: {well_formed_lines}. Total: {total_lines}. Accuracy:{well_formed_lines / total_lines}"
-        )
+    """
+    Determines what proportion of OCR files have well-formed strings.
+    Lines are streamed rather than read into a list, so large feeds fit in memory.
+    """
+    total_lines = 0
+    well_formed_lines = 0
+    for line in iter_txt_lines(filepath):
+        total_lines += 1
+        if not is_well_formed_line(line):
+            print("Bad line: " + line)
+        else:
+            well_formed_lines += 1
+    print(
+        f"Well-formed: {well_formed_lines}. Total: {total_lines}. Accuracy:{well_formed_lines / total_lines}"
+    )
 
 
 if __name__ == "__main__":
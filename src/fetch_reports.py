@@ -1,19 +1,43 @@
 """Fetches report files from NYS government site"""
 
-from dataclasses import dataclass
+import argparse
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
 import logging
+import os
 from pathlib import Path
 import re
+import tempfile
+import threading
 import unicodedata
+from urllib.parse import urlsplit
 
 from bs4 import BeautifulSoup
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.atomic_files.atomic_files import replace_file
+from src.text_cache.text_cache import hash_file
 
 # Identify our scraper politely when making HTTP requests.
 USER_AGENT = "MCI-Scraper/0.1"
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 LISTING_URL = "https://hcr.ny.gov/office-rent-administration-transparency-initiative"
+DOWNLOAD_WORKERS = 4
+# Politeness limit: concurrent requests to any one host
+MAX_CONNECTIONS_PER_HOST = 2
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 1.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Validators and content hash of each downloaded report, kept alongside the reports
+DOWNLOAD_STATE_FILENAME = ".download_state.json"
 REPORT_TEXT_PATTERN = re.compile(
     r"(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}\s+MCI Closed Case Report",
     re.IGNORECASE,
@@ -35,9 +59,119 @@ class ReportLink:
         return f"{slug}.pdf" if not slug.endswith(".pdf") else slug
 
 
-def fetch_listing_html() -> str:
+@dataclass
+class HostLimits:
+    """Bounds the number of concurrent requests made to each host."""
+
+    max_per_host: int = MAX_CONNECTIONS_PER_HOST
+    semaphores: dict[str, threading.BoundedSemaphore] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @contextmanager
+    def limit(self, url: str) -> Iterator[None]:
+        """Waits until a request to the host of url may be made."""
+        host = urlsplit(url).netloc
+        with self.lock:
+            semaphore = self.semaphores.setdefault(
+                host, threading.BoundedSemaphore(self.max_per_host)
+            )
+        with semaphore:
+            yield
+
+
+@dataclass
+class DownloadRecord:
+    """What was last downloaded for a report, used to make conditional requests."""
+
+    url: str
+    sha256: str
+    size: int
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Headers asking the server to reply 304 Not Modified if the report is unchanged."""
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class DownloadState:
+    """
+    Download records of every report, persisted as JSON in the data directory.
+    Records are saved as soon as they change, so an interrupted run keeps what it fetched.
+    """
+
+    path: Path
+    records: dict[str, DownloadRecord] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @classmethod
+    def load(cls, path: Path) -> "DownloadState":
+        """Read state from path, starting empty when there is none."""
+        if not path.exists():
+            return cls(path)
+        with Path.open(path) as state_file:
+            records = json.load(state_file)
+        return cls(
+            path,
+            {
+                filename: DownloadRecord(**record)
+                for filename, record in records.items()
+            },
+        )
+
+    def get(self, filename: str) -> DownloadRecord | None:
+        with self.lock:
+            return self.records.get(filename)
+
+    def set(self, filename: str, record: DownloadRecord) -> None:
+        """Record a download and atomically rewrite the state file."""
+        with self.lock:
+            self.records[filename] = record
+            serialized = {
+                name: asdict(record) for name, record in sorted(self.records.items())
+            }
+            fd, temp_path = tempfile.mkstemp(
+                dir=self.path.parent, prefix=f"{self.path.name}.", suffix=".part"
+            )
+            try:
+                with os.fdopen(fd, "w") as state_file:
+                    json.dump(serialized, state_file, indent=2)
+                replace_file(temp_path, self.path)
+            finally:
+                Path(temp_path).unlink(missing_ok=True)
+
+
+def create_session(pool_size: int = DOWNLOAD_WORKERS) -> requests.Session:
+    """
+    Create a session whose connections are pooled and reused across downloads.
+    Failed requests and throttling responses are retried with exponential backoff.
+    """
+    retry = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_listing_html(session: requests.Session) -> str:
     """Retrieve the transparency initiative page HTML."""
-    response = requests.get(LISTING_URL, headers={"User-Agent": USER_AGENT}, timeout=30)
+    response = session.get(LISTING_URL, timeout=30)
     response.raise_for_status()
     return response.text
 
@@ -70,44 +204,165 @@ def slugify(title: str) -> str:
     return slug or "mci-report"
 
 
-def download_link(link: ReportLink) -> bool:
+def get_validators(response: requests.Response) -> dict[str, str | None]:
+    """ETag and Last-Modified headers of response"""
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def head_content_length(
+    link: ReportLink, session: requests.Session, host_limits: HostLimits
+) -> tuple[str | None, dict[str, str | None]]:
+    """
+    Content-Length and validators of a report, fetched without its body.
+    Both are unknown when the server rejects the HEAD request, as some refuse HEAD.
+    """
+    with host_limits.limit(link.url):
+        response = session.head(link.url, allow_redirects=True, timeout=30)
+    if not response.ok:
+        logging.info("HEAD %s failed with %s", link.url, response.status_code)
+        return None, {}
+    return response.headers.get("Content-Length"), get_validators(response)
+
+
+def adopt_existing_download(
+    link: ReportLink,
+    session: requests.Session,
+    host_limits: HostLimits,
+    state: DownloadState,
+) -> None:
+    """
+    Record validators for a report downloaded before state was kept.
+    They are fetched with a HEAD request and only trusted when the server's
+    Content-Length matches the local file; otherwise the report is downloaded again.
+    """
+    destination = DATA_DIR / link.filename
+    content_length, validators = head_content_length(link, session, host_limits)
+    size = destination.stat().st_size
+    if content_length == str(size):
+        state.set(
+            link.filename,
+            DownloadRecord(link.url, hash_file(str(destination)), size, **validators),
+        )
+
+
+def download_link(
+    link: ReportLink,
+    session: requests.Session,
+    host_limits: HostLimits,
+    state: DownloadState,
+) -> bool:
     """
-    Download a report if it is not already present.
-    Returns True when a new file is written, False otherwise.
+    Download a report if it is new or has changed since it was last downloaded.
+    A report already on disk is requested conditionally with its stored ETag and
+    Last-Modified, so the server replies 304 Not Modified without a body when it is
+    unchanged. Without validators the report is fetched again, and only its SHA-256
+    tells whether it changed, since a corrected report often keeps its size.
+    A report republished with identical bytes is not rewritten.
+    The report is written to a hidden temporary file which is renamed into place once
+    complete, so an interrupted download never leaves a truncated PDF in the data directory.
+    Returns True when a new or changed file is written, False otherwise.
     """
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     destination = DATA_DIR / link.filename
-    if destination.exists():
-        # TODO: use file hashes or Last-Modified headers to detect updated content with same title.
-        logging.info("Skipping %s (already downloaded)", destination.name)
-        return False
-
-    logging.info("Downloading %s -> %s", link.title, destination.name)
-    response = requests.get(
-        link.url, headers={"User-Agent": USER_AGENT}, stream=True, timeout=60
+    record = state.get(link.filename) if destination.exists() else None
+    if destination.exists() and record is None:
+        adopt_existing_download(link, session, host_limits, state)
+        record = state.get(link.filename)
+    headers = record.conditional_headers() if record else {}
+    previous_sha256 = record.sha256 if record else None
+    if record is None and destination.exists():
+        # Not adopted, so the report on disk is compared with what is fetched
+        previous_sha256 = hash_file(str(destination))
+
+    fd, temp_path = tempfile.mkstemp(
+        dir=DATA_DIR, prefix=f".{destination.name}.", suffix=".part"
     )
-    response.raise_for_status()
-    with Path.open(destination, "wb") as output_file:
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with (
+            os.fdopen(fd, "wb") as output_file,
+            host_limits.limit(link.url),
+            session.get(link.url, headers=headers, stream=True, timeout=60) as response,
+        ):
+            if response.status_code == requests.codes.not_modified:
+                logging.info("Skipping %s (not modified)", destination.name)
+                return False
+            response.raise_for_status()
+            logging.info("Downloading %s -> %s", link.title, destination.name)
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                 output_file.write(chunk)
-    return True
+                digest.update(chunk)
+                size += len(chunk)
+        new_record = DownloadRecord(
+            link.url, digest.hexdigest(), size, **get_validators(response)
+        )
+        changed = previous_sha256 != new_record.sha256
+        if changed:
+            replace_file(temp_path, destination)
+        else:
+            logging.info("Skipping %s (republished unchanged)", destination.name)
+        state.set(link.filename, new_record)
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
+    return changed
 
 
-def main() -> None:
-    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
-    html = fetch_listing_html()
-    links = extract_report_links(html)
-    logging.info("Found %d candidate report links", len(links))
+def download_reports(
+    links: list[ReportLink],
+    session: requests.Session,
+    workers: int = DOWNLOAD_WORKERS,
+    on_download: Callable[[ReportLink], None] | None = None,
+) -> int:
+    """
+    Download new and changed reports concurrently in a bounded thread pool.
+    A failed download is logged and does not stop the others.
+    on_download is called from the downloading thread as soon as each new or
+    changed file is in place.
+    Returns the number of new or changed files written.
+    """
+    host_limits = HostLimits()
+    state = DownloadState.load(DATA_DIR / DOWNLOAD_STATE_FILENAME)
 
-    downloaded = 0
-    for link in links:
+    def download(link: ReportLink) -> bool:
         try:
-            if download_link(link):
-                downloaded += 1
-        except Exception as exc:  # pragma: no cover - simple logging
+            downloaded = download_link(link, session, host_limits, state)
+        except Exception as exc:
             logging.error("Failed to download %s: %s", link.title, exc)
-    logging.info("Downloaded %d new files", downloaded)
+            return False
+        if downloaded and on_download:
+            on_download(link)
+        return downloaded
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        return sum(executor.map(download, links))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses command line options"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DOWNLOAD_WORKERS,
+        help=f"Number of reports downloaded concurrently (default: {DOWNLOAD_WORKERS}); "
+        f"at most {MAX_CONNECTIONS_PER_HOST} requests are made to one host at a time",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    with create_session(pool_size=max(args.workers, 1)) as session:
+        html = fetch_listing_html(session)
+        links = extract_report_links(html)
+        logging.info("Found %d candidate report links", len(links))
+        downloaded = download_reports(links, session, args.workers)
+    logging.info("Downloaded %d new or changed files", downloaded)
 
 
 if __name__ == "__main__":
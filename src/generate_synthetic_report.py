@@ -0,0 +1,317 @@
+"""Generates a synthetic MCI closed case report of arbitrary size for scale testing"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+import random
+import sys
+from typing import TYPE_CHECKING, TextIO
+
+from src.regexes.counties import counties
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Relative number of cases per county, and its order in the report, as in the archive
+COUNTY_WEIGHTS = {
+    "NASSAU": 21,
+    "WESTCHESTER": 222,
+    "BRONX": 1379,
+    "KINGS": 1527,
+    "MANHATTAN": 1907,
+    "QUEENS": 1470,
+    "RICHMOND": 14,
+    "ULSTER": 3,
+}
+# Towns printed on borough lines, with the first zip code of their range
+COUNTY_TOWNS = {
+    "NASSAU": (("HEMPSTEAD", 11550), ("FREEPORT", 11520), ("LONG BEACH", 11561)),
+    "WESTCHESTER": (("YONKERS", 10701), ("WHITE PLAINS", 10601), ("MT VERNON", 10550)),
+    "BRONX": (("BRONX", 10451),),
+    "KINGS": (("BROOKLYN", 11201),),
+    "MANHATTAN": (("NEW YORK", 10001),),
+    "QUEENS": (
+        ("FLUSHING", 11354),
+        ("WOODSIDE", 11377),
+        ("LONG ISLAND CITY", 11101),
+        ("JAMAICA", 11432),
+        ("ASTORIA", 11102),
+        ("JACKSON HEIGHTS", 11372),
+    ),
+    "RICHMOND": (("STATEN ISLAND", 10301),),
+    "ULSTER": (("KINGSTON", 12401),),
+}
+# First zip code used for counties without known towns, all of which lie upstate
+UPSTATE_FIRST_ZIP = 12000
+# Most common work items of the archive
+WORK_ITEMS = (
+    "ELEVATOR UPGRADING",
+    "NEW ROOF",
+    "BOILER/BURNER",
+    "EXT/FACADE RESTORATN",
+    "REWIRING",
+    "BOILER",
+    "TV/SECURITY SYSTEM",
+    "INTERCOM",
+    "FACADE",
+    "GAS REPIPING",
+    "POINTNG & WATERPROOF",
+    "SIDEWALK SHED",
+    "WINDOWS",
+    "PARAPETS",
+    "ARCHITECTURAL FEES",
+    "HOT WATER HEATER",
+    "MAIN ENTRANCE DOORS",
+    "ASBESTOS REMOVAL",
+    "CHIMNEY LINER",
+    "BACKFLOW PREVENTER",
+)
+# Close codes, weighted by how often the archive uses them
+CLOSE_CODES = ("GP",) * 12 + ("DE",) * 5 + ("GR",) * 4 + ("VO",)
+STREETS = (
+    "BROADWAY",
+    "GRAND CONCOURSE",
+    "OCEAN AVE",
+    "RIVERSIDE DR",
+    "QUEENS BLVD",
+    "FLATBUSH AVE",
+    "MAIN ST",
+    "JEROME AVE",
+    "OCEAN PKWY",
+    "CENTRAL PARK W",
+)
+PERIOD_START = date(2019, 7, 1)
+PERIOD_END = date(2024, 9, 30)
+PAGE_LINES = 60
+NYS_DIVISION_HEADER = "NYS DIVISION OF HOUSING AND COMMUNITY RENEWAL"
+
+
+@dataclass(frozen=True)
+class SyntheticReportOptions:
+    """Size and content of a synthetic report"""
+
+    # Number of dockets, which the county tallies count
+    cases: int = 1000
+    seed: int = 0
+    # Counties in report order, weighted by their share of the cases
+    county_weights: dict[str, int] = field(default_factory=lambda: dict(COUNTY_WEIGHTS))
+
+
+@dataclass
+class SyntheticReportSummary:
+    """What a synthetic report contains, for checking what is parsed from it"""
+
+    county_counts: dict[str, int] = field(default_factory=dict)
+    # Rows the parser emits: one per work item, or one for a docket without any
+    mcis: int = 0
+    lines: int = 0
+
+
+def split_cases(cases: int, county_weights: dict[str, int]) -> dict[str, int]:
+    """Divides cases between counties in proportion to their weights"""
+    total_weight = sum(county_weights.values())
+    shares = {
+        county: cases * weight // total_weight
+        for county, weight in county_weights.items()
+    }
+    by_weight = sorted(county_weights, key=county_weights.__getitem__, reverse=True)
+    for county in by_weight[: cases - sum(shares.values())]:
+        shares[county] += 1
+    return {county: count for county, count in shares.items() if count}
+
+
+def county_towns(county: str) -> tuple[tuple[str, int], ...]:
+    """
+    Towns of a county with the first zip code of their range. Counties of
+    counties.py without known towns use the county name as their only town.
+    :param county: Upper case county name
+    """
+    return COUNTY_TOWNS.get(county, ((county, UPSTATE_FIRST_ZIP),))
+
+
+def format_date(day: date) -> str:
+    return day.strftime("%m/%d/%Y")
+
+
+def page_header(page: int, county: str) -> list[str]:
+    """Header printed at the top of every page of a county section"""
+    return [
+        f"{NYS_DIVISION_HEADER:>75}{'PAGE':>30}{page:>6}",
+        f"{'OFFICE OF RENT ADMINISTRATION':>70}",
+        "",
+        f"{'MAJOR CAPITAL IMPROVEMENT CASES':>78}",
+        f"{'FOR ' + county + ' COUNTY FROM ':>60}"
+        f"{format_date(PERIOD_START)} TO {format_date(PERIOD_END)}",
+        "",
+        " BLDG ADDRESS                           DOCKET NO      CASE STATUS    "
+        "CLOSING DATE    CLOSE CODE     MONTHLY MCI INCR PER ROOM",
+        " ================================       =========      ===========    "
+        "============    ==========     =========================",
+        f"{'MCI ITEM                CLAIM COST       ALLOW COST':>97}",
+        f"{'--------------------  ------------     ------------':>97}",
+    ]
+
+
+class SyntheticReportWriter:
+    """Builds the lines of a synthetic report, counting cases as the parser does"""
+
+    def __init__(self, options: SyntheticReportOptions) -> None:
+        super().__init__()
+        for county in options.county_weights:
+            if county not in counties:
+                raise Exception(f"Unknown county {county}")
+        self.options = options
+        self.random = random.Random(options.seed)  # noqa: S311 - test data, not secrets
+        self.summary = SyntheticReportSummary()
+        self.dockets = 0
+
+    def docket_number(self, county: str) -> str:
+        self.dockets += 1
+        letter = chr(ord("A") + self.dockets // 1_000_000 % 26)
+        return f"{county[0]}{letter}{self.dockets % 1_000_000:06d}OM"
+
+    def docket_fields(self, county: str) -> str:
+        """Docket number, status, closing date, close code and increase per room"""
+        rand = self.random
+        closing_date = PERIOD_START + timedelta(
+            days=rand.randrange((PERIOD_END - PERIOD_START).days + 1)
+        )
+        increase = f"{rand.uniform(0.5, 40):.2f}" if rand.random() < 0.9 else ""  # noqa: PLR2004
+        return (
+            f"{self.docket_number(county)}          CLOSED      "
+            f"{format_date(closing_date)}            {rand.choice(CLOSE_CODES)}"
+            f"{increase:>22}"
+        ).rstrip()
+
+    def work_lines(self, can_be_empty: bool) -> list[str]:
+        """
+        Work items of a docket, a few of which have none.
+        :param can_be_empty: Whether the docket may have no work items, which the
+        parser only accepts for the last docket of a property
+        """
+        rand = self.random
+        work_item_count = rand.choice((0, 1, 1, 1, 2, 2, 3))
+        if not can_be_empty:
+            work_item_count = max(work_item_count, 1)
+        work_items = rand.sample(WORK_ITEMS, work_item_count)
+        lines: list[str] = []
+        for work_item in work_items:
+            claim = rand.randrange(100_000, 50_000_000)
+            allow = (
+                f"{min(claim, rand.randrange(50_000, 50_000_000)) / 100:.2f}"
+                if rand.random() < 0.9  # noqa: PLR2004
+                else ""
+            )
+            lines.append(
+                f"{'':46}{work_item:<20}{claim / 100:>16.2f}{allow:>17}".rstrip()
+            )
+        self.summary.mcis += max(len(lines), 1)
+        return lines
+
+    def property_lines(self, county: str, cases: int) -> list[str]:
+        """Address of a property followed by up to cases of its dockets"""
+        rand = self.random
+        town, first_zip = rand.choice(county_towns(county))
+        borough = f" {town}, NY  {first_zip + rand.randrange(10):05d}"
+        lines = [f" {rand.randrange(1, 3000)} {rand.choice(STREETS)}"]
+        docket_count = min(cases, rand.choice((1, 1, 1, 1, 2, 3)))
+        for docket in range(docket_count):
+            if docket:
+                lines.extend(["", f"{'':40}{self.docket_fields(county)}"])
+            else:
+                lines.append(f"{borough:<40}{self.docket_fields(county)}")
+            lines.append("")
+            lines.extend(self.work_lines(can_be_empty=docket == docket_count - 1))
+            self.summary.county_counts[county] = (
+                self.summary.county_counts.get(county, 0) + 1
+            )
+        lines.extend(["", "", ""])
+        return lines
+
+    def iter_lines(self) -> Iterator[str]:
+        """Yields the lines of the report without holding more than one property"""
+        page = 0
+        page_lines = PAGE_LINES
+        for county, cases in split_cases(
+            self.options.cases, self.options.county_weights
+        ).items():
+            written = 0
+            page_lines = PAGE_LINES
+            while written < cases:
+                if page_lines >= PAGE_LINES:
+                    page += 1
+                    page_lines = 0
+                    yield from page_header(page, county)
+                lines = self.property_lines(county, cases - written)
+                written = self.summary.county_counts[county]
+                page_lines += len(lines)
+                yield from lines
+            yield f" TOTAL CASES: {cases:>16}"
+            yield from ("", "", "", "", "")
+
+        page += 1
+        yield f"{NYS_DIVISION_HEADER:>75}{'PAGE':>30}{page:>6}"
+        yield f"{'OFFICE OF RENT ADMINISTRATION':>70}"
+        yield ""
+        yield f"{'MAJOR CAPITAL IMPROVEMENT CASES':>78}"
+        yield from ("", "")
+        for county, count in self.summary.county_counts.items():
+            yield f" {county + ':':<20}{count:>11}"
+        yield ""
+        yield f" TOTAL NUMBER OF CASES: {sum(self.summary.county_counts.values()):>6}"
+
+
+def write_synthetic_report(
+    output: TextIO, options: SyntheticReportOptions
+) -> SyntheticReportSummary:
+    """
+    Writes a synthetic report which the parser accepts, with valid county tallies
+    and document total, one line at a time.
+    :return: Counts of what was written
+    """
+    writer = SyntheticReportWriter(options)
+    for line in writer.iter_lines():
+        output.write(line + "\n")
+        writer.summary.lines += 1
+    return writer.summary
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses command line options"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--cases",
+        type=int,
+        default=SyntheticReportOptions.cases,
+        help="Number of dockets in the report (default: 1000)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the random content (default: 0)"
+    )
+    parser.add_argument(
+        "--output",
+        help="Report file to write, named like *-mci-closed-case-report.txt "
+        "(default: standard output)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    options = SyntheticReportOptions(cases=args.cases, seed=args.seed)
+    if args.output:
+        with open(args.output, "w") as output:
+            summary = write_synthetic_report(output, options)
+    else:
+        summary = write_synthetic_report(sys.stdout, options)
+    print(
+        f"{sum(summary.county_counts.values())} cases, {summary.mcis} MCIs, "
+        f"{summary.lines} lines",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Initializes instrumentation directory"""
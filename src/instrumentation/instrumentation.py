@@ -0,0 +1,249 @@
+"""Opt-in timing, line type counts and memory use of each stage of parsing a report"""
+
+from __future__ import annotations
+
+import cProfile
+from dataclasses import asdict, dataclass, field
+import json
+import os
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING
+
+from src.lines.lines import get_line_type_and_matches
+from src.MciFileProcessor.mci_file_processor import (
+    DEFAULT_EXTRACTION,
+    MciFileProcessor,
+    ParseHooks,
+)
+
+try:
+    import resource
+except ImportError:  # resource is only available on Unix
+    resource = None
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+    from src.MciFileProcessor.mci_file_processor import ExtractionOptions
+    from src.PropertyMci.property_mci import PropertyMci
+
+STAGES = ("extract", "classify", "process", "write")
+PROFILE_SUFFIX = ".prof"
+
+
+def get_peak_rss_kb() -> int:
+    """Highest resident set size of this process so far, in KiB (0 where unknown)"""
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@dataclass
+class StageMetrics:
+    """Time spent in a stage, and how much the process's peak RSS grew during it"""
+
+    seconds: float = 0.0
+    calls: int = 0
+    peak_rss_growth_kb: int = 0
+
+
+@dataclass
+class ReportMetrics:
+    """Metrics of parsing and writing a single report"""
+
+    report_file: str
+    report_month: str = ""
+    lines: int = 0
+    rows: int = 0
+    # Number of lines of each LineType, by name
+    line_types: dict[str, int] = field(default_factory=dict)
+    stages: dict[str, StageMetrics] = field(
+        default_factory=lambda: {stage: StageMetrics() for stage in STAGES}
+    )
+    seconds: float = 0.0
+    peak_rss_kb: int = 0
+    pid: int = field(default_factory=os.getpid)
+
+    def stage_seconds(self) -> float:
+        return sum(stage.seconds for stage in self.stages.values())
+
+    def stage_rss_growth_kb(self) -> int:
+        return sum(stage.peak_rss_growth_kb for stage in self.stages.values())
+
+
+class StageRecorder(ParseHooks):
+    """Times extraction, classification and processing of each line of a report"""
+
+    def __init__(self, metrics: ReportMetrics) -> None:
+        super().__init__()
+        self.metrics = metrics
+        self.extract, self.classify, self.process = (
+            metrics.stages[stage] for stage in ("extract", "classify", "process")
+        )
+        self.peak_rss_kb = get_peak_rss_kb()
+
+    def record(self, stage: StageMetrics, started: float) -> None:
+        stage.seconds += time.perf_counter() - started
+        stage.calls += 1
+        current_rss_kb = get_peak_rss_kb()
+        stage.peak_rss_growth_kb += current_rss_kb - self.peak_rss_kb
+        self.peak_rss_kb = current_rss_kb
+
+    def iter_extracted(self, lines: Iterator[str]) -> Iterator[str]:
+        while True:
+            started = time.perf_counter()
+            line = next(lines, None)
+            self.record(self.extract, started)
+            if line is None:
+                return
+            self.metrics.lines += 1
+            yield line
+
+    def process_line(self, processor: MciFileProcessor, line: str) -> None:
+        started = time.perf_counter()
+        line_type, line_matches = get_line_type_and_matches(line)
+        self.record(self.classify, started)
+        line_types = self.metrics.line_types
+        line_types[line_type.name] = line_types.get(line_type.name, 0) + 1
+
+        started = time.perf_counter()
+        processor.process_classified_line(line, line_type, line_matches)
+        self.record(self.process, started)
+
+
+class InstrumentedReport:
+    """
+    Parses a report line by line, timing extraction, classification and processing
+    of each line separately. Iterating yields the report's PropertyMcis.
+    Once parsed with parse_instrumented_report, the MCIs are kept, so the report can
+    be parsed in a worker process and written out in the main one.
+    """
+
+    def __init__(
+        self, filepath: str, extraction: ExtractionOptions = DEFAULT_EXTRACTION
+    ) -> None:
+        super().__init__()
+        self.filepath = filepath
+        self.extraction = extraction
+        self.metrics = ReportMetrics(Path(filepath).name)
+        self.mcis: list[PropertyMci] | None = None
+        # Cases counted in each county, once the report has been parsed
+        self.county_counts: dict[str, int] = {}
+
+    @property
+    def parse_seconds(self) -> float:
+        """Time spent parsing before the MCIs are consumed; 0 while parsed lazily"""
+        if self.mcis is None:
+            return 0.0
+        return self.metrics.stage_seconds() - self.metrics.stages["write"].seconds
+
+    def __iter__(self) -> Iterator[PropertyMci]:
+        if self.mcis is not None:
+            return iter(self.mcis)
+        return self.iter_timed()
+
+    def iter_timed(self) -> Iterator[PropertyMci]:
+        """Yields MCIs as MciFileProcessor.iter_mcis does, recording each stage"""
+        processor = MciFileProcessor(self.filepath, self.extraction)
+        recorder = StageRecorder(self.metrics)
+        yield from processor.iter_mcis(recorder)
+        self.metrics.peak_rss_kb = recorder.peak_rss_kb
+        self.county_counts = dict(processor.county_counts)
+
+
+def parse_instrumented_report(
+    filepath: str,
+    extraction: ExtractionOptions = DEFAULT_EXTRACTION,
+    profile_dir: str | None = None,
+) -> InstrumentedReport:
+    """
+    Parses report completely, keeping its MCIs, for use in a worker process.
+    :param profile_dir: Directory to write a cProfile dump of the parse to
+    """
+    report = InstrumentedReport(filepath, extraction)
+    profiler = cProfile.Profile() if profile_dir else None
+    if profiler:
+        profiler.enable()
+    report.mcis = list(report.iter_timed())
+    if profiler and profile_dir:
+        profiler.disable()
+        dump_profile(profiler, profile_dir, report.metrics.report_file)
+    return report
+
+
+def dump_profile(profiler: cProfile.Profile, profile_dir: str, report_file: str) -> str:
+    """Writes profile stats of a report, readable with pstats or snakeviz"""
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, report_file + PROFILE_SUFFIX)
+    profiler.dump_stats(path)
+    return path
+
+
+class ParseInstrumentation:
+    """
+    Writes the metrics of each report as a JSON line when it has been written out,
+    and optionally a cProfile dump of each report.
+    """
+
+    def __init__(self, metrics_path: str, profile_dir: str | None = None) -> None:
+        super().__init__()
+        self.metrics_path = metrics_path
+        self.profile_dir = profile_dir
+        os.makedirs(os.path.dirname(metrics_path) or ".", exist_ok=True)
+        self.metrics_file = open(metrics_path, "a")
+
+    def close(self) -> None:
+        self.metrics_file.close()
+
+    def write_report(
+        self,
+        report: InstrumentedReport,
+        report_month: str,
+        write: Callable[[Iterable[PropertyMci]], int],
+    ) -> int:
+        """
+        Writes out report with write, timing the write stage apart from any parsing
+        which happens while its MCIs are consumed, and records the report's metrics.
+        :return: Number of rows written
+        """
+        metrics = report.metrics
+        parsed_seconds = metrics.stage_seconds()
+        parsed_rss_growth_kb = metrics.stage_rss_growth_kb()
+        profiler = (
+            cProfile.Profile() if self.profile_dir and report.mcis is None else None
+        )
+        peak_rss_kb = get_peak_rss_kb()
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            row_count = write(report)
+        finally:
+            if profiler:
+                profiler.disable()
+
+        # Parsing a lazily iterated report happens inside write, and is already counted
+        write_stage = metrics.stages["write"]
+        write_stage.calls = 1
+        write_stage.seconds = (time.perf_counter() - started) - (
+            metrics.stage_seconds() - parsed_seconds
+        )
+        write_stage.peak_rss_growth_kb = (get_peak_rss_kb() - peak_rss_kb) - (
+            metrics.stage_rss_growth_kb() - parsed_rss_growth_kb
+        )
+        metrics.report_month = report_month
+        metrics.rows = row_count
+        metrics.seconds = metrics.stage_seconds()
+        metrics.peak_rss_kb = max(metrics.peak_rss_kb, get_peak_rss_kb())
+        if profiler and self.profile_dir:
+            dump_profile(profiler, self.profile_dir, metrics.report_file)
+        self.record(metrics)
+        return row_count
+
+    def record(self, metrics: ReportMetrics) -> None:
+        """Appends metrics as a JSON line"""
+        self.metrics_file.write(
+            json.dumps({"event": "report", **asdict(metrics)}, sort_keys=True) + "\n"
+        )
+        self.metrics_file.flush()
@@ -108,51 +108,80 @@ def is_well_formed_line(line: str) -> re.Match[str] | None:
     )
 
 
+# pdfplumber merges last line of page with first line of next page
+nys_division_header_text = "NYS DIVISION OF HOUSING AND COMMUNITY RENEWAL"
+# some files include page numbers
+page_number_regex = re.compile(r"PAGE\s+\d+")
+cost_regex = re.compile(cost_re)
+
+# Patterns which can only match a line starting with a given keyword.
+# None of them can match any line that the general patterns below match,
+# so trying them first preserves the classification of the full cascade.
+# Header lines carry no data, so they are returned without their match.
+keyword_line_regexes: dict[str, tuple[tuple[re.Pattern[str], LineType, bool], ...]] = {
+    "OFFICE": ((office_of_rent_header, LineType.OFFICE_OF_RENT_HEADER, False),),
+    "MAJOR": ((major_capital_header, LineType.MAJOR_CAPITAL_HEADER, False),),
+    "BLDG": ((column_header_1, LineType.COLUMN_HEADER_1, False),),
+    "MCI": ((column_header_2, LineType.COLUMN_HEADER_2, False),),
+    "FOR": ((county_date_header, LineType.COUNTY_DATE_HEADER, True),),
+    "TOTAL": (
+        (total_cases_county_line, LineType.TOTAL_CASES_COUNTY_LINE, True),
+        (total_cases_document_line, LineType.TOTAL_CASES_DOCUMENT_LINE, True),
+        (
+            total_cases_plus_nys_header,
+            LineType.TOTAL_CASES_PLUS_NYS_DIVISION_HEADER,
+            True,
+        ),
+    ),
+}
+
+
 def get_line_type_and_matches(
     line: str,
 ) -> tuple[LineType, re.Match[str]] | tuple[LineType, None]:
-    """Returns LineType and matches from input line"""
-    # pdfplumber merges last line of page with first line of next page
-    line = re.sub("NYS DIVISION OF HOUSING AND COMMUNITY RENEWAL", "", line)
-    # some files include page numbers
-    line = re.sub(r"PAGE\s+\d+", "", line)
+    """
+    Returns LineType and matches from input line.
+    Rather than trying every pattern in turn, the line is dispatched on its first
+    character and first word, and the remaining patterns are only tried when the
+    line contains the literal characters they require.
+    """
+    if nys_division_header_text in line:
+        line = line.replace(nys_division_header_text, "")
+    if "PAGE" in line:
+        line = page_number_regex.sub("", line)
     line = line.strip()
 
-    if re.search("1 ELEVATOR", line):
-        print("uh oh")
-    if re.match(empty_line, line):
+    if not line:
         return LineType.NO_LINE, None
-    if re.match(office_of_rent_header, line):
-        return LineType.OFFICE_OF_RENT_HEADER, None
-    if re.match(major_capital_header, line):
-        return LineType.MAJOR_CAPITAL_HEADER, None
-    if re.match(column_header_1, line):
-        return LineType.COLUMN_HEADER_1, None
-    if re.match(column_header_2, line):
-        return LineType.COLUMN_HEADER_2, None
-    if re.match(double_dash_line, line):
-        return LineType.DOUBLE_DASHES, None
-    if re.match(single_dash_line, line):
-        return LineType.DASHES, None
-    if m := re.match(county_date_header, line):
-        return LineType.COUNTY_DATE_HEADER, m
-    if m := re.match(borough_line_regex, line):
+
+    first_char = line[0]
+    if first_char == "=":
+        if double_dash_line.match(line):
+            return LineType.DOUBLE_DASHES, None
+    elif first_char == "-":
+        if single_dash_line.match(line):
+            return LineType.DASHES, None
+    elif first_char.isalpha():
+        first_word = line.split(None, 1)[0].upper()
+        for regex, line_type, returns_match in keyword_line_regexes.get(first_word, ()):
+            if m := regex.match(line):
+                return (line_type, m) if returns_match else (line_type, None)
+
+    if "," in line and (m := borough_line_regex.match(line)):
         return LineType.BOROUGH_DOCKET_LINE, m
-    if m := re.match(docket_line_regex, line):
+    if line[2:8].isdigit() and (m := docket_line_regex.match(line)):
         return LineType.DOCKET_LINE, m
-    if m := re.match(total_cases_county_line, line):
-        return LineType.TOTAL_CASES_COUNTY_LINE, m
-    if m := re.match(count_per_county_line, line):
+    if ":" in line and (m := count_per_county_line.match(line)):
         return LineType.COUNT_PER_COUNTY_LINE, m
-    if m := re.match(total_cases_document_line, line):
-        return LineType.TOTAL_CASES_DOCUMENT_LINE, m
-    if m := re.match(total_cases_plus_nys_header, line):
-        return LineType.TOTAL_CASES_PLUS_NYS_DIVISION_HEADER, m
     # Work Lines and Addresses are the most variable
-    if m := re.match(work_line_regex, line):
+    if "." in line and (m := work_line_regex.match(line)):
         return LineType.MCI_WORK_LINE, m
     # Addresses can be distinguished from work lines by the presence of a cost
-    if not re.search(cost_re, line) and re.search(street_address_line_regex, line):
-        return LineType.STREET_ADDRESS_LINE, re.match(street_address_line_regex, line)
+    if (
+        first_char.isdigit()
+        and not cost_regex.search(line)
+        and (m := street_address_line_regex.match(line))
+    ):
+        return LineType.STREET_ADDRESS_LINE, m
 
     raise Exception(f"Line Type not expected {line}")
@@ -0,0 +1 @@
+"""Initializes output_store directory"""
@@ -0,0 +1,251 @@
+"""SQLite store of parsed MCI rows which replaces a report's rows when it is reprocessed"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import sqlite3
+import tempfile
+from typing import TYPE_CHECKING
+
+from src.atomic_files.atomic_files import replace_file
+from src.PropertyMci.address import normalize_street_address
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+MCI_COLUMNS = (
+    "report_file",
+    "report_month",
+    "street_address",
+    "neighborhood",
+    "zip_code",
+    "county",
+    "docket_number",
+    "case_status",
+    "closing_date",
+    "close_code",
+    "monthly_mci_incr_per_room",
+    "name",
+    "claim_cost",
+    "allow_cost",
+)
+CREATE_MCI_TABLE = """
+CREATE TABLE IF NOT EXISTS mcis (
+    report_file TEXT NOT NULL,
+    row_number INTEGER NOT NULL,
+    report_month TEXT NOT NULL,
+    street_address TEXT NOT NULL,
+    neighborhood TEXT NOT NULL,
+    zip_code TEXT NOT NULL,
+    county TEXT NOT NULL,
+    docket_number TEXT NOT NULL,
+    case_status TEXT NOT NULL,
+    closing_date TEXT NOT NULL,
+    close_code TEXT NOT NULL,
+    monthly_mci_incr_per_room TEXT NOT NULL,
+    name TEXT NOT NULL,
+    claim_cost TEXT NOT NULL,
+    allow_cost TEXT NOT NULL,
+    address_key TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (report_file, row_number)
+)
+"""
+# Indexes answering lookups of a case's history across all reports
+CREATE_MCI_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS mcis_docket_number ON mcis (docket_number)",
+    "CREATE INDEX IF NOT EXISTS mcis_address ON mcis (address_key, zip_code)",
+    "CREATE INDEX IF NOT EXISTS mcis_county ON mcis (county, report_month)",
+)
+INSERT_MCI = """
+INSERT INTO mcis (
+    row_number, report_file, report_month, street_address, neighborhood, zip_code,
+    county, docket_number, case_status, closing_date, close_code,
+    monthly_mci_incr_per_room, name, claim_cost, allow_cost, address_key
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SELECT_MCIS = """
+SELECT
+    report_file, report_month, street_address, neighborhood, zip_code,
+    county, docket_number, case_status, closing_date, close_code,
+    monthly_mci_incr_per_room, name, claim_cost, allow_cost
+FROM mcis
+ORDER BY report_month, report_file, row_number
+"""
+SELECT_MCIS_BY_DOCKET = """
+SELECT
+    report_file, report_month, street_address, neighborhood, zip_code,
+    county, docket_number, case_status, closing_date, close_code,
+    monthly_mci_incr_per_room, name, claim_cost, allow_cost
+FROM mcis
+WHERE docket_number = ?
+ORDER BY report_month, report_file, row_number
+"""
+SELECT_MCIS_BY_ADDRESS = """
+SELECT
+    report_file, report_month, street_address, neighborhood, zip_code,
+    county, docket_number, case_status, closing_date, close_code,
+    monthly_mci_incr_per_room, name, claim_cost, allow_cost
+FROM mcis
+WHERE address_key = ?
+ORDER BY report_month, report_file, row_number
+"""
+SELECT_MCIS_BY_ADDRESS_AND_ZIP = """
+SELECT
+    report_file, report_month, street_address, neighborhood, zip_code,
+    county, docket_number, case_status, closing_date, close_code,
+    monthly_mci_incr_per_room, name, claim_cost, allow_cost
+FROM mcis
+WHERE address_key = ? AND zip_code = ?
+ORDER BY report_month, report_file, row_number
+"""
+SELECT_MCIS_BY_COUNTY = """
+SELECT
+    report_file, report_month, street_address, neighborhood, zip_code,
+    county, docket_number, case_status, closing_date, close_code,
+    monthly_mci_incr_per_room, name, claim_cost, allow_cost
+FROM mcis
+WHERE county = ?
+ORDER BY report_month, report_file, row_number
+"""
+STREET_ADDRESS_INDEX = MCI_COLUMNS.index("street_address")
+
+
+class MciOutputStore:
+    """
+    Stores the rows of each report, keyed by report_file.
+    Reprocessing a report replaces all of its rows in a single transaction,
+    so readers see either the old rows or the new ones, never duplicates.
+    Rows are indexed by docket number, normalized street address and zip code, and
+    county, so the history of a case across every report is found without a scan.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        super().__init__()
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        with self.connection:
+            self.connection.execute(CREATE_MCI_TABLE)
+            self.add_address_keys()
+            for create_index in CREATE_MCI_INDEXES:
+                self.connection.execute(create_index)
+
+    def add_address_keys(self) -> None:
+        """Adds the normalized street address column to stores created without it"""
+        columns = {
+            column
+            for _, column, *_ in self.connection.execute("PRAGMA table_info(mcis)")
+        }
+        if "address_key" in columns:
+            return
+        self.connection.execute(
+            "ALTER TABLE mcis ADD COLUMN address_key TEXT NOT NULL DEFAULT ''"
+        )
+        street_addresses = self.connection.execute(
+            "SELECT DISTINCT street_address FROM mcis"
+        ).fetchall()
+        self.connection.executemany(
+            "UPDATE mcis SET address_key = ? WHERE street_address = ?",
+            (
+                (normalize_street_address(street_address), street_address)
+                for (street_address,) in street_addresses
+            ),
+        )
+
+    def close(self) -> None:
+        """Closes the database connection"""
+        self.connection.close()
+
+    def replace_report(self, report_file: str, rows: Iterable[tuple[str, ...]]) -> int:
+        """
+        Atomically replaces the rows of report_file.
+        Rows are consumed lazily; if producing them fails, the previous rows are kept.
+        :return: Number of rows stored
+        """
+        return self.append_rows(report_file, rows, 0)
+
+    def append_rows(
+        self, report_file: str, rows: Iterable[tuple[str, ...]], row_count: int
+    ) -> int:
+        """
+        Atomically replaces the rows of report_file after its first row_count rows,
+        so a report can be stored in parts and an interrupted part stored again.
+        Rows are consumed lazily; if producing them fails, the previous rows are kept.
+        :return: Number of rows of report_file stored
+        """
+
+        def numbered_rows() -> Iterable[tuple[int | str, ...]]:
+            nonlocal row_count
+            for row in rows:
+                row_count += 1
+                yield (
+                    row_count,
+                    *row,
+                    normalize_street_address(row[STREET_ADDRESS_INDEX]),
+                )
+
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM mcis WHERE report_file = ? AND row_number > ?",
+                (report_file, row_count),
+            )
+            self.connection.executemany(INSERT_MCI, numbered_rows())
+        return row_count
+
+    def count_rows(self, report_file: str) -> int:
+        """Returns number of rows stored for report_file"""
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM mcis WHERE report_file = ?", (report_file,)
+        ).fetchone()
+        return count
+
+    def find_by_docket(self, docket_number: str) -> list[tuple[str, ...]]:
+        """Returns the rows of docket_number in every report, oldest report first"""
+        return self.connection.execute(
+            SELECT_MCIS_BY_DOCKET, (docket_number,)
+        ).fetchall()
+
+    def find_by_address(
+        self, street_address: str, zip_code: str | None = None
+    ) -> list[tuple[str, ...]]:
+        """
+        Returns the rows of a street address in every report, oldest report first.
+        Addresses match regardless of case, punctuation and abbreviated street words.
+        :param zip_code: Only return rows of the address in this zip code
+        """
+        address_key = normalize_street_address(street_address)
+        if zip_code:
+            return self.connection.execute(
+                SELECT_MCIS_BY_ADDRESS_AND_ZIP, (address_key, zip_code)
+            ).fetchall()
+        return self.connection.execute(
+            SELECT_MCIS_BY_ADDRESS, (address_key,)
+        ).fetchall()
+
+    def find_by_county(self, county: str) -> list[tuple[str, ...]]:
+        """Returns the rows of a county in every report, oldest report first"""
+        return self.connection.execute(
+            SELECT_MCIS_BY_COUNTY, (county.upper(),)
+        ).fetchall()
+
+    def export_csv(self, csv_path: str) -> int:
+        """
+        Writes all rows to csv, ordered by report_month, with a single header.
+        The file is replaced atomically.
+        :return: Number of rows written
+        """
+        directory = os.path.dirname(csv_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        row_count = 0
+        try:
+            with open(fd, "w") as csv_file:
+                csv_file.write(",".join(MCI_COLUMNS) + "\n")
+                for row in self.connection.execute(SELECT_MCIS):
+                    csv_file.write(",".join(row) + "\n")
+                    row_count += 1
+            replace_file(temp_path, csv_path)
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+        return row_count
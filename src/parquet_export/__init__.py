@@ -0,0 +1 @@
+"""Initializes parquet_export directory"""
@@ -0,0 +1,147 @@
+"""Exports parsed MCIs to Parquet files partitioned by report_month"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import tempfile
+from typing import TYPE_CHECKING, Any
+
+from src.atomic_files.atomic_files import replace_file
+from src.PropertyMci.values import parse_amount, parse_closing_date
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from src.PropertyMci.property_mci import PropertyMci
+
+UNKNOWN_REPORT_MONTH = "unknown"
+AMOUNT_PRECISION = 12
+AMOUNT_SCALE = 2
+
+
+def import_pyarrow() -> tuple[Any, Any]:
+    """
+    Imports pyarrow, which is only needed for Parquet export.
+    :return: pyarrow and pyarrow.parquet modules
+    """
+    try:
+        import pyarrow  # noqa: PLC0415
+        import pyarrow.parquet  # noqa: PLC0415
+    except ImportError as error:
+        raise Exception(
+            "Parquet export requires pyarrow: pip install 'mci_data[parquet]'"
+        ) from error
+    return pyarrow, pyarrow.parquet
+
+
+def get_schema(pa: Any) -> Any:  # noqa: ANN401
+    """
+    Schema of a report's Parquet file.
+    report_month is not stored in the file; it is the name of the partition directory.
+    """
+    amount = pa.decimal128(AMOUNT_PRECISION, AMOUNT_SCALE)
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [
+            ("report_file", pa.string()),
+            ("street_address", pa.string()),
+            ("neighborhood", pa.string()),
+            ("zip_code", pa.string()),
+            ("county", category),
+            ("docket_number", pa.string()),
+            ("case_status", category),
+            ("closing_date", pa.date32()),
+            ("close_code", category),
+            ("monthly_mci_incr_per_room", amount),
+            ("name", pa.string()),
+            ("claim_cost", amount),
+            ("allow_cost", amount),
+        ]
+    )
+
+
+def mcis_to_columns(
+    all_mcis: Iterable[PropertyMci], report_file: str
+) -> dict[str, list[Any]]:
+    """Converts MCIs to typed column values"""
+    columns: dict[str, list[Any]] = {
+        name: []
+        for name in (
+            "report_file",
+            "street_address",
+            "neighborhood",
+            "zip_code",
+            "county",
+            "docket_number",
+            "case_status",
+            "closing_date",
+            "close_code",
+            "monthly_mci_incr_per_room",
+            "name",
+            "claim_cost",
+            "allow_cost",
+        )
+    }
+    for mci in all_mcis:
+        address, docket, work_item = mci.address, mci.docket, mci.work_item
+        columns["report_file"].append(report_file)
+        columns["street_address"].append(address.street_address)
+        columns["neighborhood"].append(address.neighborhood)
+        columns["zip_code"].append(address.zip_code)
+        columns["county"].append(address.county)
+        columns["docket_number"].append(docket.docket_number)
+        columns["case_status"].append(docket.case_status)
+        columns["closing_date"].append(parse_closing_date(docket.closing_date))
+        columns["close_code"].append(docket.close_code)
+        columns["monthly_mci_incr_per_room"].append(
+            parse_amount(docket.monthly_mci_incr_per_room)
+        )
+        columns["name"].append(work_item.mci_work if work_item else None)
+        columns["claim_cost"].append(
+            parse_amount(work_item.claim_cost) if work_item else None
+        )
+        columns["allow_cost"].append(
+            parse_amount(work_item.allow_cost) if work_item else None
+        )
+    return columns
+
+
+class ParquetReportWriter:
+    """
+    Writes the MCIs of each report to <directory>/report_month=<YYYY-MM>/<report>.parquet.
+    Each report is one file which is replaced atomically when the report is reprocessed,
+    and the directory can be read as a hive partitioned dataset.
+    """
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self.pa, self.pq = import_pyarrow()
+        self.directory = directory
+        self.schema = get_schema(self.pa)
+
+    def get_report_path(self, report_file: str, report_month: str) -> Path:
+        """Returns path of the Parquet file for report"""
+        partition = f"report_month={report_month or UNKNOWN_REPORT_MONTH}"
+        return Path(self.directory) / partition / f"{Path(report_file).stem}.parquet"
+
+    def write_report(
+        self, all_mcis: Iterable[PropertyMci], report_file: str, report_month: str
+    ) -> int:
+        """
+        Replaces the Parquet file of report with its MCIs
+        :return: Number of rows written
+        """
+        table = self.pa.Table.from_pydict(
+            mcis_to_columns(all_mcis, report_file), schema=self.schema
+        )
+        report_path = self.get_report_path(report_file, report_month)
+        os.makedirs(report_path.parent, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=report_path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            self.pq.write_table(table, temp_path)
+            replace_file(temp_path, report_path)
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+        return table.num_rows
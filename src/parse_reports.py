@@ -1,17 +1,48 @@
 """Parses document from NYS State and produces csv"""
 
+import argparse
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from dataclasses import replace
+from functools import partial
 import logging
 from operator import attrgetter
 import os
 import pathlib
+import time
 
 from finite_machine_states.fsm_state import FsmState
-from src.MciFileProcessor.mci_file_processor import MciFileProcessor
+from src.instrumentation.instrumentation import (
+    InstrumentedReport,
+    ParseInstrumentation,
+    parse_instrumented_report,
+)
+from src.MciFileProcessor.mci_file_processor import (
+    DEFAULT_EXTRACTION,
+    PARSER_VERSION,
+    ExtractionOptions,
+    MciFileProcessor,
+    ParseCheckpoint,
+    parse_mci_report,
+)
+from src.output_store.output_store import MCI_COLUMNS, MciOutputStore
+from src.parquet_export.parquet_export import ParquetReportWriter
 from src.PropertyMci.property_mci import PropertyMci
 from src.regexes.filename_patterns import (
     derive_report_month,
     is_valid_input_filename,
 )
+from src.report_isolation.report_isolation import (
+    REPORT_TIMEOUT_SECONDS,
+    IsolationOptions,
+    ReportFailure,
+    iter_isolated_reports,
+)
+from src.report_manifest.report_manifest import ReportCheckpoint, ReportManifest
+from src.run_metrics.run_metrics import RunMetrics
+from src.text_cache.text_cache import DEFAULT_MAX_BYTES, ExtractedTextCache, hash_file
+from src.text_extractors.text_extractors import DEFAULT_BACKEND, EXTRACTORS
 
 """
 Parses all of the MCI files in a directory and outputs a csv file
@@ -19,13 +50,28 @@ Parses all of the MCI files in a directory and outputs a csv file
 BASE_DIR = pathlib.Path(__file__).parent.parent
 INPUT_DOCUMENT_BASE_DIR = os.path.join(BASE_DIR, "data")
 CSV_OUTPUT_FILEPATH = os.path.join(BASE_DIR, "output", "mci_output.csv")
-PROCESSED_MANIFEST_FILE = os.path.join(BASE_DIR, "output", "processed_reports.log")
+PROCESSED_MANIFEST_FILE = os.path.join(BASE_DIR, "output", "processed_reports.sqlite3")
+LEGACY_MANIFEST_FILENAME = "processed_reports.log"
 LOG_FILEPATH = os.path.join(BASE_DIR, "output", "parse_reports.log")
-CSV_HEADERS = (
-    "report_file,report_month,street_address,neighborhood,zip_code,county,docket_number,case_status,closing_date,"
-    "close_code,monthly_mci_incr_per_room,name,claim_cost,allow_cost\n"
-)
+TEXT_CACHE_DIR = os.path.join(BASE_DIR, "output", "text_cache")
+OUTPUT_STORE_FILEPATH = os.path.join(BASE_DIR, "output", "mci_output.sqlite3")
+PARQUET_OUTPUT_DIR = os.path.join(BASE_DIR, "output", "parquet")
+# Kept outside the Parquet directory so that it can be read as a dataset
+PARQUET_MANIFEST_SUFFIX = "_reports.sqlite3"
+PROMETHEUS_TEXTFILE = os.path.join(BASE_DIR, "output", "parse_reports.prom")
+DEAD_LETTER_FILEPATH = os.path.join(BASE_DIR, "output", "dead_letter.jsonl")
+CSV_HEADERS = ",".join(MCI_COLUMNS) + "\n"
 CSV_OUTPUT_FILE = open(CSV_OUTPUT_FILEPATH, "a+")
+# When set, rows are stored per report instead of being appended to the csv
+OUTPUT_STORE: MciOutputStore | None = None
+# When set, each report is written to its own typed Parquet file instead
+PARQUET_WRITER: ParquetReportWriter | None = None
+# When set, per-stage metrics of every report are recorded
+INSTRUMENTATION: ParseInstrumentation | None = None
+# When set, counters of each run are written for the Prometheus textfile collector
+RUN_METRICS: RunMetrics | None = None
+# Lines parsed between checkpoints of a report's progress, or 0 to not checkpoint
+CHECKPOINT_INTERVAL = 0
 FSM_STATE: FsmState = FsmState.START_DOCUMENT
 
 logger = logging.getLogger("parse_reports")
@@ -58,90 +104,622 @@ def set_output_file(path: str) -> None:
     CSV_OUTPUT_FILE = open(CSV_OUTPUT_FILEPATH, "a")
 
 
-configure_logger(str(LOG_FILEPATH))
+def set_output_store(path: str | None) -> None:
+    """
+    Stores rows in the SQLite output store at path, or appends them to the csv when None.
+    The store also holds the processed reports manifest, so the two cannot diverge.
+    """
+    global OUTPUT_STORE
+    if OUTPUT_STORE:
+        OUTPUT_STORE.close()
+    OUTPUT_STORE = MciOutputStore(path) if path else None
 
 
-def load_processed_reports() -> set[str]:
+def set_parquet_output(directory: str | None) -> None:
     """
-    Returns a set containing the filenames of reports already processed into the CSV.
+    Writes each report to a Parquet file partitioned by report_month under directory,
+    or stops doing so when None.
     """
-    if not os.path.exists(PROCESSED_MANIFEST_FILE):
-        return set()
-    with open(PROCESSED_MANIFEST_FILE) as manifest:
-        return {line.strip() for line in manifest if line.strip()}
+    global PARQUET_WRITER
+    PARQUET_WRITER = ParquetReportWriter(directory) if directory else None
 
 
-def record_processed_report(filename: str) -> None:
+def set_instrumentation(
+    metrics_path: str | None, profile_dir: str | None = None
+) -> None:
     """
-    Appends a filename to the processed reports manifest.
+    Appends per-stage timings, line type counts, rows and peak RSS of each report to
+    metrics_path as JSON lines, and a cProfile dump of each report to profile_dir
+    when given. Stops recording when metrics_path is None.
     """
-    os.makedirs(os.path.dirname(PROCESSED_MANIFEST_FILE), exist_ok=True)
-    with open(PROCESSED_MANIFEST_FILE, "a") as manifest:
-        manifest.write(f"{filename}\n")
+    global INSTRUMENTATION
+    if INSTRUMENTATION:
+        INSTRUMENTATION.close()
+    INSTRUMENTATION = (
+        ParseInstrumentation(metrics_path, profile_dir) if metrics_path else None
+    )
 
 
-def process_directory(path: str) -> None:
+def set_run_metrics(textfile_path: str | None) -> None:
     """
-    Processes all pdf files in directory
-    :param path: Base directory for input files
+    Writes the counters and report durations of each process_directory run to
+    textfile_path in the Prometheus textfile collector format, or stops when None.
+    """
+    global RUN_METRICS
+    RUN_METRICS = RunMetrics(textfile_path) if textfile_path else None
+
+
+def set_checkpoint_interval(lines: int) -> None:
     """
-    processed_reports = load_processed_reports()
+    In serial, uninstrumented runs writing to the csv or the output store, commits
+    the rows of each report and saves its parse state to the manifest every lines
+    lines, so a run which is interrupted resumes the report from its last checkpoint.
+    Stops when 0.
+    Rows of a reprocessed report are then replaced in parts rather than atomically.
+    """
+    global CHECKPOINT_INTERVAL
+    CHECKPOINT_INTERVAL = lines
+
+
+configure_logger(str(LOG_FILEPATH))
+
+
+def open_manifest() -> ReportManifest:
+    """
+    Opens the processed reports manifest.
+    With an output store or Parquet output the manifest lives alongside it, so a report
+    is only marked processed once its rows are written there. Otherwise filenames
+    recorded by the legacy flat-file manifest alongside it are imported.
+    """
+    if OUTPUT_STORE:
+        return ReportManifest(OUTPUT_STORE.db_path, PARSER_VERSION)
+    if PARQUET_WRITER:
+        return ReportManifest(
+            PARQUET_WRITER.directory.rstrip(os.sep) + PARQUET_MANIFEST_SUFFIX,
+            PARSER_VERSION,
+        )
+    manifest = ReportManifest(PROCESSED_MANIFEST_FILE, PARSER_VERSION)
+    manifest.import_legacy_log(
+        os.path.join(os.path.dirname(PROCESSED_MANIFEST_FILE), LEGACY_MANIFEST_FILENAME)
+    )
+    return manifest
 
+
+def list_pending_reports(path: str, manifest: ReportManifest) -> list[str]:
+    """
+    Returns the report filenames in directory that are new, changed or were parsed
+    by an older parser version, ordered by report_month so that output is
+    deterministic regardless of directory listing order.
+    """
+    pending: list[str] = []
     for file in os.listdir(path):
         if not is_valid_input_filename(file):
             continue
-        if file in processed_reports:
+        if RUN_METRICS:
+            RUN_METRICS.count("files_scanned")
+        if manifest.is_current(os.path.join(path, file), file):
             logger.info("Skipping %s (already processed)", file)
+            if RUN_METRICS:
+                RUN_METRICS.count("files_skipped")
             continue
-        report_month = derive_report_month(file)
+        pending.append(file)
+    return sorted(pending, key=lambda file: (derive_report_month(file), file))
+
+
+def process_directory(
+    path: str,
+    workers: int = 1,
+    extraction: ExtractionOptions = DEFAULT_EXTRACTION,
+    isolation: IsolationOptions | None = None,
+) -> None:
+    """
+    Processes all pdf files in directory, and writes the run's metrics when configured
+    :param path: Base directory for input files
+    :param workers: Number of worker processes used to parse reports concurrently.
+        Rows are always written in report_month order, so output is identical to a serial run.
+    :param extraction: How lines are extracted from each report
+    :param isolation: When given, each report is parsed in a process of its own, and
+        reports which fail or time out are appended to its dead letter file instead of
+        stopping the run. They are not recorded as processed, so the next run retries them.
+    """
+    started = time.perf_counter()
+    succeeded = False
+    if RUN_METRICS:
+        RUN_METRICS.reset()
+    try:
+        if isolation:
+            process_isolated_reports(path, workers, extraction, isolation)
+        else:
+            process_pending_reports(path, workers, extraction)
+        succeeded = True
+    except Exception:
+        if RUN_METRICS:
+            RUN_METRICS.count("files_failed")
+        raise
+    finally:
+        if RUN_METRICS:
+            RUN_METRICS.write_textfile(time.perf_counter() - started, succeeded)
+
+
+def process_pending_reports(
+    path: str, workers: int, extraction: ExtractionOptions
+) -> None:
+    """Parses the reports in directory which are not processed yet, and writes them"""
+    with closing(open_manifest()) as manifest:
+        pending = list_pending_reports(path, manifest)
+        filepaths = [os.path.join(path, file) for file in pending]
+
+        checkpointed = not (PARQUET_WRITER or INSTRUMENTATION)
+        if workers <= 1 and CHECKPOINT_INTERVAL and checkpointed:
+            # Rows of a resumed report stay together when it is finished first
+            resumed = manifest.list_checkpoints()
+            for file in sorted(pending, key=lambda file: file not in resumed):
+                write_checkpointed_report(path, file, extraction, manifest)
+            return
+
+        if workers <= 1:
+            results = (
+                InstrumentedReport(filepath, extraction)
+                if INSTRUMENTATION
+                else MciFileProcessor(filepath, extraction)
+                for filepath in filepaths
+            )
+            write_parsed_reports(path, pending, results, manifest)
+            return
+
+        # Worker processes must not inherit unflushed CSV output
+        CSV_OUTPUT_FILE.flush()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map yields results in submission order, which keeps the output deterministic
+            results = executor.map(report_parser(extraction), filepaths)
+            write_parsed_reports(path, pending, results, manifest)
+
+
+def process_isolated_reports(
+    path: str, workers: int, extraction: ExtractionOptions, isolation: IsolationOptions
+) -> None:
+    """
+    Parses the reports in directory which are not processed yet, each in a process of
+    its own, writes those which succeed and quarantines those which fail
+    """
+    with closing(open_manifest()) as manifest:
+        pending = list_pending_reports(path, manifest)
+        # Parsing processes must not inherit unflushed CSV output
+        CSV_OUTPUT_FILE.flush()
+        results = iter_isolated_reports(
+            (os.path.join(path, file) for file in pending),
+            report_parser(extraction),
+            workers,
+            isolation.timeout,
+        )
+        for file, result in zip(pending, results, strict=True):
+            if isinstance(result, ReportFailure):
+                quarantine_report(result, isolation)
+                continue
+            try:
+                write_parsed_report(path, file, result, manifest)
+            except Exception as error:
+                quarantine_report(ReportFailure.from_exception(file, error), isolation)
+
+
+def report_parser(extraction: ExtractionOptions) -> partial[Iterable[PropertyMci]]:
+    """Parses a report filepath in another process, instrumented when configured"""
+    if INSTRUMENTATION:
+        return partial(
+            parse_instrumented_report,
+            extraction=extraction,
+            profile_dir=INSTRUMENTATION.profile_dir,
+        )
+    return partial(parse_mci_report, extraction=extraction)
+
+
+def quarantine_report(failure: ReportFailure, isolation: IsolationOptions) -> None:
+    """Logs a report which failed, counts it, and appends it to the dead letter file"""
+    location = f" at line {failure.line_number}" if failure.line_number else ""
+    logger.error(
+        "Quarantined file %s%s: %s: %s",
+        failure.report_file,
+        location,
+        failure.error_type,
+        failure.message,
+    )
+    if RUN_METRICS:
+        RUN_METRICS.count("files_failed")
+    failure.append_to(isolation.dead_letter_path)
+
+
+def write_parsed_reports(
+    path: str,
+    files: list[str],
+    results: Iterable[Iterable[PropertyMci]],
+    manifest: ReportManifest,
+) -> None:
+    """Writes parsed reports to the output in order and records them in the manifest"""
+    for file, all_mcis in zip(files, results, strict=True):
+        write_parsed_report(path, file, all_mcis, manifest)
+
+
+def write_parsed_report(
+    path: str, file: str, all_mcis: Iterable[PropertyMci], manifest: ReportManifest
+) -> int:
+    """
+    Writes a parsed report to the output, records it in the manifest, and counts it
+    in the run metrics
+    :param all_mcis: MCIs of the report. Reports parsed by an MciFileProcessor,
+        parse_mci_report or an InstrumentedReport also carry their county_counts,
+        and parse_seconds when they were parsed before being written.
+    :return: Number of rows written
+    """
+    report_month = derive_report_month(file)
+    logger.info("Processing file %s (report_month=%s)", file, report_month or "unknown")
+    started = time.perf_counter()
+    if INSTRUMENTATION and isinstance(all_mcis, InstrumentedReport):
+        row_count = INSTRUMENTATION.write_report(
+            all_mcis,
+            report_month,
+            partial(write_mcis, filename=file, report_month=report_month),
+        )
+    else:
+        row_count = write_mcis(all_mcis, file, report_month)
+    filepath = os.path.join(path, file)
+    manifest.record(filepath, file, row_count)
+    if RUN_METRICS:
+        RUN_METRICS.record_report(
+            row_count,
+            pathlib.Path(filepath).stat().st_size,
+            time.perf_counter() - started + getattr(all_mcis, "parse_seconds", 0.0),
+            getattr(all_mcis, "county_counts", {}),
+        )
+    logger.info("Finished file %s (%d rows)", file, row_count)
+    return row_count
+
+
+def write_checkpointed_report(
+    path: str, file: str, extraction: ExtractionOptions, manifest: ReportManifest
+) -> int:
+    """
+    Parses and writes a report as write_parsed_report does, committing its rows and
+    saving a checkpoint of its progress every CHECKPOINT_INTERVAL lines.
+    A report with a checkpoint is resumed: rows written after the checkpoint are
+    removed, its parse state is restored and parsing continues at the next line.
+    :return: Number of rows of the report
+    """
+    filepath = os.path.join(path, file)
+    report_month = derive_report_month(file)
+    started = time.perf_counter()
+    content_hash = hash_file(filepath)
+    checkpoint = manifest.get_checkpoint(file, content_hash)
+    if checkpoint and not rollback_output(checkpoint):
+        logger.warning("Output of %s changed since its checkpoint, restarting", file)
+        checkpoint = None
+    processor = MciFileProcessor(filepath, extraction)
+    if checkpoint:
+        parse_checkpoint = ParseCheckpoint.from_json(checkpoint.parse_state)
+        logger.info(
+            "Resuming file %s at line %d (%d rows written)",
+            file,
+            parse_checkpoint.line_number + 1,
+            checkpoint.row_count,
+        )
+    else:
         logger.info(
             "Processing file %s (report_month=%s)", file, report_month or "unknown"
         )
-        process_file(os.path.join(path, file), file, report_month)
-        processed_reports.add(file)
-        record_processed_report(file)
-        logger.info("Finished file %s", file)
+        parse_checkpoint = processor.checkpoint(0)
+        checkpoint = ReportCheckpoint(
+            file, content_hash, parse_checkpoint.to_json(), 0, output_offset()
+        )
+        # Saved before any row is written, so that none is written twice
+        manifest.save_checkpoint(checkpoint)
+
+    resumed_row_count = row_count = checkpoint.row_count
+    mcis: list[PropertyMci] = []
+    for item in processor.iter_checkpointed_mcis(CHECKPOINT_INTERVAL, parse_checkpoint):
+        if isinstance(item, ParseCheckpoint):
+            row_count = commit_mcis(mcis, file, report_month, row_count)
+            mcis.clear()
+            checkpoint = replace(
+                checkpoint,
+                parse_state=item.to_json(),
+                row_count=row_count,
+                output_offset=output_offset(),
+            )
+            manifest.save_checkpoint(checkpoint)
+        else:
+            mcis.append(item)
+    row_count = commit_mcis(mcis, file, report_month, row_count)
+
+    manifest.record(filepath, file, row_count)
+    if RUN_METRICS:
+        RUN_METRICS.record_report(
+            row_count - resumed_row_count,
+            pathlib.Path(filepath).stat().st_size,
+            time.perf_counter() - started,
+            processor.county_counts,
+        )
+    logger.info("Finished file %s (%d rows)", file, row_count)
+    return row_count
 
 
-def process_file(filepath: str, filename: str, report_month: str) -> None:
-    """Extracts MCIs from file and writes results to csv"""
-    file_processor = MciFileProcessor(filepath)
-    all_mcis = file_processor.process_file()
-    write_mcis_to_csv(all_mcis, filename, report_month)
+def output_offset() -> int:
+    """Size of the csv output, or -1 when rows are written to the output store"""
+    return -1 if OUTPUT_STORE else CSV_OUTPUT_FILE.tell()
 
 
-def write_mcis_to_csv(
-    all_mcis: list[PropertyMci], filename: str, report_month: str
+def rollback_output(checkpoint: ReportCheckpoint) -> bool:
+    """
+    Removes the rows of a report written after its checkpoint.
+    :return: Whether the output still holds every row written before the checkpoint
+    """
+    if OUTPUT_STORE:
+        if OUTPUT_STORE.count_rows(checkpoint.filename) < checkpoint.row_count:
+            return False
+        OUTPUT_STORE.append_rows(checkpoint.filename, (), checkpoint.row_count)
+        return True
+    CSV_OUTPUT_FILE.flush()
+    size = pathlib.Path(CSV_OUTPUT_FILEPATH).stat().st_size
+    if size < checkpoint.output_offset or checkpoint.output_offset < 0:
+        return False
+    if size > checkpoint.output_offset:
+        os.truncate(CSV_OUTPUT_FILEPATH, checkpoint.output_offset)
+        # Reopened so that the file position matches its new size
+        set_output_file(CSV_OUTPUT_FILEPATH)
+    return True
+
+
+def commit_mcis(
+    mcis: list[PropertyMci], filename: str, report_month: str, row_count: int
+) -> int:
+    """
+    Durably writes MCIs of a report after its first row_count rows
+    :return: Number of rows of the report written
+    """
+    if OUTPUT_STORE:
+        return OUTPUT_STORE.append_rows(
+            filename,
+            (mci_to_row(mci, filename, report_month) for mci in mcis),
+            row_count,
+        )
+    row_count += write_mcis_to_csv(mcis, filename, report_month)
+    CSV_OUTPUT_FILE.flush()
+    os.fsync(CSV_OUTPUT_FILE.fileno())
+    return row_count
+
+
+def process_file(
+    filepath: str,
+    filename: str,
+    report_month: str,
+    extraction: ExtractionOptions = DEFAULT_EXTRACTION,
 ) -> None:
-    """Writes out MCIs to csv file"""
-    for mci in all_mcis:
-        (street_address, neighborhood, zip_code, county) = attrgetter(
-            "street_address", "neighborhood", "zip_code", "county"
-        )(mci.address)
-        (docket_number, case_status, close_code, closing_date) = attrgetter(
-            "docket_number", "case_status", "close_code", "closing_date"
-        )(mci.docket)
-        monthly_mci_incr_per_room = (
-            mci.docket.monthly_mci_incr_per_room
-            if mci.docket.monthly_mci_incr_per_room
-            else ""
+    """Extracts MCIs from file and writes results to the output"""
+    write_mcis(parse_mci_report(filepath, extraction).mcis, filename, report_month)
+
+
+def mci_to_row(mci: PropertyMci, filename: str, report_month: str) -> tuple[str, ...]:
+    """Flattens MCI into the values of an output row"""
+    (street_address, neighborhood, zip_code, county) = attrgetter(
+        "street_address", "neighborhood", "zip_code", "county"
+    )(mci.address)
+    (docket_number, case_status, close_code, closing_date) = attrgetter(
+        "docket_number", "case_status", "close_code", "closing_date"
+    )(mci.docket)
+    monthly_mci_incr_per_room = (
+        mci.docket.monthly_mci_incr_per_room
+        if mci.docket.monthly_mci_incr_per_room
+        else ""
+    )
+    if mci.work_item:
+        (mci_work, claim_cost, allow_cost) = attrgetter(
+            "mci_work", "claim_cost", "allow_cost"
+        )(mci.work_item)
+    else:
+        mci_work = claim_cost = allow_cost = ""
+
+    return tuple(
+        "" if value is None else str(value)
+        for value in (
+            filename,
+            report_month,
+            street_address,
+            neighborhood,
+            zip_code,
+            county,
+            docket_number,
+            case_status,
+            closing_date,
+            close_code,
+            monthly_mci_incr_per_room,
+            mci_work,
+            claim_cost,
+            allow_cost,
         )
-        if mci.work_item:
-            (mci_work, claim_cost, allow_cost) = attrgetter(
-                "mci_work", "claim_cost", "allow_cost"
-            )(mci.work_item)
-        else:
-            mci_work = claim_cost = allow_cost = ""
+    )
+
 
-        output = (
-            f"{filename},{report_month},{street_address},{neighborhood},{zip_code},{county},{docket_number},{case_status},{closing_date},"
-            f"{close_code},{monthly_mci_incr_per_room},"
-            f"{mci_work},{claim_cost},{allow_cost}"
+def write_mcis(
+    all_mcis: Iterable[PropertyMci], filename: str, report_month: str
+) -> int:
+    """
+    Writes out MCIs to the output store or Parquet file when one is configured,
+    replacing any rows from a previous run of the same report, and appends them
+    to the csv otherwise
+    :return: Number of rows written
+    """
+    if PARQUET_WRITER:
+        return PARQUET_WRITER.write_report(all_mcis, filename, report_month)
+    if OUTPUT_STORE:
+        return OUTPUT_STORE.replace_report(
+            filename, (mci_to_row(mci, filename, report_month) for mci in all_mcis)
         )
-        CSV_OUTPUT_FILE.write(f"{output}\n")
+    return write_mcis_to_csv(all_mcis, filename, report_month)
+
+
+def write_mcis_to_csv(
+    all_mcis: Iterable[PropertyMci], filename: str, report_month: str
+) -> int:
+    """
+    Writes out MCIs to csv file as they are produced
+    :return: Number of rows written
+    """
+    row_count = 0
+    for mci in all_mcis:
+        CSV_OUTPUT_FILE.write(",".join(mci_to_row(mci, filename, report_month)) + "\n")
+        row_count += 1
+    return row_count
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses command line options"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to parse reports (default: 1)",
+    )
+    parser.add_argument(
+        "--page-workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to extract the pages of each pdf (default: 1)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(EXTRACTORS),
+        default=DEFAULT_BACKEND,
+        help=f"Library used to extract pdf text (default: {DEFAULT_BACKEND})",
+    )
+    parser.add_argument(
+        "--output",
+        choices=["sqlite", "csv", "parquet"],
+        default="sqlite",
+        help="sqlite: replace each report's rows in output/mci_output.sqlite3 and "
+        "regenerate mci_output.csv from it; csv: append rows to mci_output.csv; "
+        "parquet: write typed columns to output/parquet/report_month=*/ "
+        "(default: sqlite)",
+    )
+    parser.add_argument(
+        "--typed-values",
+        action="store_true",
+        help="Parse costs into decimals and closing dates into dates once, as lines are "
+        "read; csv and sqlite rows then hold ISO dates and costs with two decimals",
+    )
+    parser.add_argument(
+        "--text-cache-dir",
+        default=TEXT_CACHE_DIR,
+        help="Directory caching text extracted from pdfs (default: output/text_cache)",
+    )
+    parser.add_argument(
+        "--text-cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Size above which least recently used cache entries are evicted",
+    )
+    parser.add_argument(
+        "--no-text-cache",
+        action="store_true",
+        help="Always extract text from pdfs instead of using the cache",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Append per-stage timings, line type counts, rows and peak RSS of each "
+        "report to this file as JSON lines",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        help="With --metrics, also write a cProfile dump of each report to this directory",
+    )
+    parser.add_argument(
+        "--prometheus-textfile",
+        default=PROMETHEUS_TEXTFILE,
+        help="File the run's counters and durations are written to for the node "
+        "exporter textfile collector (default: output/parse_reports.prom)",
+    )
+    parser.add_argument(
+        "--no-prometheus-textfile",
+        action="store_true",
+        help="Do not write run metrics",
+    )
+    parser.add_argument(
+        "--checkpoint-lines",
+        type=int,
+        default=0,
+        help="Commit rows and save the parse state of each report every this many "
+        "lines, so an interrupted run resumes mid-report (default: off)",
+    )
+    parser.add_argument(
+        "--keep-going",
+        action="store_true",
+        help="Parse each report in a process of its own, and append reports which fail "
+        "to the dead letter file instead of stopping",
+    )
+    parser.add_argument(
+        "--report-timeout",
+        type=float,
+        default=REPORT_TIMEOUT_SECONDS,
+        help="With --keep-going, seconds after which a report's parsing is abandoned "
+        f"(default: {REPORT_TIMEOUT_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--dead-letter-file",
+        default=DEAD_LETTER_FILEPATH,
+        help="With --keep-going, file failed reports are appended to as JSON lines "
+        "(default: output/dead_letter.jsonl)",
+    )
+    args = parser.parse_args(argv)
+    if args.checkpoint_lines:
+        # Only serial runs writing the csv or the store write reports incrementally
+        unsupported = [
+            option
+            for option, used in (
+                ("--workers above 1", args.workers > 1),
+                ("--keep-going", args.keep_going),
+                ("--metrics", args.metrics),
+                ("--output parquet", args.output == "parquet"),
+            )
+            if used
+        ]
+        if unsupported:
+            parser.error(
+                "--checkpoint-lines cannot be combined with " + ", ".join(unsupported)
+            )
+    return args
 
 
 if __name__ == "__main__":
-    CSV_OUTPUT_FILE.write(CSV_HEADERS)
-    process_directory(INPUT_DOCUMENT_BASE_DIR)
+    args = parse_args()
+    text_cache = (
+        None
+        if args.no_text_cache
+        else ExtractedTextCache(
+            args.text_cache_dir, args.text_cache_max_mb * 1024 * 1024
+        )
+    )
+    if args.output == "sqlite":
+        set_output_store(OUTPUT_STORE_FILEPATH)
+    elif args.output == "parquet":
+        set_parquet_output(PARQUET_OUTPUT_DIR)
+    # The csv is opened for appending, so it is positioned at its end
+    elif CSV_OUTPUT_FILE.tell() == 0:
+        CSV_OUTPUT_FILE.write(CSV_HEADERS)
+    if args.metrics:
+        set_instrumentation(args.metrics, args.profile_dir)
+    if not args.no_prometheus_textfile:
+        set_run_metrics(args.prometheus_textfile)
+    set_checkpoint_interval(args.checkpoint_lines)
+    process_directory(
+        INPUT_DOCUMENT_BASE_DIR,
+        workers=args.workers,
+        extraction=ExtractionOptions(
+            args.page_workers, args.backend, text_cache, args.typed_values
+        ),
+        isolation=IsolationOptions(args.dead_letter_file, args.report_timeout)
+        if args.keep_going
+        else None,
+    )
     CSV_OUTPUT_FILE.close()
+    set_instrumentation(None)
+    if OUTPUT_STORE:
+        OUTPUT_STORE.export_csv(CSV_OUTPUT_FILEPATH)
+        OUTPUT_STORE.close()
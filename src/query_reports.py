@@ -0,0 +1,83 @@
+"""Looks up the history of a case across every parsed report"""
+
+from __future__ import annotations
+
+import argparse
+from contextlib import closing
+import csv
+import os
+import pathlib
+import sys
+import time
+from typing import TextIO
+
+from src.output_store.output_store import MCI_COLUMNS, MciOutputStore
+
+BASE_DIR = pathlib.Path(__file__).parent.parent
+OUTPUT_STORE_FILEPATH = os.path.join(BASE_DIR, "output", "mci_output.sqlite3")
+
+
+def find_mcis(store: MciOutputStore, args: argparse.Namespace) -> list[tuple[str, ...]]:
+    """Runs the lookup selected on the command line"""
+    if args.lookup == "docket":
+        return store.find_by_docket(args.docket_number)
+    if args.lookup == "address":
+        return store.find_by_address(args.street_address, args.zip_code)
+    return store.find_by_county(args.county)
+
+
+def write_mcis(rows: list[tuple[str, ...]], reports_only: bool, output: TextIO) -> None:
+    """
+    Writes rows as csv with a header.
+    :param reports_only: Only write each report_file and report_month once
+    """
+    writer = csv.writer(output, lineterminator="\n")
+    if reports_only:
+        writer.writerow(MCI_COLUMNS[:2])
+        writer.writerows(dict.fromkeys(row[:2] for row in rows))
+    else:
+        writer.writerow(MCI_COLUMNS)
+        writer.writerows(rows)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses command line options"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--store",
+        default=OUTPUT_STORE_FILEPATH,
+        help="Output store written by parse_reports (default: output/mci_output.sqlite3)",
+    )
+    parser.add_argument(
+        "--reports",
+        action="store_true",
+        help="Only list the reports which contain matching rows",
+    )
+    lookups = parser.add_subparsers(dest="lookup", required=True)
+    docket = lookups.add_parser("docket", help="Rows of a docket number")
+    docket.add_argument("docket_number")
+    address = lookups.add_parser(
+        "address",
+        help="Rows of a street address, ignoring case, punctuation and abbreviations",
+    )
+    address.add_argument("street_address")
+    address.add_argument("--zip-code", help="Only rows in this zip code")
+    county = lookups.add_parser("county", help="Rows of a county")
+    county.add_argument("county")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if not os.path.exists(args.store):
+        raise Exception(f"No output store at {args.store}; run parse_reports first")
+    with closing(MciOutputStore(args.store)) as store:
+        started = time.perf_counter()
+        rows = find_mcis(store, args)
+        elapsed = time.perf_counter() - started
+    write_mcis(rows, args.reports, sys.stdout)
+    print(f"{len(rows)} rows in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Parses each report in its own process, so a malformed or hanging report cannot stop a batch"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import asdict, dataclass, field
+import json
+import multiprocessing
+from pathlib import Path
+import time
+import traceback
+from typing import TYPE_CHECKING
+
+from src.MciFileProcessor.mci_file_processor import MciParseError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from multiprocessing.connection import Connection
+
+# Seconds a report may take to parse before its process is killed
+REPORT_TIMEOUT_SECONDS = 600.0
+
+
+@dataclass(frozen=True)
+class IsolationOptions:
+    """How reports of a batch are isolated from each other"""
+
+    # File to which each failed report is appended as a JSON line
+    dead_letter_path: str
+    timeout: float = REPORT_TIMEOUT_SECONDS
+
+
+@dataclass
+class ReportFailure:
+    """A report which could not be parsed or written"""
+
+    report_file: str
+    error_type: str
+    message: str
+    # Line of the report which failed to parse, numbered from 1, when known
+    line_number: int | None = None
+    line: str | None = None
+    # Lines preceding the line which failed
+    context: list[str] = field(default_factory=list)
+    traceback: str = ""
+
+    @classmethod
+    def from_exception(cls, report_file: str, error: BaseException) -> ReportFailure:
+        failure = cls(
+            report_file,
+            type(error).__name__,
+            str(error),
+            traceback="".join(traceback.format_exception(error)),
+        )
+        if isinstance(error, MciParseError):
+            failure.message = error.reason
+            failure.line_number = error.line_number
+            failure.line = error.line
+            failure.context = error.context
+        return failure
+
+    def append_to(self, dead_letter_path: str) -> None:
+        """Appends the failure to the dead letter file as a JSON line"""
+        Path(dead_letter_path).parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "failed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **asdict(self),
+        }
+        with open(dead_letter_path, "a") as dead_letter:
+            dead_letter.write(json.dumps(record) + "\n")
+
+
+@dataclass
+class RunningReport:
+    """A report being parsed in a child process"""
+
+    filepath: str
+    process: multiprocessing.Process
+    connection: Connection
+    timeout: float
+    deadline: float
+
+    @property
+    def report_file(self) -> str:
+        return Path(self.filepath).name
+
+
+def parse_in_child(
+    parse: Callable[[str], object], filepath: str, connection: Connection
+) -> None:
+    """Runs in the child process, and sends back the parsed report or its failure"""
+    try:
+        result = parse(filepath)
+    except Exception as error:
+        result = ReportFailure.from_exception(Path(filepath).name, error)
+    connection.send(result)
+    connection.close()
+
+
+def start_report(
+    parse: Callable[[str], object], filepath: str, timeout: float
+) -> RunningReport:
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    # Not a daemon, since daemons may not start the processes which extract pdf pages;
+    # iter_isolated_reports kills any child still running when it stops
+    process = multiprocessing.Process(
+        target=parse_in_child, args=(parse, filepath, sender)
+    )
+    process.start()
+    # Only the child holds the sending end, so a child which dies is seen as end of file
+    sender.close()
+    return RunningReport(
+        filepath, process, receiver, timeout, time.monotonic() + timeout
+    )
+
+
+def finish_report(report: RunningReport) -> object:
+    """Waits for the result of a report until its deadline, killing it when exceeded"""
+    try:
+        if not report.connection.poll(max(report.deadline - time.monotonic(), 0)):
+            report.process.kill()
+            return ReportFailure(
+                report.report_file,
+                "TimeoutError",
+                f"Parsing took longer than {report.timeout:g} seconds",
+            )
+        return report.connection.recv()
+    except EOFError:
+        report.process.join()
+        return ReportFailure(
+            report.report_file,
+            "ProcessExited",
+            f"Parser process exited with code {report.process.exitcode} "
+            "without a result",
+        )
+    finally:
+        report.process.join()
+        report.connection.close()
+
+
+def iter_isolated_reports(
+    filepaths: Iterable[str],
+    parse: Callable[[str], object],
+    workers: int = 1,
+    timeout: float = REPORT_TIMEOUT_SECONDS,
+) -> Iterator[object]:
+    """
+    Parses each report in a child process of its own, at most workers at a time.
+    Yields the result of parse, or a ReportFailure when it raised, timed out or its
+    process died, in the order of filepaths.
+    :param parse: Module-level function, or partial of one, parsing a report filepath
+    """
+    running: deque[RunningReport] = deque()
+    try:
+        for filepath in filepaths:
+            if len(running) >= max(workers, 1):
+                yield finish_report(running.popleft())
+            running.append(start_report(parse, filepath, timeout))
+        while running:
+            yield finish_report(running.popleft())
+    finally:
+        for report in running:
+            report.process.kill()
+            report.process.join()
+            report.connection.close()
@@ -0,0 +1 @@
+"""Initializes report_manifest directory"""
@@ -0,0 +1,211 @@
+"""Records which reports have been parsed, so unchanged reports are skipped"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import os
+from pathlib import Path
+import sqlite3
+import time
+
+from src.text_cache.text_cache import hash_file
+
+CREATE_REPORTS_TABLE = """
+CREATE TABLE IF NOT EXISTS reports (
+    filename TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    parser_version TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    processed_at TEXT NOT NULL
+)
+"""
+# Progress through reports which are being processed
+CREATE_CHECKPOINTS_TABLE = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    filename TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    parser_version TEXT NOT NULL,
+    parse_state TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    output_offset INTEGER NOT NULL,
+    saved_at TEXT NOT NULL
+)
+"""
+# Legacy manifest entries carry no content information
+UNKNOWN_HASH = ""
+
+
+@dataclass
+class ManifestEntry:
+    """A processed report"""
+
+    filename: str
+    content_hash: str
+    size: int
+    mtime_ns: int
+    parser_version: str
+    row_count: int
+    processed_at: str
+
+
+@dataclass
+class ReportCheckpoint:
+    """Progress through a report, from which an interrupted run resumes"""
+
+    filename: str
+    content_hash: str
+    # Parse state after the lines processed so far, as ParseCheckpoint JSON
+    parse_state: str
+    # Rows of the report written before the checkpoint
+    row_count: int
+    # Size of the csv output once those rows were written, -1 for other outputs
+    output_offset: int = -1
+
+
+class ReportManifest:
+    """
+    SQLite-backed manifest of processed reports.
+    A report is current when it was parsed by the current parser version and its
+    content hash is unchanged. Size and modification time are checked first,
+    so unchanged files are never read.
+    Reports which are being processed may have a checkpoint of their progress,
+    which is removed once they are recorded as processed.
+    """
+
+    def __init__(self, db_path: str, parser_version: str) -> None:
+        super().__init__()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(CREATE_REPORTS_TABLE)
+        self.connection.execute(CREATE_CHECKPOINTS_TABLE)
+        self.connection.commit()
+        self.parser_version = parser_version
+
+    def close(self) -> None:
+        """Closes the database connection"""
+        self.connection.close()
+
+    def get(self, filename: str) -> ManifestEntry | None:
+        """Returns manifest entry for filename, if it has been processed"""
+        row = self.connection.execute(
+            "SELECT filename, content_hash, size, mtime_ns, parser_version, row_count,"
+            " processed_at FROM reports WHERE filename = ?",
+            (filename,),
+        ).fetchone()
+        return ManifestEntry(*row) if row else None
+
+    def is_current(self, filepath: str, filename: str) -> bool:
+        """
+        Returns whether report was already processed with identical content
+        by the current parser version.
+        A file that was merely touched has its size and modification time refreshed,
+        so the next run can skip it without hashing.
+        """
+        entry = self.get(filename)
+        if not entry or entry.parser_version != self.parser_version:
+            return False
+        stat = Path(filepath).stat()
+        if (
+            entry.content_hash != UNKNOWN_HASH
+            and entry.size == stat.st_size
+            and entry.mtime_ns == stat.st_mtime_ns
+        ):
+            return True
+
+        content_hash = hash_file(filepath)
+        if entry.content_hash not in (UNKNOWN_HASH, content_hash):
+            return False
+        self.connection.execute(
+            "UPDATE reports SET content_hash = ?, size = ?, mtime_ns = ?"
+            " WHERE filename = ?",
+            (content_hash, stat.st_size, stat.st_mtime_ns, filename),
+        )
+        self.connection.commit()
+        return True
+
+    def record(self, filepath: str, filename: str, row_count: int) -> None:
+        """Records that report was processed into row_count rows"""
+        stat = Path(filepath).stat()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                filename,
+                hash_file(filepath),
+                stat.st_size,
+                stat.st_mtime_ns,
+                self.parser_version,
+                row_count,
+                time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            ),
+        )
+        self.connection.execute(
+            "DELETE FROM checkpoints WHERE filename = ?", (filename,)
+        )
+        self.connection.commit()
+
+    def save_checkpoint(self, checkpoint: ReportCheckpoint) -> None:
+        """Replaces the checkpoint of a report being processed"""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                checkpoint.filename,
+                checkpoint.content_hash,
+                self.parser_version,
+                checkpoint.parse_state,
+                checkpoint.row_count,
+                checkpoint.output_offset,
+                time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            ),
+        )
+        self.connection.commit()
+
+    def get_checkpoint(
+        self, filename: str, content_hash: str
+    ) -> ReportCheckpoint | None:
+        """
+        Returns the checkpoint of report, unless its content or the parser version
+        changed since it was saved, in which case it is discarded
+        """
+        row = self.connection.execute(
+            "SELECT filename, content_hash, parse_state, row_count, output_offset"
+            " FROM checkpoints WHERE filename = ? AND parser_version = ?",
+            (filename, self.parser_version),
+        ).fetchone()
+        if row and row[1] == content_hash:
+            return ReportCheckpoint(*row)
+        self.discard_checkpoint(filename)
+        return None
+
+    def discard_checkpoint(self, filename: str) -> None:
+        """Removes the checkpoint of report, so that it is processed from the start"""
+        self.connection.execute(
+            "DELETE FROM checkpoints WHERE filename = ?", (filename,)
+        )
+        self.connection.commit()
+
+    def list_checkpoints(self) -> set[str]:
+        """Returns filenames of the reports which have a checkpoint"""
+        return {
+            filename
+            for (filename,) in self.connection.execute(
+                "SELECT filename FROM checkpoints"
+            )
+        }
+
+    def import_legacy_log(self, log_path: str) -> None:
+        """
+        Imports filenames from the flat processed_reports.log manifest.
+        Their content is unknown, so they are hashed the next time they are checked
+        and treated as current rather than parsed again.
+        """
+        if not os.path.exists(log_path):
+            return
+        with open(log_path) as log:
+            filenames = {line.strip() for line in log if line.strip()}
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO reports VALUES (?, ?, -1, -1, ?, 0, '')",
+            [(filename, UNKNOWN_HASH, self.parser_version) for filename in filenames],
+        )
+        self.connection.commit()
@@ -0,0 +1 @@
+"""Initializes run_metrics directory"""
@@ -0,0 +1,185 @@
+"""Counts of a parse run, written in the Prometheus textfile collector format"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import TYPE_CHECKING
+
+from src.atomic_files.atomic_files import replace_file
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+METRIC_PREFIX = "mci_parse"
+# Counts start from zero on every run, so they are exported as gauges of the last run
+# rather than as counters, which Prometheus expects never to decrease
+LAST_RUN_PREFIX = f"{METRIC_PREFIX}_last_run"
+# Label of the cases counted before any county header
+UNKNOWN_COUNTY = "UNKNOWN"
+# Upper bounds, in seconds, of the report duration histogram buckets
+REPORT_DURATION_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Counts of files and rows, with their help text
+FILE_COUNTERS = {
+    "files_scanned": "Report files found in the input directory by the last run",
+    "files_skipped": "Report files the last run skipped as already processed",
+    "files_parsed": "Report files parsed and written by the last run",
+    "files_failed": "Report files whose parsing or writing failed in the last run",
+    "rows_written": "MCI rows written by the last run",
+    "bytes_read": "Bytes of report files parsed by the last run",
+}
+# Help text of the samples of the report duration histogram
+HISTOGRAM_SAMPLES = {
+    "bucket": "Reports of the last run parsed and written within le seconds",
+    "sum": "Seconds taken to parse and write the reports of the last run",
+    "count": "Reports parsed and written by the last run",
+}
+
+
+def escape_label_value(value: str) -> str:
+    """Escapes a label value as the Prometheus text format requires"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value: float) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+@dataclass
+class Histogram:
+    """Cumulative histogram of observed values"""
+
+    buckets: tuple[float, ...] = REPORT_DURATION_BUCKETS
+    bucket_counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        # One count per bucket, and a last one for +Inf
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def to_lines(self, name: str) -> list[str]:
+        """Samples of the histogram in the text format"""
+        lines: list[str] = []
+        cumulative = 0
+        for bound, bucket_count in zip(
+            (*map(format_value, self.buckets), "+Inf"), self.bucket_counts, strict=True
+        ):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum {format_value(self.total)}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+@dataclass
+class RunMetrics:
+    """
+    Counts what a run of process_directory scanned, skipped, parsed and wrote.
+    Values cover a single run, and the textfile is replaced at the end of each run.
+    As a failed run resets them, they are exported as gauges of the last run.
+    """
+
+    textfile_path: str
+    counters: dict[str, int] = field(
+        default_factory=lambda: dict.fromkeys(FILE_COUNTERS, 0)
+    )
+    county_cases: dict[str, int] = field(default_factory=dict)
+    report_durations: Histogram = field(default_factory=Histogram)
+
+    def reset(self) -> None:
+        """Clears the counts of the previous run"""
+        self.counters = dict.fromkeys(FILE_COUNTERS, 0)
+        self.county_cases = {}
+        self.report_durations = Histogram()
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        self.counters[counter] += amount
+
+    def record_report(
+        self,
+        rows: int,
+        size_bytes: int,
+        seconds: float,
+        county_counts: Mapping[str | None, int],
+    ) -> None:
+        """Records a report which has been parsed and written"""
+        self.count("files_parsed")
+        self.count("rows_written", rows)
+        self.count("bytes_read", size_bytes)
+        self.report_durations.observe(seconds)
+        for county, cases in county_counts.items():
+            label = county or UNKNOWN_COUNTY
+            self.county_cases[label] = self.county_cases.get(label, 0) + cases
+
+    def to_prometheus(self, run_seconds: float, succeeded: bool) -> str:
+        """Formats the metrics of a finished run in the Prometheus text format"""
+        lines: list[str] = []
+        for counter, help_text in FILE_COUNTERS.items():
+            name = f"{LAST_RUN_PREFIX}_{counter}"
+            lines += [
+                f"# HELP {name} {help_text}",
+                f"# TYPE {name} gauge",
+                f"{name} {self.counters[counter]}",
+            ]
+        name = f"{LAST_RUN_PREFIX}_county_cases"
+        lines += [
+            f"# HELP {name} Cases counted per county in the reports of the last run",
+            f"# TYPE {name} gauge",
+        ]
+        lines += [
+            f'{name}{{county="{escape_label_value(county)}"}} {cases}'
+            for county, cases in sorted(self.county_cases.items())
+        ]
+        # The histogram restarts with each run too, so each of its samples is a gauge
+        name = f"{LAST_RUN_PREFIX}_report_duration_seconds"
+        samples = self.report_durations.to_lines(name)
+        for sample, help_text in HISTOGRAM_SAMPLES.items():
+            lines += [
+                f"# HELP {name}_{sample} {help_text}",
+                f"# TYPE {name}_{sample} gauge",
+                *(line for line in samples if line.startswith(f"{name}_{sample}")),
+            ]
+        for name, help_text, value in (
+            ("run_duration_seconds", "Wall time of the run", run_seconds),
+            (
+                "last_run_success",
+                "Whether the run completed (1) or failed (0)",
+                int(succeeded),
+            ),
+            (
+                "last_run_timestamp_seconds",
+                "Unix time at which the run ended",
+                time.time(),
+            ),
+        ):
+            lines += [
+                f"# HELP {METRIC_PREFIX}_{name} {help_text}",
+                f"# TYPE {METRIC_PREFIX}_{name} gauge",
+                f"{METRIC_PREFIX}_{name} {format_value(value)}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, run_seconds: float, succeeded: bool) -> None:
+        """
+        Atomically replaces the textfile, so the node exporter's textfile collector
+        never reads a partial file, leaving it readable by the collector's user
+        """
+        directory = os.path.dirname(self.textfile_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with open(fd, "w") as textfile:
+                textfile.write(self.to_prometheus(run_seconds, succeeded))
+            replace_file(temp_path, self.textfile_path)
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
@@ -0,0 +1,236 @@
+"""Downloads new reports and parses each one as soon as its download completes"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import closing
+from dataclasses import dataclass
+import logging
+import os
+import queue
+import threading
+from typing import TYPE_CHECKING
+
+from src import fetch_reports, parse_reports
+from src.fetch_reports import DOWNLOAD_WORKERS
+from src.MciFileProcessor.mci_file_processor import (
+    DEFAULT_EXTRACTION,
+    ExtractionOptions,
+    parse_mci_report,
+)
+from src.regexes.filename_patterns import is_valid_input_filename
+from src.text_cache.text_cache import ExtractedTextCache
+from src.text_extractors.text_extractors import DEFAULT_BACKEND, EXTRACTORS
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    import requests
+
+    from src.fetch_reports import ReportLink
+    from src.MciFileProcessor.mci_file_processor import ParsedReport
+    from src.report_manifest.report_manifest import ReportManifest
+
+# Downloaded reports waiting for a parse worker; downloads block when it is full
+PIPELINE_QUEUE_SIZE = 4
+QUEUE_POLL_SECONDS = 0.1
+
+
+@dataclass(frozen=True)
+class PipelineOptions:
+    """How many reports are downloaded and parsed at once"""
+
+    download_workers: int = DOWNLOAD_WORKERS
+    parse_workers: int = 1
+    queue_size: int = PIPELINE_QUEUE_SIZE
+    extraction: ExtractionOptions = DEFAULT_EXTRACTION
+
+
+DEFAULT_PIPELINE = PipelineOptions()
+
+
+class ReportParser:
+    """
+    Parses reports in a bounded process pool and writes each one to the output
+    store, and records it in the manifest, as soon as it is parsed.
+    """
+
+    def __init__(
+        self,
+        executor: ProcessPoolExecutor,
+        manifest: ReportManifest,
+        options: PipelineOptions,
+    ) -> None:
+        super().__init__()
+        self.executor = executor
+        self.manifest = manifest
+        self.options = options
+        self.data_dir = str(fetch_reports.DATA_DIR)
+        self.parsing: dict[Future[ParsedReport], str] = {}
+        self.submitted: set[str] = set()
+        self.parsed = 0
+        self.failed: list[str] = []
+
+    def submit(self, file: str) -> None:
+        """Parses report, first waiting for a worker if all of them are busy"""
+        while len(self.parsing) >= max(self.options.parse_workers, 1):
+            self.write_completed()
+        future = self.executor.submit(
+            parse_mci_report,
+            os.path.join(self.data_dir, file),
+            extraction=self.options.extraction,
+        )
+        self.parsing[future] = file
+        self.submitted.add(file)
+
+    def write_completed(self) -> None:
+        """
+        Waits for at least one parse to finish and writes out its rows.
+        A report which fails is logged and left out of the manifest, so the next run
+        parses it again, while the other reports carry on.
+        """
+        done, _ = wait(self.parsing, return_when=FIRST_COMPLETED)
+        for future in done:
+            file = self.parsing.pop(future)
+            try:
+                row_count = parse_reports.write_parsed_report(
+                    self.data_dir, file, future.result(), self.manifest
+                )
+            except Exception:
+                logging.exception("Failed to parse %s", file)
+                self.failed.append(file)
+                continue
+            self.parsed += 1
+            logging.info("Parsed %s (%d rows)", file, row_count)
+
+    def finish(self) -> None:
+        """Waits for all submitted reports to be written"""
+        while self.parsing:
+            self.write_completed()
+
+
+def run_pipeline(
+    links: list[ReportLink],
+    session: requests.Session,
+    options: PipelineOptions = DEFAULT_PIPELINE,
+) -> int:
+    """
+    Downloads links and parses each new or changed report as soon as it is downloaded,
+    rather than after every download has finished.
+    Reports already in the data directory which have not been parsed yet are parsed
+    once the downloads are done.
+    Rows are written to the output store configured in parse_reports.
+    Reports which fail to parse or write are logged and retried by the next run.
+    :return: Number of reports parsed
+    """
+    downloaded: queue.Queue[str | None] = queue.Queue(maxsize=options.queue_size)
+    stopped = threading.Event()
+
+    def enqueue(file: str | None) -> None:
+        # Blocks while the parsers are behind, unless parsing has stopped
+        while not stopped.is_set():
+            try:
+                downloaded.put(file, timeout=QUEUE_POLL_SECONDS)
+            except queue.Full:
+                continue
+            return
+
+    def fetch() -> None:
+        try:
+            fetch_reports.download_reports(
+                links,
+                session,
+                options.download_workers,
+                on_download=lambda link: enqueue(link.filename),
+            )
+        finally:
+            enqueue(None)
+
+    fetcher = threading.Thread(target=fetch, name="fetch_reports")
+    with (
+        closing(parse_reports.open_manifest()) as manifest,
+        ProcessPoolExecutor(max_workers=max(options.parse_workers, 1)) as executor,
+    ):
+        parser = ReportParser(executor, manifest, options)
+        fetcher.start()
+        try:
+            while (file := downloaded.get()) is not None:
+                if is_valid_input_filename(file):
+                    parser.submit(file)
+            for file in parse_reports.list_pending_reports(parser.data_dir, manifest):
+                if file not in parser.submitted:
+                    parser.submit(file)
+            parser.finish()
+        finally:
+            stopped.set()
+            fetcher.join()
+    if parser.failed:
+        logging.error(
+            "Failed to parse %d reports, to be retried on the next run: %s",
+            len(parser.failed),
+            ", ".join(parser.failed),
+        )
+    return parser.parsed
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses command line options"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=DOWNLOAD_WORKERS,
+        help=f"Number of reports downloaded concurrently (default: {DOWNLOAD_WORKERS})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to parse reports (default: 1)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=PIPELINE_QUEUE_SIZE,
+        help="Number of downloaded reports which may wait for a parse worker "
+        f"before downloads pause (default: {PIPELINE_QUEUE_SIZE})",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(EXTRACTORS),
+        default=DEFAULT_BACKEND,
+        help=f"Library used to extract pdf text (default: {DEFAULT_BACKEND})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    options = PipelineOptions(
+        download_workers=args.download_workers,
+        parse_workers=args.workers,
+        queue_size=args.queue_size,
+        extraction=ExtractionOptions(
+            backend=args.backend,
+            text_cache=ExtractedTextCache(parse_reports.TEXT_CACHE_DIR),
+        ),
+    )
+    parse_reports.set_output_store(parse_reports.OUTPUT_STORE_FILEPATH)
+    with fetch_reports.create_session(
+        pool_size=max(args.download_workers, 1)
+    ) as session:
+        links = fetch_reports.extract_report_links(
+            fetch_reports.fetch_listing_html(session)
+        )
+        logging.info("Found %d candidate report links", len(links))
+        parsed = run_pipeline(links, session, options)
+    logging.info("Parsed %d reports", parsed)
+    if parse_reports.OUTPUT_STORE:
+        parse_reports.OUTPUT_STORE.export_csv(parse_reports.CSV_OUTPUT_FILEPATH)
+    parse_reports.set_output_store(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""On-disk cache of lines extracted from pdf files"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+from pathlib import Path
+import tempfile
+from typing import TYPE_CHECKING
+
+from src.atomic_files.atomic_files import replace_file
+from src.text_extractors.text_extractors import get_extractor
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+# Bump whenever the layout of cached lines changes, to invalidate old entries
+CACHE_FORMAT_VERSION = "1"
+CACHE_FILE_SUFFIX = ".lines"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(filepath: str) -> str:
+    """Returns SHA-256 hex digest of file contents"""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractedTextCache:
+    """
+    Caches the lines extracted from a pdf, keyed by the SHA-256 of the pdf bytes
+    together with the extraction backend and its version.
+    Entries are plain text files, one extracted line per line.
+    When the cache grows beyond max_bytes, least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def get_key(self, filepath: str, backend: str) -> str:
+        """Returns cache key for pdf extracted with backend"""
+        version = get_extractor(backend).version
+        return f"{hash_file(filepath)}-{backend}-{version}-{CACHE_FORMAT_VERSION}"
+
+    def get_entry_path(self, key: str) -> str:
+        """Returns path of cache entry"""
+        return os.path.join(self.directory, key + CACHE_FILE_SUFFIX)
+
+    def iter_lines(
+        self, filepath: str, backend: str, extract: Callable[[], Iterator[str]]
+    ) -> Iterator[str]:
+        """
+        Yields the cached lines of pdf.
+        On a miss, lines are yielded from extract while being written through to the cache.
+        The entry only becomes visible once extraction has completed.
+        """
+        entry_path = self.get_entry_path(self.get_key(filepath, backend))
+        try:
+            # Lines may contain carriage returns, so only "\n" ends a line
+            cached = open(entry_path, encoding="utf-8", newline="\n")
+        except FileNotFoundError:
+            pass
+        else:
+            # Refresh modification time, which orders entries for eviction
+            os.utime(entry_path)
+            with cached:
+                for line in cached:
+                    yield line[:-1]
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with open(fd, "w", encoding="utf-8", newline="\n") as entry:
+                for line in extract():
+                    entry.write(f"{line}\n")
+                    yield line
+            replace_file(temp_path, entry_path)
+        finally:
+            # Extraction failed or the consumer stopped early
+            Path(temp_path).unlink(missing_ok=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits in max_bytes"""
+        entries: list[tuple[float, int, str]] = []
+        with os.scandir(self.directory) as scan:
+            for dir_entry in scan:
+                if dir_entry.name.endswith(CACHE_FILE_SUFFIX):
+                    with contextlib.suppress(FileNotFoundError):
+                        stat = dir_entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            # Another process may already have evicted the entry
+            Path(path).unlink(missing_ok=True)
+            total_bytes -= size
@@ -0,0 +1 @@
+"""Initializes text_extractors directory"""
@@ -0,0 +1,169 @@
+"""Extracts the text of pdf pages with interchangeable pdf libraries"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Protocol
+
+import pdfplumber
+import pymupdf
+import pypdfium2
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+DEFAULT_BACKEND = "pdfplumber"
+# Words whose tops differ by no more than this many points are on the same line.
+# Matches pdfplumber's default y_tolerance.
+LINE_TOLERANCE = 3.0
+
+
+def normalize_page_lines(lines: Iterable[str]) -> str:
+    """
+    Converts the raw lines of a page into the form produced by pdfplumber:
+    single spaces between words, no blank lines and no trailing newline.
+    Without a trailing newline the last line of a page runs into the first line
+    of the next page, which get_line_type_and_matches compensates for.
+    """
+    return "\n".join(" ".join(line.split()) for line in lines if line.strip())
+
+
+class PdfTextExtractor(Protocol):
+    """Extracts the raw lines of text of pdf pages"""
+
+    @property
+    def version(self) -> str:
+        """Version of the underlying pdf library"""
+        ...
+
+    def count_pages(self, filepath: str) -> int:
+        """Returns number of pages in pdf"""
+        ...
+
+    def iter_page_lines(
+        self, filepath: str, start: int, stop: int | None
+    ) -> Iterator[list[str]]:
+        """Yields the lines of text of pages [start, stop), one page at a time"""
+        ...
+
+
+class PdfplumberExtractor:
+    """Extracts text with pdfplumber"""
+
+    @property
+    def version(self) -> str:
+        return pdfplumber.__version__
+
+    def count_pages(self, filepath: str) -> int:
+        with pdfplumber.open(filepath) as pdf:
+            return len(pdf.pages)
+
+    def iter_page_lines(
+        self, filepath: str, start: int, stop: int | None
+    ) -> Iterator[list[str]]:
+        with pdfplumber.open(filepath) as pdf:
+            for page in pdf.pages[start:stop]:
+                text = page.extract_text()
+                # Release the page's cached layout objects
+                page.close()
+                yield text.split("\n")
+
+
+class PymupdfExtractor:
+    """Extracts text with PyMuPDF, grouping words into lines by position"""
+
+    @property
+    def version(self) -> str:
+        return pymupdf.VersionBind
+
+    def count_pages(self, filepath: str) -> int:
+        with pymupdf.open(filepath) as pdf:
+            return pdf.page_count
+
+    def iter_page_lines(
+        self, filepath: str, start: int, stop: int | None
+    ) -> Iterator[list[str]]:
+        with pymupdf.open(filepath) as pdf:
+            for page_number in range(start, pdf.page_count if stop is None else stop):
+                yield self.get_page_lines(pdf[page_number])
+
+    @staticmethod
+    def get_page_lines(page: pymupdf.Page) -> list[str]:
+        """
+        Joins the words of page into lines.
+        Word boxes are in unrotated page space, so they are rotated into reading
+        order before words with (nearly) equal tops are grouped together.
+        """
+        words: list[tuple[float, float, str]] = []
+        for x0, y0, x1, y1, word, *_ in page.get_text("words"):
+            box = pymupdf.Rect(x0, y0, x1, y1) * page.rotation_matrix
+            words.append((box.y0, box.x0, word))
+        words.sort()
+
+        lines: list[list[tuple[float, float, str]]] = []
+        line_top = None
+        for word in words:
+            if line_top is None or word[0] - line_top > LINE_TOLERANCE:
+                lines.append([])
+                line_top = word[0]
+            lines[-1].append(word)
+        return [
+            " ".join(word for _, _, word in sorted(line, key=lambda word: word[1]))
+            for line in lines
+        ]
+
+
+class Pypdfium2Extractor:
+    """Extracts text with pypdfium2"""
+
+    @property
+    def version(self) -> str:
+        return pypdfium2.version.PYPDFIUM_INFO.version
+
+    def count_pages(self, filepath: str) -> int:
+        pdf = pypdfium2.PdfDocument(filepath)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def iter_page_lines(
+        self, filepath: str, start: int, stop: int | None
+    ) -> Iterator[list[str]]:
+        pdf = pypdfium2.PdfDocument(filepath)
+        try:
+            for page_number in range(start, len(pdf) if stop is None else stop):
+                page = pdf[page_number]
+                text_page = page.get_textpage()
+                text = text_page.get_text_range()
+                text_page.close()
+                page.close()
+                yield text.splitlines()
+        finally:
+            pdf.close()
+
+
+EXTRACTORS: dict[str, PdfTextExtractor] = {
+    "pdfplumber": PdfplumberExtractor(),
+    "pymupdf": PymupdfExtractor(),
+    "pypdfium2": Pypdfium2Extractor(),
+}
+
+
+def get_extractor(backend: str) -> PdfTextExtractor:
+    """Returns the extractor registered under backend name"""
+    if backend not in EXTRACTORS:
+        raise ValueError(
+            f"Unknown pdf backend {backend}. Choose from {', '.join(EXTRACTORS)}"
+        )
+    return EXTRACTORS[backend]
+
+
+def iter_page_texts(
+    filepath: str,
+    backend: str = DEFAULT_BACKEND,
+    start: int = 0,
+    stop: int | None = None,
+) -> Iterator[str]:
+    """Yields the normalised text of pdf pages [start, stop), one page at a time"""
+    for lines in get_extractor(backend).iter_page_lines(filepath, start, stop):
+        yield normalize_page_lines(lines)
@@ -0,0 +1,111 @@
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+from src.MciFileProcessor.mci_file_processor import (
+    ExtractionOptions,
+    MciFileProcessor,
+    ParseCheckpoint,
+    get_lines_from_file,
+    iter_lines_from_file,
+    iter_pdf_page_texts,
+    iter_txt_lines,
+)
+
+PDF_PATH = (
+    Path(__file__).resolve().parents[1] / "data" / "may-2024-mci-closed-case-report.pdf"
+)
+
+
+def test_parallel_page_extraction_matches_serial():
+    serial_lines = get_lines_from_file(str(PDF_PATH))
+    parallel_lines = get_lines_from_file(str(PDF_PATH), ExtractionOptions(workers=3))
+    assert parallel_lines == serial_lines
+
+
+def test_streamed_lines_preserve_cross_page_merge():
+    document_text = "".join(iter_pdf_page_texts(str(PDF_PATH)))
+    assert list(iter_lines_from_file(str(PDF_PATH))) == document_text.split("\n")
+
+
+def test_iter_mcis_yields_before_report_is_finished():
+    processor = MciFileProcessor(str(PDF_PATH))
+    streamed = processor.iter_mcis()
+    first = next(streamed)
+    assert processor.mci_count == 1
+    assert [first, *streamed] == MciFileProcessor(str(PDF_PATH)).process_file()
+
+
+def test_records_are_compact_and_share_repeated_values():
+    mcis = MciFileProcessor(
+        str(PDF_PATH), ExtractionOptions(backend="pypdfium2")
+    ).process_file()
+    assert not hasattr(mcis[0], "__dict__")
+    assert len(set(mcis)) == len(mcis)
+
+    counties = {id(mci.address.county) for mci in mcis}
+    assert len(counties) == len({mci.address.county for mci in mcis})
+    work_names = [mci.work_item.mci_work for mci in mcis if mci.work_item]
+    assert len({id(name) for name in work_names}) == len(set(work_names))
+
+
+def test_typed_values_parse_costs_and_dates_once():
+    legacy = MciFileProcessor(
+        str(PDF_PATH), ExtractionOptions(backend="pypdfium2")
+    ).process_file()
+    typed = MciFileProcessor(
+        str(PDF_PATH), ExtractionOptions(backend="pypdfium2", typed_values=True)
+    ).process_file()
+    assert len(typed) == len(legacy)
+
+    for legacy_mci, typed_mci in zip(legacy, typed, strict=True):
+        assert (
+            typed_mci.docket.closing_date
+            == datetime.strptime(legacy_mci.docket.closing_date, "%m/%d/%Y").date()
+        )
+        legacy_incr = legacy_mci.docket.monthly_mci_incr_per_room
+        assert typed_mci.docket.monthly_mci_incr_per_room == (
+            Decimal(legacy_incr) if legacy_incr else None
+        )
+        if legacy_mci.work_item:
+            assert typed_mci.work_item.claim_cost == Decimal(
+                legacy_mci.work_item.claim_cost
+            )
+            legacy_allow = legacy_mci.work_item.allow_cost
+            assert typed_mci.work_item.allow_cost == (
+                Decimal(legacy_allow) if legacy_allow else None
+            )
+
+
+def test_parse_resumes_from_checkpoint():
+    extraction = ExtractionOptions(backend="pypdfium2", typed_values=True)
+    items = list(MciFileProcessor(str(PDF_PATH), extraction).iter_checkpointed_mcis(50))
+    checkpoints = [item for item in items if isinstance(item, ParseCheckpoint)]
+    mcis = [item for item in items if not isinstance(item, ParseCheckpoint)]
+    assert mcis == MciFileProcessor(str(PDF_PATH), extraction).process_file()
+
+    middle = checkpoints[len(checkpoints) // 2]
+    assert middle.line_number % 50 == 0
+    restored = ParseCheckpoint.from_json(middle.to_json())
+    assert restored == middle
+    resumed = MciFileProcessor(str(PDF_PATH), extraction)
+    remaining = [
+        item
+        for item in resumed.iter_checkpointed_mcis(50, restored)
+        if not isinstance(item, ParseCheckpoint)
+    ]
+    assert mcis[: middle.mci_count] + remaining == mcis
+    assert resumed.mci_count == len(mcis)
+
+
+def test_txt_lines_skip_to_start_line_as_text_iteration_does(tmp_path):
+    lines = ["FOR KINGS COUNTY FROM\n", "\n", "  119 GLENWOOD AVENUE\n", "LAST"]
+    reports = {"lf.txt": "".join(lines), "crlf.txt": "\r\n".join(lines)}
+    reports["empty.txt"] = ""
+    for name, text in reports.items():
+        path = tmp_path / name
+        path.write_bytes(text.encode())
+        with path.open() as txt:
+            expected = txt.readlines()
+        for start_line in range(len(lines) + 2):
+            assert list(iter_txt_lines(str(path), start_line)) == expected[start_line:]
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+from src.MciFileProcessor.mci_file_processor import (
+    ExtractionOptions,
+    MciFileProcessor,
+    parse_mci_table,
+)
+from src.MciTable.mci_table import MISSING_CENTS, format_cents, to_cents
+from src.parse_reports import mci_to_row
+
+PDF_PATH = (
+    Path(__file__).resolve().parents[1] / "data" / "may-2024-mci-closed-case-report.pdf"
+)
+EXTRACTION = ExtractionOptions(backend="pypdfium2")
+
+
+@pytest.fixture(scope="module")
+def table():
+    return parse_mci_table(str(PDF_PATH), EXTRACTION)
+
+
+def test_table_rows_match_property_mci_rows(table):
+    mcis = MciFileProcessor(str(PDF_PATH), EXTRACTION).process_file()
+    expected = [mci_to_row(mci, PDF_PATH.name, "2024-05") for mci in mcis]
+    assert list(table.iter_rows(PDF_PATH.name, "2024-05")) == expected
+
+
+def test_filter_and_aggregate(table):
+    bronx_rows = table.where("county", "BRONX")
+    assert bronx_rows
+    assert table.where("county", "ATLANTIS") == []
+
+    bronx = table.take(bronx_rows)
+    assert len(bronx) == len(bronx_rows)
+    assert set(bronx.strings["county"]) == {"BRONX"}
+    totals = table.total_cents_by("county", "claim_cost")
+    assert totals["BRONX"] == bronx.total_cents("claim_cost")
+    assert sum(totals.values()) == table.total_cents("claim_cost")
+
+
+def test_costs_round_trip_as_printed():
+    assert to_cents("41500.00") == 4150000
+    assert format_cents(to_cents("0.05")) == "0.05"
+    assert to_cents(".50") == 50
+    assert format_cents(to_cents(".50")) == "0.50"
+    assert to_cents("") == MISSING_CENTS
+    assert format_cents(MISSING_CENTS) == ""
+    with pytest.raises(Exception, match="two decimal places"):
+        to_cents("41500")
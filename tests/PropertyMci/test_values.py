@@ -0,0 +1,17 @@
+from datetime import date
+from decimal import Decimal
+
+from src.PropertyMci.values import parse_amount, parse_closing_date
+
+
+def test_parse_amount_keeps_cents():
+    assert parse_amount("41500.00") == Decimal("41500.00")
+    assert str(parse_amount("22")) == "22.00"
+    assert str(parse_amount("9.9")) == "9.90"
+    assert parse_amount("") is None
+    assert parse_amount(None) is None
+
+
+def test_parse_closing_date():
+    assert parse_closing_date("06/21/2023") == date(2023, 6, 21)
+    assert parse_closing_date("") is None
@@ -0,0 +1,18 @@
+import os
+import stat
+import tempfile
+
+from src.atomic_files.atomic_files import UMASK, replace_file
+
+
+def test_replaced_file_has_permissions_of_a_new_file(tmp_path):
+    fd, temp_path = tempfile.mkstemp(dir=tmp_path, suffix=".tmp")
+    with open(fd, "w") as temp_file:
+        temp_file.write("complete")
+    destination = tmp_path / "published.txt"
+
+    replace_file(temp_path, destination)
+
+    assert destination.read_text() == "complete"
+    assert stat.S_IMODE(destination.stat().st_mode) == 0o666 & ~UMASK
+    assert not os.path.exists(temp_path)
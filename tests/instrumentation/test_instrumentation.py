@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.generate_synthetic_report import SyntheticReportOptions, write_synthetic_report
+from src.instrumentation.instrumentation import (
+    STAGES,
+    InstrumentedReport,
+    ParseInstrumentation,
+    parse_instrumented_report,
+)
+from src.MciFileProcessor.mci_file_processor import (
+    ExtractionOptions,
+    MciFileProcessor,
+    MciParseError,
+    parse_mci_report,
+)
+
+PDF_PATH = (
+    Path(__file__).resolve().parents[1] / "data" / "may-2024-mci-closed-case-report.pdf"
+)
+EXTRACTION = ExtractionOptions(backend="pypdfium2")
+
+
+def test_instrumented_report_yields_same_mcis_and_counts_lines():
+    report = InstrumentedReport(str(PDF_PATH), EXTRACTION)
+    assert list(report) == parse_mci_report(str(PDF_PATH), EXTRACTION).mcis
+
+    metrics = report.metrics
+    assert metrics.lines == sum(metrics.line_types.values()) > 0
+    assert metrics.line_types["MCI_WORK_LINE"] > 0
+    assert metrics.stages["classify"].calls == metrics.lines
+    assert metrics.stages["extract"].seconds > 0
+
+
+def test_write_report_records_json_line_and_profile(tmp_path):
+    metrics_path = tmp_path / "metrics.jsonl"
+    instrumentation = ParseInstrumentation(str(metrics_path), str(tmp_path / "prof"))
+    try:
+        for report in (
+            InstrumentedReport(str(PDF_PATH), EXTRACTION),
+            parse_instrumented_report(str(PDF_PATH), EXTRACTION),
+        ):
+            row_count = instrumentation.write_report(
+                report, "2024-05", lambda mcis: sum(1 for _ in mcis)
+            )
+    finally:
+        instrumentation.close()
+
+    records = [json.loads(line) for line in metrics_path.read_text().splitlines()]
+    assert len(records) == 2
+    for record in records:
+        assert record["event"] == "report"
+        assert record["report_file"] == PDF_PATH.name
+        assert record["report_month"] == "2024-05"
+        assert record["rows"] == row_count > 0
+        assert set(record["stages"]) == set(STAGES)
+        assert record["stages"]["write"]["seconds"] >= 0
+        assert record["peak_rss_kb"] > 0
+    assert (tmp_path / "prof" / (PDF_PATH.name + ".prof")).exists()
+
+
+def test_instrumented_parse_errors_match_uninstrumented_ones(tmp_path):
+    report_path = tmp_path / "may-2024-mci-closed-case-report.txt"
+    with report_path.open("w") as report:
+        write_synthetic_report(report, SyntheticReportOptions(cases=20))
+    lines = report_path.read_text().splitlines(keepends=True)
+    tally = next(i for i, line in enumerate(lines) if "TOTAL CASES:" in line)
+    lines[tally] = f" TOTAL CASES: {999:>16}\n"
+    report_path.write_text("".join(lines))
+
+    errors = []
+    for parse in (
+        lambda: list(InstrumentedReport(str(report_path))),
+        lambda: MciFileProcessor(str(report_path)).process_file(),
+    ):
+        with pytest.raises(MciParseError) as raised:
+            parse()
+        errors.append(raised.value)
+
+    instrumented, plain = errors
+    assert instrumented.line_number == plain.line_number == tally + 1
+    assert instrumented.context == plain.context == lines[tally - 3 : tally]
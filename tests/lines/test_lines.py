@@ -1,3 +1,5 @@
+import pytest
+
 from src.lines.lines import LineType, get_line_type_and_matches
 
 NO_LINE = ""
@@ -65,3 +67,39 @@ def test_well_formed_lines_processed():
 
 def test_unexpected_lines_log_errors():
     pass
+
+
+def test_headers_match_regardless_of_case():
+    assert (
+        get_line_type_and_matches(OFFICE_OF_RENT_HEADER.lower())[0]
+        == LineType.OFFICE_OF_RENT_HEADER
+    )
+    assert (
+        get_line_type_and_matches(COUNTY_DATE_HEADER.lower())[0]
+        == LineType.COUNTY_DATE_HEADER
+    )
+
+
+def test_keyword_lines_that_are_not_headers_fall_through():
+    line_type, line_matches = get_line_type_and_matches(
+        "MCI COMPLIANT WINDOWS 1200.00 1100.00"
+    )
+    assert line_type == LineType.MCI_WORK_LINE
+    assert line_matches.groups() == ("MCI COMPLIANT WINDOWS", "1200.00", " 1100.00")
+    assert (
+        get_line_type_and_matches("TOTAL ROOF REPLACEMENT 9000.00")[0]
+        == LineType.MCI_WORK_LINE
+    )
+
+
+def test_page_merged_lines_are_classified():
+    line_type, line_matches = get_line_type_and_matches(
+        f"{TOTAL_CASES_COUNTY_LINE}{NYS_DIVISION_HEADER} PAGE 3"
+    )
+    assert line_type == LineType.TOTAL_CASES_COUNTY_LINE
+    assert line_matches.group(1) == "14"
+
+
+def test_street_address_with_cost_is_unexpected():
+    with pytest.raises(Exception, match="Line Type not expected"):
+        get_line_type_and_matches("465 SHORE RD 12.00 FOO BAR")
@@ -0,0 +1,130 @@
+import sqlite3
+import stat
+
+import pytest
+
+from src.atomic_files.atomic_files import UMASK
+from src.output_store.output_store import MCI_COLUMNS, MciOutputStore
+
+
+def _rows(report_file: str, report_month: str, count: int) -> list[tuple[str, ...]]:
+    return [
+        (
+            report_file,
+            report_month,
+            *(f"{column}-{index}" for column in MCI_COLUMNS[2:]),
+        )
+        for index in range(count)
+    ]
+
+
+def test_replace_report_does_not_duplicate_rows(tmp_path):
+    store = MciOutputStore(str(tmp_path / "mci_output.sqlite3"))
+    try:
+        assert store.replace_report("a.pdf", _rows("a.pdf", "2024-05", 3)) == 3
+        assert store.replace_report("a.pdf", _rows("a.pdf", "2024-05", 2)) == 2
+        assert store.count_rows("a.pdf") == 2
+    finally:
+        store.close()
+
+
+def test_failed_replace_keeps_previous_rows(tmp_path):
+    store = MciOutputStore(str(tmp_path / "mci_output.sqlite3"))
+
+    def failing_rows():
+        yield from _rows("a.pdf", "2024-05", 1)
+        raise Exception("parse failed")
+
+    try:
+        store.replace_report("a.pdf", _rows("a.pdf", "2024-05", 3))
+        with pytest.raises(Exception, match="parse failed"):
+            store.replace_report("a.pdf", failing_rows())
+        assert store.count_rows("a.pdf") == 3
+    finally:
+        store.close()
+
+
+def test_append_rows_replaces_rows_after_row_count(tmp_path):
+    store = MciOutputStore(str(tmp_path / "mci_output.sqlite3"))
+    rows = _rows("a.pdf", "2024-05", 5)
+    try:
+        assert store.append_rows("a.pdf", rows[:3], 0) == 3
+        # Rows committed after the last checkpoint are written again on resume
+        assert store.append_rows("a.pdf", rows[2:], 2) == 5
+        assert store.count_rows("a.pdf") == 5
+        store.export_csv(str(tmp_path / "mci_output.csv"))
+        exported = (tmp_path / "mci_output.csv").read_text().splitlines()
+        assert exported[1:] == [",".join(row) for row in rows]
+    finally:
+        store.close()
+
+
+def test_export_csv_orders_by_report_month(tmp_path):
+    store = MciOutputStore(str(tmp_path / "mci_output.sqlite3"))
+    csv_path = tmp_path / "mci_output.csv"
+    try:
+        store.replace_report("june.pdf", _rows("june.pdf", "2024-06", 2))
+        store.replace_report("may.pdf", _rows("may.pdf", "2024-05", 2))
+        assert store.export_csv(str(csv_path)) == 4
+    finally:
+        store.close()
+
+    lines = csv_path.read_text().splitlines()
+    assert lines[0] == ",".join(MCI_COLUMNS)
+    assert [line.split(",")[0] for line in lines[1:]] == ["may.pdf"] * 2 + [
+        "june.pdf"
+    ] * 2
+    assert lines[1].split(",")[2] == "street_address-0"
+    # Readable by other users, as the csv appended to by earlier versions was
+    assert stat.S_IMODE(csv_path.stat().st_mode) == 0o666 & ~UMASK
+
+
+def test_find_by_docket_address_and_county(tmp_path):
+    store = MciOutputStore(str(tmp_path / "mci_output.sqlite3"))
+    may = ("may.pdf", "2024-05", "119 GLENWOOD AVE", "YONKERS", "10701", "WESTCHESTER")
+    june = ("june.pdf", "2024-06", "119 Glenwood Avenue", "YONKERS", "10701")
+    try:
+        store.replace_report(
+            "june.pdf",
+            [(*june, "WESTCHESTER", "KW910012OM", *MCI_COLUMNS[7:])],
+        )
+        store.replace_report(
+            "may.pdf",
+            [
+                (*may, "KW910012OM", *MCI_COLUMNS[7:]),
+                (*may[:5], "BRONX", "BX123456OM", *MCI_COLUMNS[7:]),
+            ],
+        )
+        assert [row[0] for row in store.find_by_docket("KW910012OM")] == [
+            "may.pdf",
+            "june.pdf",
+        ]
+        assert len(store.find_by_address("119 glenwood ave.", "10701")) == 3
+        assert store.find_by_address("119 GLENWOOD AVE", "10001") == []
+        assert [row[6] for row in store.find_by_county("bronx")] == ["BX123456OM"]
+    finally:
+        store.close()
+
+
+def test_store_without_address_keys_is_indexed_when_opened(tmp_path):
+    db_path = tmp_path / "mci_output.sqlite3"
+    connection = sqlite3.connect(db_path)
+    connection.execute(
+        "CREATE TABLE mcis (report_file TEXT NOT NULL, row_number INTEGER NOT NULL, "
+        + ", ".join(f"{column} TEXT NOT NULL" for column in MCI_COLUMNS[1:])
+        + ", PRIMARY KEY (report_file, row_number))"
+    )
+    connection.execute(
+        "INSERT INTO mcis VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ("a.pdf", 1, "2024-05", "1 MAIN STREET", *MCI_COLUMNS[3:]),
+    )
+    connection.commit()
+    connection.close()
+
+    store = MciOutputStore(str(db_path))
+    try:
+        assert [row[2] for row in store.find_by_address("1 Main St")] == [
+            "1 MAIN STREET"
+        ]
+    finally:
+        store.close()
@@ -0,0 +1,69 @@
+import csv
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+import stat
+
+import pytest
+
+from src.atomic_files.atomic_files import UMASK
+from src.MciFileProcessor.mci_file_processor import parse_mci_report
+from src.parquet_export.parquet_export import ParquetReportWriter
+
+pq = pytest.importorskip("pyarrow.parquet")
+ds = pytest.importorskip("pyarrow.dataset")
+
+PDF_PATH = (
+    Path(__file__).resolve().parents[1] / "data" / "may-2024-mci-closed-case-report.pdf"
+)
+EXPECTED_CSV_PATH = (
+    Path(__file__).resolve().parents[1] / "data" / "may-2024-expected.csv"
+)
+
+
+@pytest.fixture(scope="module")
+def may_2024_mcis():
+    return parse_mci_report(str(PDF_PATH)).mcis
+
+
+def test_report_is_written_with_typed_columns(tmp_path, may_2024_mcis):
+    writer = ParquetReportWriter(str(tmp_path))
+    row_count = writer.write_report(may_2024_mcis, PDF_PATH.name, "2024-05")
+
+    report_path = (
+        tmp_path / "report_month=2024-05" / "may-2024-mci-closed-case-report.parquet"
+    )
+    table = pq.read_table(report_path)
+    assert table.num_rows == row_count == len(may_2024_mcis)
+    assert (
+        str(table.schema.field("county").type)
+        == "dictionary<values=string, indices=int32, ordered=0>"
+    )
+    assert str(table.schema.field("claim_cost").type) == "decimal128(12, 2)"
+
+    with EXPECTED_CSV_PATH.open() as expected_file:
+        expected = list(csv.DictReader(expected_file))
+    rows = table.to_pylist()
+    assert len(rows) == len(expected)
+    for row, expected_row in zip(rows, expected, strict=True):
+        assert row["docket_number"] == expected_row["docket_number"]
+        assert row["county"] == expected_row["county"]
+        assert row["closing_date"].strftime("%m/%d/%Y") == expected_row["closing_date"]
+        for column in ("monthly_mci_incr_per_room", "claim_cost", "allow_cost"):
+            assert row[column] == (
+                Decimal(expected_row[column]) if expected_row[column] else None
+            )
+
+
+def test_rewritten_report_replaces_its_file(tmp_path, may_2024_mcis):
+    writer = ParquetReportWriter(str(tmp_path))
+    writer.write_report(may_2024_mcis, PDF_PATH.name, "2024-05")
+    writer.write_report(may_2024_mcis[:10], PDF_PATH.name, "2024-05")
+
+    dataset = ds.dataset(tmp_path, format="parquet", partitioning="hive")
+    table = dataset.to_table()
+    assert table.num_rows == 10
+    (report_file,) = tmp_path.rglob("*.parquet")
+    assert stat.S_IMODE(report_file.stat().st_mode) == 0o666 & ~UMASK
+    assert set(table.column("report_month").to_pylist()) == {"2024-05"}
+    assert table.column("closing_date")[0].as_py() > date(2024, 1, 1)
@@ -0,0 +1,76 @@
+import json
+import os
+import pickle
+
+from src.generate_synthetic_report import SyntheticReportOptions, write_synthetic_report
+from src.MciFileProcessor.mci_file_processor import (
+    MciParseError,
+    ParsedReport,
+    parse_mci_report,
+)
+from src.report_isolation.report_isolation import ReportFailure, iter_isolated_reports
+
+
+def write_report(path, corrupt: bool = False) -> list[str]:
+    """Writes a synthetic report, with a wrong county tally when corrupt"""
+    with path.open("w") as report:
+        write_synthetic_report(report, SyntheticReportOptions(cases=30))
+    # Lines of .txt reports are parsed with their line endings
+    lines = path.read_text().splitlines(keepends=True)
+    if corrupt:
+        tally = next(i for i, line in enumerate(lines) if "TOTAL CASES:" in line)
+        lines[tally] = f" TOTAL CASES: {999:>16}\n"
+        path.write_text("".join(lines))
+    return lines
+
+
+def test_failing_report_is_reported_with_line_and_context(tmp_path):
+    good = tmp_path / "may-2024-mci-closed-case-report.txt"
+    bad = tmp_path / "june-2024-mci-closed-case-report.txt"
+    write_report(good)
+    lines = write_report(bad, corrupt=True)
+    tally = next(i for i, line in enumerate(lines) if "TOTAL CASES:" in line)
+
+    results = list(
+        iter_isolated_reports([str(bad), str(good)], parse_mci_report, workers=2)
+    )
+
+    failure, parsed = results
+    assert isinstance(failure, ReportFailure)
+    assert failure.report_file == bad.name
+    assert failure.line_number == tally + 1
+    assert failure.line == lines[tally]
+    assert failure.context == lines[tally - 3 : tally]
+    assert "County count mismatch" in failure.message
+    assert isinstance(parsed, ParsedReport)
+    assert len(parsed.mcis) > 0
+
+
+def test_hanging_report_is_abandoned_after_timeout(tmp_path):
+    # Opening a named pipe without a writer blocks the parser forever
+    hanging = tmp_path / "may-2024-mci-closed-case-report.txt"
+    os.mkfifo(hanging)
+
+    (failure,) = iter_isolated_reports([str(hanging)], parse_mci_report, timeout=0.5)
+
+    assert isinstance(failure, ReportFailure)
+    assert failure.error_type == "TimeoutError"
+
+
+def test_failure_is_appended_to_dead_letter_file(tmp_path):
+    dead_letter = tmp_path / "quarantine" / "dead_letter.jsonl"
+    error = MciParseError("report.txt", 12, "BAD LINE", ["A", "B"], "Unexpected line")
+    # Parse errors are raised in worker processes, so they must survive pickling
+    error = pickle.loads(pickle.dumps(error))  # noqa: S301 - pickled just above
+
+    ReportFailure.from_exception("report.txt", error).append_to(str(dead_letter))
+    ReportFailure("other.txt", "TimeoutError", "Too slow").append_to(str(dead_letter))
+
+    first, second = (json.loads(line) for line in dead_letter.read_text().splitlines())
+    assert first["line_number"] == 12
+    assert first["line"] == "BAD LINE"
+    assert first["context"] == ["A", "B"]
+    assert first["message"] == "Unexpected line"
+    assert first["error_type"] == "MciParseError"
+    assert second["report_file"] == "other.txt"
+    assert second["line_number"] is None
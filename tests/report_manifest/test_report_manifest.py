@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+import shutil
+
+import pytest
+
+from src.report_manifest.report_manifest import (
+    UNKNOWN_HASH,
+    ReportCheckpoint,
+    ReportManifest,
+)
+
+PDF_PATH = (
+    Path(__file__).resolve().parents[1] / "data" / "may-2024-mci-closed-case-report.pdf"
+)
+
+
+@pytest.fixture
+def report(tmp_path):
+    report_path = tmp_path / PDF_PATH.name
+    shutil.copy(PDF_PATH, report_path)
+    return report_path
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = ReportManifest(str(tmp_path / "manifest.sqlite3"), "1")
+    yield manifest
+    manifest.close()
+
+
+def test_recorded_report_is_current(manifest, report):
+    assert not manifest.is_current(str(report), report.name)
+    manifest.record(str(report), report.name, 42)
+    assert manifest.is_current(str(report), report.name)
+    assert manifest.get(report.name).row_count == 42
+
+
+def test_touched_report_is_current_and_restatted(manifest, report):
+    manifest.record(str(report), report.name, 42)
+    os.utime(report, (0, 0))
+    assert manifest.is_current(str(report), report.name)
+    assert manifest.get(report.name).mtime_ns == 0
+
+
+def test_republished_report_is_not_current(manifest, report):
+    manifest.record(str(report), report.name, 42)
+    with report.open("ab") as pdf:
+        pdf.write(b"\n%republished\n")
+    assert not manifest.is_current(str(report), report.name)
+
+
+def test_new_parser_version_is_not_current(tmp_path, manifest, report):
+    manifest.record(str(report), report.name, 42)
+    manifest.close()
+    upgraded = ReportManifest(str(tmp_path / "manifest.sqlite3"), "2")
+    try:
+        assert not upgraded.is_current(str(report), report.name)
+    finally:
+        upgraded.close()
+
+
+def test_legacy_log_entries_are_current(tmp_path, manifest, report):
+    legacy_log = tmp_path / "processed_reports.log"
+    legacy_log.write_text(f"{report.name}\n\n")
+    manifest.import_legacy_log(str(legacy_log))
+    assert manifest.get(report.name).content_hash == UNKNOWN_HASH
+    assert manifest.is_current(str(report), report.name)
+    assert manifest.get(report.name).content_hash != UNKNOWN_HASH
+
+
+def test_checkpoint_is_kept_until_report_is_recorded(manifest, report):
+    checkpoint = ReportCheckpoint(report.name, "hash", "{}", 10, 2048)
+    manifest.save_checkpoint(checkpoint)
+    assert manifest.list_checkpoints() == {report.name}
+    assert manifest.get_checkpoint(report.name, "hash") == checkpoint
+
+    manifest.record(str(report), report.name, 42)
+    assert manifest.get_checkpoint(report.name, "hash") is None
+
+
+def test_checkpoint_of_changed_report_is_discarded(manifest, report):
+    manifest.save_checkpoint(ReportCheckpoint(report.name, "hash", "{}", 10))
+    assert manifest.get_checkpoint(report.name, "republished") is None
+    assert manifest.list_checkpoints() == set()
@@ -0,0 +1,45 @@
+import stat
+
+from src.atomic_files.atomic_files import UMASK
+from src.run_metrics.run_metrics import Histogram, RunMetrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(1.0, 5.0))
+    for seconds in (0.5, 1.0, 3.0, 9.0):
+        histogram.observe(seconds)
+
+    assert histogram.to_lines("duration") == [
+        'duration_bucket{le="1.0"} 2',
+        'duration_bucket{le="5.0"} 3',
+        'duration_bucket{le="+Inf"} 4',
+        "duration_sum 13.5",
+        "duration_count 4",
+    ]
+
+
+def test_textfile_has_help_type_and_county_labels(tmp_path):
+    textfile = tmp_path / "parse_reports.prom"
+    metrics = RunMetrics(str(textfile))
+    metrics.count("files_scanned", 2)
+    metrics.record_report(10, 2048, 0.2, {"BRONX": 3, 'NEW "YORK"': 1})
+    metrics.record_report(5, 1024, 0.3, {"BRONX": 2, None: 4})
+    metrics.write_textfile(run_seconds=1.5, succeeded=False)
+
+    lines = textfile.read_text().splitlines()
+    # Each run starts from zero, so nothing is exported as a counter
+    assert not [line for line in lines if line.endswith((" counter", " histogram"))]
+    assert "# TYPE mci_parse_last_run_files_scanned gauge" in lines
+    assert "mci_parse_last_run_files_parsed 2" in lines
+    assert "mci_parse_last_run_rows_written 15" in lines
+    assert "mci_parse_last_run_bytes_read 3072" in lines
+    assert 'mci_parse_last_run_county_cases{county="BRONX"} 5' in lines
+    assert 'mci_parse_last_run_county_cases{county="NEW \\"YORK\\""} 1' in lines
+    assert 'mci_parse_last_run_county_cases{county="UNKNOWN"} 4' in lines
+    assert "# TYPE mci_parse_last_run_report_duration_seconds_bucket gauge" in lines
+    assert 'mci_parse_last_run_report_duration_seconds_bucket{le="+Inf"} 2' in lines
+    assert "mci_parse_last_run_report_duration_seconds_count 2" in lines
+    assert "mci_parse_last_run_success 0" in lines
+    assert list(tmp_path.iterdir()) == [textfile]
+    # The node exporter usually runs as another user
+    assert stat.S_IMODE(textfile.stat().st_mode) == 0o666 & ~UMASK
@@ -0,0 +1,99 @@
+from decimal import Decimal
+import io
+from pathlib import Path
+from statistics import median
+
+import pytest
+
+from src import aggregate_reports
+from src.output_store.output_store import MCI_COLUMNS
+
+pytest.importorskip("numpy")
+
+ROWS = [
+    # report_file, report_month, county, docket_number, incr, name, claim, allow
+    ("a.pdf", "2024-05", "BRONX", "D1", "5.15", "ROOF", "100.00", "90.00"),
+    ("a.pdf", "2024-05", "BRONX", "D1", "5.15", "BOILER", "50.50", ""),
+    ("a.pdf", "2024-05", "BRONX", "D2", "", "WINDOWS", "20.00", "20.00"),
+    ("a.pdf", "2024-05", "KINGS", "D3", "9.9", "ROOF", "000000.00", "000000.00"),
+    ("b.pdf", "2024-06", "BRONX", "D4", "22", "ROOF", "1000.00", "500.00"),
+    ("b.pdf", "2024-06", "BRONX", "D5", "1.00", "", "", ""),
+]
+
+
+def _write_csv(path: Path) -> None:
+    lines = [",".join(MCI_COLUMNS)]
+    for report_file, month, county, docket, incr, name, claim, allow in ROWS:
+        values = dict.fromkeys(MCI_COLUMNS, "X")
+        values.update(
+            report_file=report_file,
+            report_month=month,
+            county=county,
+            docket_number=docket,
+            monthly_mci_incr_per_room=incr,
+            name=name,
+            claim_cost=claim,
+            allow_cost=allow,
+        )
+        lines.append(",".join(values[column] for column in MCI_COLUMNS))
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_aggregates_by_county(tmp_path):
+    csv_path = tmp_path / "mci_output.csv"
+    _write_csv(csv_path)
+    aggregates = aggregate_reports.aggregate(
+        aggregate_reports.load_mci_columns(str(csv_path)), ["county"]
+    )
+    assert [row["county"] for row in aggregates] == ["BRONX", "KINGS"]
+
+    bronx = aggregates[0]
+    assert bronx["mcis"] == 5
+    assert bronx["dockets"] == 4
+    assert bronx["claim_cost"] == Decimal("1170.50")
+    assert bronx["allow_cost"] == Decimal("610.00")
+    assert bronx["allowed_share"] == pytest.approx(610 / 1170.5)
+    # D1 counted once, D2 has no increase
+    assert bronx["incr_per_room_mean"] == pytest.approx((5.15 + 22 + 1) / 3)
+    assert bronx["incr_per_room_median"] == pytest.approx(median([5.15, 22, 1]))
+    assert bronx["incr_per_room_max"] == pytest.approx(22)
+
+    kings = aggregates[1]
+    assert kings["claim_cost"] == Decimal("0.00")
+    assert kings["allowed_share"] is None
+
+
+def test_aggregates_by_several_columns_are_written_as_csv(tmp_path):
+    csv_path = tmp_path / "mci_output.csv"
+    _write_csv(csv_path)
+    by = ["report_month", "name"]
+    aggregates = aggregate_reports.aggregate(
+        aggregate_reports.load_mci_columns(str(csv_path)), by
+    )
+    output = io.StringIO()
+    aggregate_reports.write_aggregates(aggregates, by, output)
+    lines = output.getvalue().splitlines()
+
+    assert lines[0].startswith("report_month,name,mcis,dockets,claim_cost")
+    assert [line.split(",")[:3] for line in lines[1:]] == [
+        ["2024-05", "BOILER", "1"],
+        ["2024-05", "ROOF", "2"],
+        ["2024-05", "WINDOWS", "1"],
+        ["2024-06", "", "1"],
+        ["2024-06", "ROOF", "1"],
+    ]
+    assert lines[2].split(",")[4] == "100.00"
+
+
+def test_legacy_csv_with_repeated_headers_and_ragged_rows(tmp_path):
+    csv_path = tmp_path / "mci_output.csv"
+    _write_csv(csv_path)
+    lines = csv_path.read_text().splitlines()
+    # Earlier versions appended a header on every run, and a run may stop mid-row
+    legacy = [*lines[:3], lines[0], *lines[3:], "c.pdf,2024-07,1 MAIN ST"]
+    csv_path.write_text("\n".join(legacy) + "\n")
+    aggregates = aggregate_reports.aggregate(
+        aggregate_reports.load_mci_columns(str(csv_path)), ["county"]
+    )
+    assert [row["mcis"] for row in aggregates] == [5, 1]
+    assert aggregates[0]["claim_cost"] == Decimal("1170.50")
@@ -0,0 +1,198 @@
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import stat
+import threading
+import time
+
+import pytest
+
+from src import fetch_reports
+from src.atomic_files.atomic_files import UMASK
+from src.fetch_reports import ReportLink
+
+REPORT_BODY = b"%PDF-1.4 report body" * 1000
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    """
+    Serves reports with an ETag, failing or truncating them according to the path.
+    Paths starting with /plain are served without validators, and HEAD requests for
+    paths starting with /nohead are rejected.
+    """
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    attempts: dict[str, int] = {}  # noqa: RUF012
+    bodies_sent: dict[str, int] = {}  # noqa: RUF012
+    body = REPORT_BODY
+
+    def send_report_headers(self):
+        cls = type(self)
+        etag = f'"{hashlib.sha256(cls.body).hexdigest()}"'
+        if not self.path.startswith("/plain") and self.headers["If-None-Match"] == etag:
+            self.send_response(304)
+            self.end_headers()
+            return False
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(cls.body)))
+        if not self.path.startswith("/plain"):
+            self.send_header("ETag", etag)
+        self.end_headers()
+        return True
+
+    def do_HEAD(self):
+        if self.path.startswith("/nohead"):
+            self.send_response(405)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_report_headers()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+            cls.attempts[self.path] = cls.attempts.get(self.path, 0) + 1
+            attempt = cls.attempts[self.path]
+        try:
+            time.sleep(0.05)
+            if self.path.startswith("/flaky") and attempt == 1:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if not self.send_report_headers():
+                return
+            if self.path.startswith("/truncated"):
+                self.wfile.write(cls.body[:100])
+                self.close_connection = True
+                return
+            self.wfile.write(cls.body)
+            with cls.lock:
+                cls.bodies_sent[self.path] = cls.bodies_sent.get(self.path, 0) + 1
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    ReportHandler.active = ReportHandler.max_active = 0
+    ReportHandler.attempts = {}
+    ReportHandler.bodies_sent = {}
+    ReportHandler.body = REPORT_BODY
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ReportHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_reports, "DATA_DIR", tmp_path)
+    return tmp_path
+
+
+def _may_link(url):
+    return ReportLink(title="May 2024 MCI Closed Case Report", url=url)
+
+
+def test_reports_download_concurrently_within_host_limit(data_dir, server):
+    links = [
+        ReportLink(
+            title=f"{month} 2024 MCI Closed Case Report", url=f"{server}/{month}"
+        )
+        for month in ("January", "February", "March", "April", "May", "June")
+    ]
+    with fetch_reports.create_session() as session:
+        assert fetch_reports.download_reports(links, session, workers=6) == 6
+
+    assert ReportHandler.max_active == fetch_reports.MAX_CONNECTIONS_PER_HOST
+    for link in links:
+        assert (data_dir / link.filename).read_bytes() == REPORT_BODY
+    assert not list(data_dir.glob("*.part"))
+    # Reports and their state stay readable by other users, as before they were
+    # written through temporary files
+    for path in (
+        data_dir / links[0].filename,
+        data_dir / fetch_reports.DOWNLOAD_STATE_FILENAME,
+    ):
+        assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~UMASK
+
+
+def test_failed_requests_are_retried(data_dir, server):
+    link = _may_link(f"{server}/flaky")
+    with fetch_reports.create_session() as session:
+        assert fetch_reports.download_reports([link], session) == 1
+    assert ReportHandler.attempts["/flaky"] == 2
+    assert (data_dir / link.filename).read_bytes() == REPORT_BODY
+
+
+def test_truncated_download_leaves_no_file(data_dir, server):
+    link = _may_link(f"{server}/truncated")
+    with fetch_reports.create_session() as session:
+        assert fetch_reports.download_reports([link], session) == 0
+    assert not (data_dir / link.filename).exists()
+    assert not list(data_dir.glob("*.part"))
+
+
+@pytest.mark.usefixtures("data_dir")
+def test_unchanged_report_is_not_transferred_again(server):
+    link = _may_link(f"{server}/report")
+    with fetch_reports.create_session() as session:
+        assert fetch_reports.download_reports([link], session) == 1
+        assert fetch_reports.download_reports([link], session) == 0
+    assert ReportHandler.bodies_sent["/report"] == 1
+
+
+def test_report_without_validators_republished_with_same_size(data_dir, server):
+    link = _may_link(f"{server}/plain")
+    corrected = REPORT_BODY.replace(b"body", b"BODY", 1)
+    with fetch_reports.create_session() as session:
+        assert fetch_reports.download_reports([link], session) == 1
+        assert fetch_reports.download_reports([link], session) == 0
+        ReportHandler.body = corrected
+        assert fetch_reports.download_reports([link], session) == 1
+    assert len(corrected) == len(REPORT_BODY)
+    assert (data_dir / link.filename).read_bytes() == corrected
+
+
+def test_republished_report_is_downloaded_again(data_dir, server):
+    link = _may_link(f"{server}/report")
+    with fetch_reports.create_session() as session:
+        assert fetch_reports.download_reports([link], session) == 1
+        ReportHandler.body = REPORT_BODY + b"%republished"
+        assert fetch_reports.download_reports([link], session) == 1
+    assert (data_dir / link.filename).read_bytes() == REPORT_BODY + b"%republished"
+
+
+def test_existing_report_without_state_is_adopted(data_dir, server):
+    link = _may_link(f"{server}/report")
+    (data_dir / link.filename).write_bytes(REPORT_BODY)
+    with fetch_reports.create_session() as session:
+        assert fetch_reports.download_reports([link], session) == 0
+        assert fetch_reports.download_reports([link], session) == 0
+    assert "/report" not in ReportHandler.bodies_sent
+    state = fetch_reports.DownloadState.load(
+        data_dir / fetch_reports.DOWNLOAD_STATE_FILENAME
+    )
+    record = state.get(link.filename)
+    assert record.sha256 == hashlib.sha256(REPORT_BODY).hexdigest()
+
+
+def test_existing_report_is_compared_when_head_is_rejected(data_dir, server):
+    link = _may_link(f"{server}/nohead")
+    (data_dir / link.filename).write_bytes(REPORT_BODY)
+    with fetch_reports.create_session() as session:
+        assert fetch_reports.download_reports([link], session) == 0
+        assert fetch_reports.download_reports([link], session) == 0
+    # The first run fetched the report to compare it, the second asked conditionally
+    assert ReportHandler.bodies_sent["/nohead"] == 1
+    assert (data_dir / link.filename).read_bytes() == REPORT_BODY
@@ -0,0 +1,61 @@
+import io
+
+from src.generate_synthetic_report import (
+    COUNTY_WEIGHTS,
+    SyntheticReportOptions,
+    split_cases,
+    write_synthetic_report,
+)
+from src.MciFileProcessor.mci_file_processor import MciFileProcessor, parse_mci_report
+from src.regexes.counties import counties
+
+
+def test_split_cases_assigns_every_case():
+    shares = split_cases(10, {"BRONX": 2, "KINGS": 1, "ULSTER": 0})
+    assert shares == {"BRONX": 7, "KINGS": 3}
+
+
+def test_parser_accepts_synthetic_report(tmp_path):
+    report = tmp_path / "synthetic-mci-closed-case-report.txt"
+    with report.open("w") as output:
+        summary = write_synthetic_report(output, SyntheticReportOptions(cases=500))
+
+    assert sum(summary.county_counts.values()) == 500
+    processor = MciFileProcessor(str(report))
+    mcis = processor.process_file()
+    assert len(mcis) == summary.mcis
+    assert dict(processor.county_counts) == summary.county_counts
+    assert {mci.address.county for mci in mcis} == set(summary.county_counts)
+
+
+def test_same_seed_generates_same_report(tmp_path):
+    reports = []
+    for seed in (1, 1, 2):
+        output = io.StringIO()
+        write_synthetic_report(output, SyntheticReportOptions(cases=50, seed=seed))
+        reports.append(output.getvalue())
+    assert reports[0] == reports[1]
+    assert reports[0] != reports[2]
+    report = tmp_path / "seeded-mci-closed-case-report.txt"
+    report.write_text(reports[2])
+    assert parse_mci_report(str(report)).mcis
+
+
+def test_every_county_of_counties_py_is_parsed(tmp_path):
+    options = SyntheticReportOptions(
+        cases=len(counties), county_weights=dict.fromkeys(counties, 1)
+    )
+    report = tmp_path / "statewide-mci-closed-case-report.txt"
+    with report.open("w") as output:
+        summary = write_synthetic_report(output, options)
+
+    assert set(summary.county_counts) == set(counties)
+    processor = MciFileProcessor(str(report))
+    assert len(processor.process_file()) == summary.mcis
+    assert dict(processor.county_counts) == summary.county_counts
+
+
+def test_options_do_not_share_county_weights():
+    SyntheticReportOptions().county_weights["ULSTER"] = 1000
+    assert SyntheticReportOptions().county_weights == COUNTY_WEIGHTS
+    assert COUNTY_WEIGHTS["ULSTER"] == 3
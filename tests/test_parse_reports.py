@@ -1,7 +1,10 @@
+import json
 from pathlib import Path
 import shutil
 import sys
 
+import pytest
+
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 SRC_DIR = PROJECT_ROOT / "src"
 if str(PROJECT_ROOT) not in sys.path:
@@ -11,10 +14,12 @@ if str(SRC_DIR) not in sys.path:
 
 
 from src import parse_reports
+from src.generate_synthetic_report import SyntheticReportOptions, write_synthetic_report
+from src.MciFileProcessor.mci_file_processor import parse_mci_report
 
 
 def _run_single_report_check(
-    tmp_path, pdf_filename: str, expected_filename: str
+    tmp_path, pdf_filename: str, expected_filename: str, backend: str = "pdfplumber"
 ) -> None:
     """
     Helper to parse a single PDF into a temp CSV and compare it to the fixture.
@@ -28,7 +33,7 @@ def _run_single_report_check(
     original_log_path = parse_reports.LOG_FILEPATH
 
     temp_output_path = tmp_path / "mci_output.csv"
-    temp_manifest_path = tmp_path / "processed_reports.log"
+    temp_manifest_path = tmp_path / "processed_reports.sqlite3"
     temp_log_path = tmp_path / "parse_reports.log"
 
     try:
@@ -41,6 +46,7 @@ def _run_single_report_check(
             str(pdf_path),
             pdf_path.name,
             parse_reports.derive_report_month(pdf_path.name),
+            parse_reports.ExtractionOptions(backend=backend),
         )
         parse_reports.CSV_OUTPUT_FILE.close()
 
@@ -64,6 +70,19 @@ def test_may_2024_report_parses_to_expected_csv(tmp_path):
     )
 
 
+@pytest.mark.parametrize("backend", ["pymupdf", "pypdfium2"])
+def test_may_2024_report_parses_to_expected_csv_with_backend(tmp_path, backend):
+    """
+    Alternative pdf backends must feed the parser the same lines as pdfplumber.
+    """
+    _run_single_report_check(
+        tmp_path,
+        pdf_filename="may-2024-mci-closed-case-report.pdf",
+        expected_filename="may-2024-expected.csv",
+        backend=backend,
+    )
+
+
 def test_duplicate_report_is_skipped(tmp_path):
     """
     Verifies that running the parser twice against the same PDF does not append duplicate rows.
@@ -75,7 +94,7 @@ def test_duplicate_report_is_skipped(tmp_path):
     shutil.copy(pdf_src, pdf_copy)
 
     temp_output_path = tmp_path / "mci_output.csv"
-    temp_manifest_path = tmp_path / "processed_reports.log"
+    temp_manifest_path = tmp_path / "processed_reports.sqlite3"
     temp_log_path = tmp_path / "parse_reports.log"
 
     original_output_path = parse_reports.CSV_OUTPUT_FILEPATH
@@ -110,3 +129,349 @@ def test_duplicate_report_is_skipped(tmp_path):
         parse_reports.PROCESSED_MANIFEST_FILE = original_manifest_path
         parse_reports.INPUT_DOCUMENT_BASE_DIR = original_input_dir
         parse_reports.configure_logger(original_log_path)
+
+
+def _run_directory(tmp_path, data_dir, workers: int) -> list[str]:
+    """
+    Helper to parse a whole directory into a temp CSV and return its lines.
+    """
+    temp_output_path = tmp_path / "mci_output.csv"
+    temp_manifest_path = tmp_path / "processed_reports.sqlite3"
+    temp_log_path = tmp_path / "parse_reports.log"
+
+    original_output_path = parse_reports.CSV_OUTPUT_FILEPATH
+    original_manifest_path = parse_reports.PROCESSED_MANIFEST_FILE
+    original_log_path = parse_reports.LOG_FILEPATH
+
+    try:
+        parse_reports.set_output_file(str(temp_output_path))
+        parse_reports.PROCESSED_MANIFEST_FILE = str(temp_manifest_path)
+        parse_reports.configure_logger(str(temp_log_path))
+
+        parse_reports.CSV_OUTPUT_FILE.write(parse_reports.CSV_HEADERS)
+        parse_reports.process_directory(str(data_dir), workers=workers)
+        parse_reports.CSV_OUTPUT_FILE.close()
+        return temp_output_path.read_text().splitlines()
+    finally:
+        parse_reports.set_output_file(original_output_path)
+        parse_reports.PROCESSED_MANIFEST_FILE = original_manifest_path
+        parse_reports.configure_logger(original_log_path)
+
+
+def test_parallel_workers_match_serial_output(tmp_path):
+    """
+    Verifies that parsing with a process pool writes exactly the rows of a serial run,
+    in report_month order.
+    """
+    pdf_src = PROJECT_ROOT / "tests" / "data" / "may-2024-mci-closed-case-report.pdf"
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    shutil.copy(pdf_src, data_dir / "june-2024-mci-closed-case-report.pdf")
+    shutil.copy(pdf_src, data_dir / "january-2024-mci-closed-case-report.pdf")
+    shutil.copy(pdf_src, data_dir / pdf_src.name)
+
+    serial_dir = tmp_path / "serial"
+    parallel_dir = tmp_path / "parallel"
+    serial_dir.mkdir()
+    parallel_dir.mkdir()
+
+    serial_lines = _run_directory(serial_dir, data_dir, workers=1)
+    parallel_lines = _run_directory(parallel_dir, data_dir, workers=2)
+
+    assert parallel_lines == serial_lines
+    report_months = [line.split(",")[1] for line in serial_lines[1:]]
+    assert report_months == sorted(report_months)
+    assert set(report_months) == {"2024-01", "2024-05", "2024-06"}
+
+
+def test_republished_report_is_reprocessed(tmp_path):
+    """
+    Verifies that a report whose content changed under the same filename is parsed again.
+    """
+    pdf_src = PROJECT_ROOT / "tests" / "data" / "may-2024-mci-closed-case-report.pdf"
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    pdf_copy = data_dir / pdf_src.name
+    shutil.copy(pdf_src, pdf_copy)
+
+    def data_rows(lines):
+        # Header is written on every run
+        return [line for line in lines if not line.startswith("report_file,")]
+
+    first_run_rows = data_rows(_run_directory(tmp_path, data_dir, workers=1))
+    unchanged_run_rows = data_rows(_run_directory(tmp_path, data_dir, workers=1))
+    assert unchanged_run_rows == first_run_rows
+
+    with pdf_copy.open("ab") as pdf:
+        pdf.write(b"\n%republished\n")
+    republished_run_rows = data_rows(_run_directory(tmp_path, data_dir, workers=1))
+    assert republished_run_rows == first_run_rows * 2
+
+
+def test_output_store_replaces_republished_report(tmp_path):
+    """
+    Verifies that with the SQLite output store a reprocessed report replaces its rows,
+    and the exported csv matches the known-good fixture.
+    """
+    pdf_src = PROJECT_ROOT / "tests" / "data" / "may-2024-mci-closed-case-report.pdf"
+    expected_csv = (
+        (PROJECT_ROOT / "tests" / "data" / "may-2024-expected.csv")
+        .read_text()
+        .splitlines()
+    )
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    pdf_copy = data_dir / pdf_src.name
+    shutil.copy(pdf_src, pdf_copy)
+
+    temp_output_path = tmp_path / "mci_output.csv"
+    temp_store_path = tmp_path / "mci_output.sqlite3"
+    original_log_path = parse_reports.LOG_FILEPATH
+
+    try:
+        parse_reports.configure_logger(str(tmp_path / "parse_reports.log"))
+        parse_reports.set_output_store(str(temp_store_path))
+
+        parse_reports.process_directory(str(data_dir))
+        with pdf_copy.open("ab") as pdf:
+            pdf.write(b"\n%republished\n")
+        parse_reports.process_directory(str(data_dir))
+
+        parse_reports.OUTPUT_STORE.export_csv(str(temp_output_path))
+        assert temp_output_path.read_text().splitlines() == expected_csv
+    finally:
+        parse_reports.set_output_store(None)
+        parse_reports.configure_logger(original_log_path)
+
+
+def test_typed_values_are_written_as_iso_dates_and_decimals():
+    """
+    With typed values, rows hold ISO dates and costs with two decimals.
+    """
+    pdf_path = PROJECT_ROOT / "tests" / "data" / "may-2024-mci-closed-case-report.pdf"
+    extraction = parse_reports.ExtractionOptions(backend="pypdfium2", typed_values=True)
+    mcis = parse_mci_report(str(pdf_path), extraction).mcis
+    rows = [parse_reports.mci_to_row(mci, pdf_path.name, "2024-05") for mci in mcis]
+
+    expected = [
+        line.split(",")
+        for line in (PROJECT_ROOT / "tests" / "data" / "may-2024-expected.csv")
+        .read_text()
+        .splitlines()[1:]
+    ]
+    assert len(rows) == len(expected)
+    for row, expected_row in zip(rows, expected, strict=True):
+        month, day, year = expected_row[8].split("/")
+        assert row[8] == f"{year}-{month}-{day}"
+        for column in (10, 12, 13):
+            assert row[column] == (
+                f"{float(expected_row[column]):.2f}" if expected_row[column] else ""
+            )
+
+
+def test_run_metrics_textfile_counts_parsed_and_skipped_reports(tmp_path):
+    """
+    Verifies that each run replaces the Prometheus textfile with its own counts.
+    """
+    pdf_src = PROJECT_ROOT / "tests" / "data" / "may-2024-mci-closed-case-report.pdf"
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    shutil.copy(pdf_src, data_dir / pdf_src.name)
+    textfile = tmp_path / "parse_reports.prom"
+    original_log_path = parse_reports.LOG_FILEPATH
+    extraction = parse_reports.ExtractionOptions(backend="pypdfium2")
+
+    def samples() -> dict[str, str]:
+        return dict(
+            line.rsplit(" ", 1)
+            for line in textfile.read_text().splitlines()
+            if not line.startswith("#")
+        )
+
+    try:
+        parse_reports.configure_logger(str(tmp_path / "parse_reports.log"))
+        parse_reports.set_output_store(str(tmp_path / "mci_output.sqlite3"))
+        parse_reports.set_run_metrics(str(textfile))
+
+        parse_reports.process_directory(str(data_dir), workers=2, extraction=extraction)
+        first_run = samples()
+        parse_reports.process_directory(str(data_dir), extraction=extraction)
+        second_run = samples()
+        row_count = parse_reports.OUTPUT_STORE.count_rows(pdf_src.name)
+    finally:
+        parse_reports.set_run_metrics(None)
+        parse_reports.set_output_store(None)
+        parse_reports.configure_logger(original_log_path)
+
+    assert first_run["mci_parse_last_run_files_scanned"] == "1"
+    assert first_run["mci_parse_last_run_files_parsed"] == "1"
+    assert first_run["mci_parse_last_run_rows_written"] == str(row_count)
+    assert first_run["mci_parse_last_run_bytes_read"] == str(pdf_src.stat().st_size)
+    assert (
+        first_run['mci_parse_last_run_report_duration_seconds_bucket{le="+Inf"}'] == "1"
+    )
+    assert int(first_run['mci_parse_last_run_county_cases{county="MANHATTAN"}']) > 0
+    assert first_run["mci_parse_last_run_success"] == "1"
+    assert second_run["mci_parse_last_run_files_skipped"] == "1"
+    assert second_run["mci_parse_last_run_files_parsed"] == "0"
+
+
+def test_keep_going_quarantines_malformed_report(tmp_path):
+    """
+    Verifies that with isolation a malformed report is appended to the dead letter
+    file and left unprocessed, while the other reports are still written.
+    """
+    pdf_src = PROJECT_ROOT / "tests" / "data" / "may-2024-mci-closed-case-report.pdf"
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    shutil.copy(pdf_src, data_dir / pdf_src.name)
+    malformed = data_dir / "june-2024-mci-closed-case-report.txt"
+    with malformed.open("w") as report:
+        write_synthetic_report(report, SyntheticReportOptions(cases=10))
+    lines = malformed.read_text().splitlines(keepends=True)
+    tally = next(i for i, line in enumerate(lines) if "TOTAL CASES:" in line)
+    lines[tally] = f" TOTAL CASES: {999:>16}\n"
+    malformed.write_text("".join(lines))
+    dead_letter = tmp_path / "dead_letter.jsonl"
+    textfile = tmp_path / "parse_reports.prom"
+    isolation = parse_reports.IsolationOptions(str(dead_letter), timeout=60)
+    extraction = parse_reports.ExtractionOptions(backend="pypdfium2")
+    original_log_path = parse_reports.LOG_FILEPATH
+
+    try:
+        parse_reports.configure_logger(str(tmp_path / "parse_reports.log"))
+        parse_reports.set_output_store(str(tmp_path / "mci_output.sqlite3"))
+        parse_reports.set_run_metrics(str(textfile))
+
+        parse_reports.process_directory(
+            str(data_dir), workers=2, extraction=extraction, isolation=isolation
+        )
+        metrics = textfile.read_text()
+        # The malformed report was not recorded as processed, so it is retried
+        parse_reports.process_directory(
+            str(data_dir), extraction=extraction, isolation=isolation
+        )
+        written_rows = parse_reports.OUTPUT_STORE.count_rows(pdf_src.name)
+        malformed_rows = parse_reports.OUTPUT_STORE.count_rows(malformed.name)
+    finally:
+        parse_reports.set_run_metrics(None)
+        parse_reports.set_output_store(None)
+        parse_reports.configure_logger(original_log_path)
+
+    assert written_rows > 0
+    assert malformed_rows == 0
+    assert "mci_parse_last_run_files_parsed 1\n" in metrics
+    assert "mci_parse_last_run_files_failed 1\n" in metrics
+    failures = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert [failure["report_file"] for failure in failures] == [malformed.name] * 2
+    assert failures[0]["line_number"] == tally + 1
+    assert failures[0]["context"] == lines[tally - 3 : tally]
+    assert "County count mismatch" in failures[0]["message"]
+
+
+def test_keep_going_with_page_workers(tmp_path):
+    """
+    Verifies that isolated reports may extract their pdf pages in worker processes
+    """
+    pdf_src = PROJECT_ROOT / "tests" / "data" / "may-2024-mci-closed-case-report.pdf"
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    shutil.copy(pdf_src, data_dir / pdf_src.name)
+    dead_letter = tmp_path / "dead_letter.jsonl"
+    isolation = parse_reports.IsolationOptions(str(dead_letter), timeout=60)
+    extraction = parse_reports.ExtractionOptions(workers=2, backend="pypdfium2")
+    original_log_path = parse_reports.LOG_FILEPATH
+
+    try:
+        parse_reports.configure_logger(str(tmp_path / "parse_reports.log"))
+        parse_reports.set_output_store(str(tmp_path / "mci_output.sqlite3"))
+        parse_reports.process_directory(
+            str(data_dir), extraction=extraction, isolation=isolation
+        )
+        written_rows = parse_reports.OUTPUT_STORE.count_rows(pdf_src.name)
+    finally:
+        parse_reports.set_output_store(None)
+        parse_reports.configure_logger(original_log_path)
+
+    assert written_rows > 0
+    assert not dead_letter.exists()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["--workers", "2"],
+        ["--keep-going"],
+        ["--metrics", "m.jsonl"],
+        ["--output", "parquet"],
+    ],
+)
+def test_checkpoint_lines_rejects_options_which_ignore_it(options, capsys):
+    """Verifies that options under which reports are not checkpointed are refused"""
+    assert (
+        parse_reports.parse_args(["--checkpoint-lines", "100"]).checkpoint_lines == 100
+    )
+    with pytest.raises(SystemExit):
+        parse_reports.parse_args(["--checkpoint-lines", "100", *options])
+    assert options[0] in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("output", ["csv", "sqlite"])
+def test_interrupted_run_resumes_from_checkpoint(tmp_path, monkeypatch, output):
+    """
+    Verifies that a run which fails part way through a report resumes it from its
+    last checkpoint, writing the same rows as an uninterrupted run.
+    """
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    report = data_dir / "DirectFeed-01-march-2024-mci-closed-case-report.txt"
+    with report.open("w") as synthetic:
+        write_synthetic_report(synthetic, SyntheticReportOptions(cases=500))
+    original_output_path = parse_reports.CSV_OUTPUT_FILEPATH
+    original_manifest_path = parse_reports.PROCESSED_MANIFEST_FILE
+    original_log_path = parse_reports.LOG_FILEPATH
+    log_path = tmp_path / "parse_reports.log"
+
+    def run(run_dir, fail_after_rows=None) -> list[str]:
+        run_dir.mkdir(exist_ok=True)
+        csv_path = run_dir / "mci_output.csv"
+        parse_reports.set_output_file(str(csv_path))
+        parse_reports.PROCESSED_MANIFEST_FILE = str(run_dir / "processed.sqlite3")
+        if output == "sqlite":
+            parse_reports.set_output_store(str(run_dir / "mci_output.sqlite3"))
+        if fail_after_rows:
+            rows = iter(range(fail_after_rows))
+            mci_to_row = parse_reports.mci_to_row
+
+            def failing_mci_to_row(*args):
+                if next(rows, None) is None:
+                    raise Exception("Interrupted")
+                return mci_to_row(*args)
+
+            monkeypatch.setattr(parse_reports, "mci_to_row", failing_mci_to_row)
+        try:
+            parse_reports.process_directory(str(data_dir))
+        finally:
+            monkeypatch.undo()
+            if parse_reports.OUTPUT_STORE:
+                parse_reports.OUTPUT_STORE.export_csv(str(csv_path))
+            parse_reports.set_output_store(None)
+            parse_reports.CSV_OUTPUT_FILE.close()
+        return csv_path.read_text().splitlines()
+
+    try:
+        parse_reports.configure_logger(str(log_path))
+        parse_reports.set_checkpoint_interval(400)
+        expected = run(tmp_path / "uninterrupted")
+        with pytest.raises(Exception, match="Interrupted"):
+            run(tmp_path / "interrupted", fail_after_rows=300)
+        resumed = run(tmp_path / "interrupted")
+    finally:
+        parse_reports.set_checkpoint_interval(0)
+        parse_reports.set_output_file(original_output_path)
+        parse_reports.PROCESSED_MANIFEST_FILE = original_manifest_path
+        parse_reports.configure_logger(original_log_path)
+
+    assert len(expected) > 300
+    assert resumed == expected
+    assert f"Resuming file {report.name} at line " in log_path.read_text()
@@ -0,0 +1,52 @@
+from contextlib import closing
+
+from src import query_reports
+from src.output_store.output_store import MCI_COLUMNS, MciOutputStore
+
+
+def _row(report_file: str, report_month: str, docket_number: str) -> tuple[str, ...]:
+    return (
+        report_file,
+        report_month,
+        "119 GLENWOOD AVE",
+        "YONKERS",
+        "10701",
+        "WESTCHESTER",
+        docket_number,
+        *MCI_COLUMNS[7:],
+    )
+
+
+def test_lists_reports_of_docket(tmp_path, capsys):
+    store_path = str(tmp_path / "mci_output.sqlite3")
+    with closing(MciOutputStore(store_path)) as store:
+        store.replace_report(
+            "june.pdf",
+            [_row("june.pdf", "2024-06", "KW910012OM")] * 2,
+        )
+        store.replace_report(
+            "may.pdf",
+            [_row("may.pdf", "2024-05", "KW910012OM"), _row("may.pdf", "2024-05", "X")],
+        )
+
+    query_reports.main(["--store", store_path, "--reports", "docket", "KW910012OM"])
+
+    assert capsys.readouterr().out.splitlines() == [
+        "report_file,report_month",
+        "may.pdf,2024-05",
+        "june.pdf,2024-06",
+    ]
+
+
+def test_writes_rows_of_address(tmp_path, capsys):
+    store_path = str(tmp_path / "mci_output.sqlite3")
+    with closing(MciOutputStore(store_path)) as store:
+        store.replace_report("may.pdf", [_row("may.pdf", "2024-05", "KW910012OM")])
+
+    query_reports.main(
+        ["--store", store_path, "address", "119 Glenwood Avenue", "--zip-code", "10701"]
+    )
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == ",".join(MCI_COLUMNS)
+    assert lines[1:] == [",".join(_row("may.pdf", "2024-05", "KW910012OM"))]
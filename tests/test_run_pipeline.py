@@ -0,0 +1,100 @@
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import shutil
+import threading
+
+import pytest
+
+from src import fetch_reports, parse_reports, run_pipeline
+from src.fetch_reports import ReportLink
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PDF_PATH = PROJECT_ROOT / "tests" / "data" / "may-2024-mci-closed-case-report.pdf"
+EXPECTED_CSV_PATH = PROJECT_ROOT / "tests" / "data" / "may-2024-expected.csv"
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    served = tmp_path / "served"
+    served.mkdir()
+    shutil.copy(PDF_PATH, served / "report.pdf")
+    httpd = ThreadingHTTPServer(
+        ("127.0.0.1", 0), partial(QuietHandler, directory=str(served))
+    )
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_downloaded_and_pending_reports_are_parsed(tmp_path, monkeypatch, server):
+    """
+    Every downloaded report, and a report downloaded by an earlier run but never
+    parsed, is written to the output store once.
+    """
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    shutil.copy(PDF_PATH, data_dir / "january-2024-mci-closed-case-report.pdf")
+    monkeypatch.setattr(fetch_reports, "DATA_DIR", data_dir)
+    links = [
+        ReportLink(
+            title=f"{month} 2024 MCI Closed Case Report", url=f"{server}/report.pdf"
+        )
+        for month in ("May", "June")
+    ]
+    options = run_pipeline.PipelineOptions(parse_workers=2, queue_size=1)
+    original_log_path = parse_reports.LOG_FILEPATH
+
+    try:
+        parse_reports.configure_logger(str(tmp_path / "parse_reports.log"))
+        parse_reports.set_output_store(str(tmp_path / "mci_output.sqlite3"))
+        with fetch_reports.create_session() as session:
+            assert run_pipeline.run_pipeline(links, session, options) == 3
+            assert run_pipeline.run_pipeline(links, session, options) == 0
+
+        store = parse_reports.OUTPUT_STORE
+        expected_rows = len(EXPECTED_CSV_PATH.read_text().splitlines()) - 1
+        for month in ("january", "may", "june"):
+            report_file = f"{month}-2024-mci-closed-case-report.pdf"
+            assert store.count_rows(report_file) == expected_rows
+    finally:
+        parse_reports.set_output_store(None)
+        parse_reports.configure_logger(original_log_path)
+
+
+def test_failing_report_does_not_stop_the_pipeline(tmp_path, monkeypatch, server):
+    """
+    A report which fails to parse is left unrecorded, while the reports downloaded
+    alongside it are still written.
+    """
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    broken = data_dir / "january-2024-mci-closed-case-report.pdf"
+    broken.write_bytes(b"%PDF-1.4 not a report")
+    monkeypatch.setattr(fetch_reports, "DATA_DIR", data_dir)
+    links = [
+        ReportLink(title="May 2024 MCI Closed Case Report", url=f"{server}/report.pdf")
+    ]
+    original_log_path = parse_reports.LOG_FILEPATH
+
+    try:
+        parse_reports.configure_logger(str(tmp_path / "parse_reports.log"))
+        parse_reports.set_output_store(str(tmp_path / "mci_output.sqlite3"))
+        with fetch_reports.create_session() as session:
+            assert run_pipeline.run_pipeline(links, session) == 1
+            # The failed report was not recorded, so it is tried again
+            assert run_pipeline.run_pipeline(links, session) == 0
+
+        store = parse_reports.OUTPUT_STORE
+        assert store.count_rows("may-2024-mci-closed-case-report.pdf") > 0
+        assert store.count_rows(broken.name) == 0
+    finally:
+        parse_reports.set_output_store(None)
+        parse_reports.configure_logger(original_log_path)
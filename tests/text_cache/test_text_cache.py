@@ -0,0 +1,75 @@
+import os
+from pathlib import Path
+
+from src.MciFileProcessor.mci_file_processor import (
+    ExtractionOptions,
+    get_lines_from_file,
+)
+from src.text_cache.text_cache import ExtractedTextCache
+
+PDF_PATH = (
+    Path(__file__).resolve().parents[1] / "data" / "may-2024-mci-closed-case-report.pdf"
+)
+LINES = ["465 SHORE RD", "", "LONG BEACH, NY 11561 MP710004OM CLOSED\r05/02/2024"]
+
+
+def _fail_extraction():
+    raise AssertionError("Cached lines should not be extracted again")
+
+
+def test_cache_hit_skips_extraction(tmp_path):
+    cache = ExtractedTextCache(str(tmp_path))
+    assert list(cache.iter_lines(str(PDF_PATH), "pdfplumber", lambda: iter(LINES))) == (
+        LINES
+    )
+    assert list(cache.iter_lines(str(PDF_PATH), "pdfplumber", _fail_extraction)) == (
+        LINES
+    )
+
+
+def test_cache_is_keyed_by_backend(tmp_path):
+    cache = ExtractedTextCache(str(tmp_path))
+    assert cache.get_key(str(PDF_PATH), "pdfplumber") != cache.get_key(
+        str(PDF_PATH), "pypdfium2"
+    )
+
+
+def test_interrupted_extraction_is_not_cached(tmp_path):
+    cache = ExtractedTextCache(str(tmp_path))
+    lines = cache.iter_lines(str(PDF_PATH), "pdfplumber", lambda: iter(LINES))
+    next(lines)
+    lines.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ExtractedTextCache(str(tmp_path), max_bytes=150)
+    for index in range(3):
+        pdf_copy = tmp_path / f"report-{index}.pdf"
+        pdf_copy.write_bytes(PDF_PATH.read_bytes() + bytes([index]))
+        entry_lines = [f"{index}" * 60]
+        list(
+            cache.iter_lines(
+                str(pdf_copy),
+                "pdfplumber",
+                lambda entry_lines=entry_lines: iter(entry_lines),
+            )
+        )
+        entry_path = cache.get_entry_path(cache.get_key(str(pdf_copy), "pdfplumber"))
+        os.utime(entry_path, (index, index))
+
+    cache.evict()
+    remaining = sorted(name for name in os.listdir(tmp_path) if name.endswith(".lines"))
+    assert len(remaining) == 2
+    assert not os.path.exists(
+        cache.get_entry_path(
+            cache.get_key(str(tmp_path / "report-0.pdf"), "pdfplumber")
+        )
+    )
+
+
+def test_cached_lines_match_extracted_lines(tmp_path):
+    extraction = ExtractionOptions(text_cache=ExtractedTextCache(str(tmp_path)))
+    expected = get_lines_from_file(str(PDF_PATH))
+    assert get_lines_from_file(str(PDF_PATH), extraction) == expected
+    assert get_lines_from_file(str(PDF_PATH), extraction) == expected
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pytest
+
+from src.text_extractors.text_extractors import (
+    EXTRACTORS,
+    get_extractor,
+    iter_page_texts,
+    normalize_page_lines,
+)
+
+PDF_PATH = (
+    Path(__file__).resolve().parents[1] / "data" / "may-2024-mci-closed-case-report.pdf"
+)
+
+
+def test_normalize_page_lines():
+    lines = [" 465  SHORE RD ", "", "   ", "LONG BEACH, NY  11561\r"]
+    assert normalize_page_lines(lines) == "465 SHORE RD\nLONG BEACH, NY 11561"
+
+
+@pytest.mark.parametrize("backend", sorted(EXTRACTORS))
+def test_backends_produce_identical_page_texts(backend):
+    expected = list(iter_page_texts(str(PDF_PATH), "pdfplumber"))
+    assert list(iter_page_texts(str(PDF_PATH), backend)) == expected
+
+
+@pytest.mark.parametrize("backend", sorted(EXTRACTORS))
+def test_backends_extract_page_ranges(backend):
+    all_pages = list(iter_page_texts(str(PDF_PATH), backend))
+    assert get_extractor(backend).count_pages(str(PDF_PATH)) == len(all_pages)
+    assert list(iter_page_texts(str(PDF_PATH), backend, 2, 5)) == all_pages[2:5]
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown pdf backend"):
+        get_extractor("tesseract")